@@ -1,30 +1,36 @@
-from flask import Flask, jsonify, request, Response
+from flask import Flask, jsonify, request
 from flask_cors import CORS
-import pandas as pd
-import os
+import hashlib
 import json
 from datetime import datetime
 from typing import Optional
 
+import compute
+import data_store
+import metrics
+import serializer
+import student_directory
 from pink_views import pink_bp
 from green_topViews import green_top_bp
+from ingest import ingest_bp
+from bulk import bulk_bp
+from leaderboard import leaderboard_bp
+from similarity import similarity_bp
+from timeline import timeline_bp
 
 app = Flask(__name__)
+serializer.init_app(app)
 CORS(app)
 app.register_blueprint(pink_bp)
 app.register_blueprint(green_top_bp)
-
-# 数据文件路径
-DATA_DIR = os.path.join(os.path.dirname(__file__), 'data')
-STUDENT_INFO_FILE = os.path.join(DATA_DIR, 'Data_StudentInfo.csv')
-CLASS_TITLE_MASTERY = os.path.join(DATA_DIR, 'mastery', 'class_title_mastery.csv')
-INDIVIDUAL_TITLE_MASTERY = os.path.join(DATA_DIR, 'mastery', 'individual_title_mastery.csv')
-CLASS_KNOWLEDGE_MASTERY = os.path.join(DATA_DIR, 'mastery', 'class_knowledge_mastery.csv')
-INDIVIDUAL_KNOWLEDGE_MASTERY = os.path.join(DATA_DIR, 'mastery', 'individual_knowledge_mastery.csv')
-INDIVIDUAL_SUB_KNOWLEDGE_MASTERY = os.path.join(DATA_DIR, 'mastery', 'individual_sub_knowledge_mastery.csv')
-MAJOR_KNOWLEDGE_MASTERY = os.path.join(DATA_DIR, 'mastery', 'major_knowledge_mastery.csv')
-MAJOR_TITLE_MASTERY = os.path.join(DATA_DIR, 'mastery', 'major_title_mastery.csv')
-
+app.register_blueprint(ingest_bp)
+app.register_blueprint(bulk_bp)
+app.register_blueprint(leaderboard_bp)
+app.register_blueprint(similarity_bp)
+app.register_blueprint(timeline_bp)
+data_store.init_app(app)
+compute.init_app(app)
+metrics.init_app(app)
 
 def safe_json_loads(raw: str):
     """解析 query 中 data 字符串，确保返回 dict。"""
@@ -36,8 +42,67 @@ def safe_json_loads(raw: str):
         return {}
 
 
-def build_class_summary(selected_class: Optional[str] = None):
-    df = pd.read_csv(CLASS_TITLE_MASTERY)
+TRACKER_DEFAULT_LIMIT = 50
+TRACKER_MAX_LIMIT = 1000
+TRACKER_TITLE_FIELDS = ['title_ID', 'score_rate', 'average_tc', 'average_memory', 'title_mastery_score']
+
+
+class TrackerQuery:
+    """JSONP 接口 data 参数中的筛选、分页与投影条件。"""
+
+    def __init__(self, payload: dict):
+        self.selected_class = payload.get('class') or payload.get('className')
+        self.student_id = payload.get('student_ID') or payload.get('studentId')
+        self.limit = _bounded_int(payload.get('limit'), TRACKER_DEFAULT_LIMIT, 0, TRACKER_MAX_LIMIT)
+        self.offset = _bounded_int(payload.get('offset'), 0, 0, None)
+        self.sections = _expand_sections(payload.get('sections'))
+        self.fields = _parse_fields(payload.get('fields'))
+        self.since = payload.get('since')
+
+    def page(self, df):
+        """先分页再转换为 records，只物化返回的行。"""
+        return df.iloc[self.offset:self.offset + self.limit]
+
+    def records(self, section: str, df):
+        fields = self.fields.get(section, self.fields.get(section.split('.')[0])) \
+            if isinstance(self.fields, dict) else self.fields
+        if fields:
+            df = df[[col for col in df.columns if col in fields]]
+        return serializer.records(df)
+
+    def params_digest(self) -> str:
+        """除 since 以外全部条件的摘要：条件不同的两次请求，返回的内容不可比较。"""
+        params = [self.selected_class, self.student_id, self.limit, self.offset, self.sections, self.fields]
+        return hashlib.sha1(json.dumps(params, sort_keys=True, default=str).encode('utf-8')).hexdigest()[:10]
+
+    def section_tokens(self) -> dict:
+        """所请求的各部分 -> 其所依赖数据的内容标识。"""
+        return {path: data_store.registry.content_token(TRACKER_SECTION_DATASETS[path]) for path in self.sections}
+
+    def version(self, tokens: dict) -> str:
+        return '.'.join([self.params_digest(), *tokens.values()])
+
+    def unchanged_sections(self, tokens: dict) -> list:
+        """与 since 相比内容没有变化的部分；since 缺失、格式不对或条件不同时为空（返回完整结果）。"""
+        if not isinstance(self.since, str):
+            return []
+        digest, *previous = self.since.split('.')
+        if digest != self.params_digest() or len(previous) != len(tokens):
+            return []
+        return [path for path, token in zip(tokens, previous) if tokens[path] == token]
+
+
+def _bounded_int(value, default: int, low: int, high: Optional[int]) -> int:
+    try:
+        value = int(value)
+    except (TypeError, ValueError):
+        return default
+    value = max(low, value)
+    return min(value, high) if high is not None else value
+
+
+def build_class_summary(query: TrackerQuery):
+    df = data_store.get('class_title_mastery')
     summary_df = (
         df.groupby('class')['title_mastery_score']
         .mean()
@@ -45,93 +110,174 @@ def build_class_summary(selected_class: Optional[str] = None):
         .rename(columns={'title_mastery_score': 'avg_mastery'})
         .sort_values('class')
     )
-    summary = summary_df.to_dict('records')
-
-    details = []
-    if selected_class:
-        class_df = (
-            df[df['class'] == selected_class][['title_ID', 'score_rate', 'average_tc',
-                                               'average_memory', 'title_mastery_score']]
-            .sort_values('title_mastery_score', ascending=False)
-            .head(50)
-        )
-        details = class_df.to_dict('records')
-
-    available = sorted(df['class'].unique().tolist())
-    return summary, details, available
-
-
-def build_student_mastery(student_id: Optional[str] = None):
-    df = pd.read_csv(INDIVIDUAL_TITLE_MASTERY)
-    summary = []
-    if student_id:
-        summary_df = (
-            df[df['student_ID'] == student_id][['title_ID', 'score_rate', 'average_tc',
-                                                'average_memory', 'title_mastery_score']]
-            .sort_values('title_mastery_score', ascending=False)
-            .head(50)
-        )
-        summary = summary_df.to_dict('records')
-    available = sorted(df['student_ID'].unique().tolist())
-    return summary, available
-
-
-def build_knowledge_snapshot(class_name: Optional[str] = None, student_id: Optional[str] = None):
-    class_df = pd.read_csv(CLASS_KNOWLEDGE_MASTERY)
-    class_snapshot = class_df.to_dict('records')
-    if class_name:
-        class_snapshot = class_df[class_df['class'] == class_name].to_dict('records')
-
-    indiv_df = pd.read_csv(INDIVIDUAL_KNOWLEDGE_MASTERY)
-    individual_snapshot = []
-    if student_id:
-        individual_snapshot = indiv_df[indiv_df['student_ID'] == student_id].to_dict('records')
-
-    sub_df = pd.read_csv(INDIVIDUAL_SUB_KNOWLEDGE_MASTERY)
-    sub_snapshot = []
-    if student_id:
-        sub_snapshot = sub_df[sub_df['student_ID'] == student_id].to_dict('records')
-
-    major_k_df = pd.read_csv(MAJOR_KNOWLEDGE_MASTERY)
-    major_t_df = pd.read_csv(MAJOR_TITLE_MASTERY)
-
-    return {
-        'classKnowledge': class_snapshot[:50],
-        'individualKnowledge': individual_snapshot[:50],
-        'individualSubKnowledge': sub_snapshot[:50],
-        'majorKnowledge': major_k_df.to_dict('records')[:50],
-        'majorTitle': major_t_df.to_dict('records')[:50],
-    }
+    return query.records('classSummary', summary_df)
+
+
+def build_class_details(query: TrackerQuery):
+    if not query.selected_class:
+        return []
+    class_df = (
+        data_store.lookup('class_title_mastery', 'class', query.selected_class)[TRACKER_TITLE_FIELDS]
+        .sort_values('title_mastery_score', ascending=False)
+    )
+    return query.records('classDetails', query.page(class_df))
+
+
+def build_available_classes(query: TrackerQuery):
+    return sorted(data_store.get('class_title_mastery')['class'].unique().tolist())
+
+
+def build_student_mastery(query: TrackerQuery):
+    if not query.student_id:
+        return []
+    summary_df = (
+        data_store.lookup('individual_title_mastery', 'student_ID', query.student_id)[TRACKER_TITLE_FIELDS]
+        .sort_values('title_mastery_score', ascending=False)
+    )
+    return query.records('studentDetails', query.page(summary_df))
+
+
+def build_available_students(query: TrackerQuery):
+    return data_store.index('individual_title_mastery', 'student_ID').keys()
+
+
+def _knowledge_section(section: str, dataset: str, key: Optional[str] = None, attr: Optional[str] = None,
+                       required: bool = False):
+    def build(query: TrackerQuery):
+        value = getattr(query, attr) if attr else None
+        if value:
+            df = data_store.lookup(dataset, key, value)
+        elif required:
+            return []
+        else:
+            df = data_store.get(dataset)
+        return query.records(section, query.page(df))
+    return build
+
+
+# JSONP 接口的各个部分：路径 -> 构建函数；只有被请求的部分才会执行
+TRACKER_SECTIONS = {
+    'available.classes': build_available_classes,
+    'available.students': build_available_students,
+    'classSummary': build_class_summary,
+    'classDetails': build_class_details,
+    'studentDetails': build_student_mastery,
+    'knowledge.classKnowledge': _knowledge_section(
+        'knowledge.classKnowledge', 'class_knowledge_mastery', 'class', 'selected_class'),
+    'knowledge.individualKnowledge': _knowledge_section(
+        'knowledge.individualKnowledge', 'individual_knowledge_mastery', 'student_ID', 'student_id', required=True),
+    'knowledge.individualSubKnowledge': _knowledge_section(
+        'knowledge.individualSubKnowledge', 'individual_sub_knowledge_mastery', 'student_ID', 'student_id',
+        required=True),
+    'knowledge.majorKnowledge': _knowledge_section('knowledge.majorKnowledge', 'major_knowledge_mastery'),
+    'knowledge.majorTitle': _knowledge_section('knowledge.majorTitle', 'major_title_mastery'),
+}
+
+
+# 各部分所依赖的数据集，用于计算增量同步的内容标识（索引等派生数据集随上游变化，列出上游即可）
+TRACKER_SECTION_DATASETS = {
+    'available.classes': ['class_title_mastery'],
+    'available.students': ['individual_title_mastery'],
+    'classSummary': ['class_title_mastery'],
+    'classDetails': ['class_title_mastery'],
+    'studentDetails': ['individual_title_mastery'],
+    'knowledge.classKnowledge': ['class_knowledge_mastery'],
+    'knowledge.individualKnowledge': ['individual_knowledge_mastery'],
+    'knowledge.individualSubKnowledge': ['individual_sub_knowledge_mastery'],
+    'knowledge.majorKnowledge': ['major_knowledge_mastery'],
+    'knowledge.majorTitle': ['major_title_mastery'],
+}
+
+
+def _name_list(value, param: str) -> list:
+    """字符串列表或逗号分隔的字符串 -> 去掉空白后的名称列表；其他类型抛出 ValueError。"""
+    if isinstance(value, str):
+        value = value.split(',')
+    if not isinstance(value, list) or not all(isinstance(item, str) for item in value):
+        raise ValueError(f'{param} 必须是字符串列表或逗号分隔的字符串')
+    return [item.strip() for item in value if item.strip()]
+
+
+def _parse_fields(fields):
+    """fields 为名称列表（作用于所有部分）或 {section: 名称列表}；为空时返回 None。"""
+    if fields is None:
+        return None
+    if isinstance(fields, dict):
+        return {str(section): _name_list(names, f'fields.{section}') for section, names in fields.items()}
+    return _name_list(fields, 'fields')
+
+
+def _expand_sections(sections) -> list:
+    """sections 为空时返回全部；'knowledge' 这样的前缀展开为其下所有部分。未知名称或类型不对时抛出 ValueError。"""
+    names = _name_list(sections, 'sections') if sections is not None else []
+    if not names:
+        return list(TRACKER_SECTIONS)
+    selected = []
+    for name in names:
+        matches = [path for path in TRACKER_SECTIONS if path == name or path.startswith(name + '.')]
+        if not matches:
+            raise ValueError(f'未知的 section: {name}')
+        selected.extend(path for path in matches if path not in selected)
+    return selected
+
+
+def build_tracker_sections(query: TrackerQuery, skip=()) -> dict:
+    """按请求的 sections 构建 {'available': {...}, 'data': {...}}，保持原有的嵌套结构与顺序；skip 中的部分不构建。"""
+    result = {}
+    for path in TRACKER_SECTIONS:
+        if path not in query.sections or path in skip:
+            continue
+        head, _, tail = path.partition('.')
+        with metrics.stage(f'tracker.{path}'):
+            section = TRACKER_SECTIONS[path](query)
+        if head == 'available':
+            result.setdefault('available', {})[tail] = section
+        elif tail:
+            result.setdefault('data', {}).setdefault(head, {})[tail] = section
+        else:
+            result.setdefault('data', {})[head] = section
+    return result
 
 @app.route('/api/classes', methods=['GET'])
 def get_classes():
     """获取所有班级列表"""
-    df = pd.read_csv(STUDENT_INFO_FILE)
+    df = data_store.get('student_info')
     classes = sorted(df['major'].unique().tolist())
     return jsonify(classes)
 
 @app.route('/api/students', methods=['GET'])
 def get_students():
-    """获取所有学生列表"""
-    df = pd.read_csv(STUDENT_INFO_FILE)
-    students = df[['student_ID', 'major']].to_dict('records')
+    """获取所有学生列表；带 limit / cursor / prefix / major / sex / age_min / age_max 时按 student_ID 分页"""
+    if student_directory.is_paged(request.args):
+        return _student_page(request.args)
+    df = data_store.get('student_info')
+    students = serializer.records(df[['student_ID', 'major']])
     return jsonify(students)
 
 @app.route('/api/students/<class_name>', methods=['GET'])
 def get_students_by_class(class_name):
-    """根据班级获取学生列表"""
-    df = pd.read_csv(STUDENT_INFO_FILE)
-    students = df[df['major'] == class_name][['student_ID', 'major']].to_dict('records')
+    """根据班级获取学生列表；分页参数同 /api/students"""
+    if student_directory.is_paged(request.args):
+        return _student_page(request.args, class_name)
+    df = data_store.lookup('student_info', 'major', class_name)
+    students = serializer.records(df[['student_ID', 'major']])
     return jsonify(students)
 
 
+def _student_page(args, major: Optional[str] = None):
+    try:
+        return jsonify(student_directory.query(args, major))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+
 @app.route('/api/class-data/<class_name>', methods=['GET'])
 def get_class_data(class_name):
     """获取班级数据（用于绿色和蓝色框）"""
     try:
         # 读取班级题目掌握情况
-        df = pd.read_csv(CLASS_TITLE_MASTERY)
-        class_data = df[df['class'] == f'Class{class_name[-1]}'].to_dict('records')
+        df = data_store.lookup('class_title_mastery', 'class', f'Class{class_name[-1]}')
+        class_data = serializer.records(df)
         
         # 可以添加更多数据处理逻辑
         return jsonify({
@@ -148,8 +294,8 @@ def get_student_data(student_id):
     """获取学生数据（用于绿色和蓝色框）"""
     try:
         # 读取学生题目掌握情况
-        df = pd.read_csv(INDIVIDUAL_TITLE_MASTERY)
-        student_data = df[df['student_ID'] == student_id].to_dict('records')
+        df = data_store.lookup('individual_title_mastery', 'student_ID', student_id)
+        student_data = serializer.records(df)
         
         return jsonify({
             'greenBox1': student_data[:10] if len(student_data) > 10 else student_data,
@@ -166,44 +312,56 @@ def hybrid_tracker_statistics():
     """
     兼容旧版可视化前端使用的 JSONP 接口。
     支持 query 参数:
-        data: json 字符串，可包含 class / student_ID 等过滤条件
+        data: json 字符串，可包含
+            class / student_ID: 过滤条件
+            sections: 只返回指定部分（列表或逗号分隔），如 ["classDetails", "knowledge.majorTitle"]；
+                      "knowledge" / "available" 表示其下全部部分；不传时返回全部。未请求的部分不会计算
+            fields: 记录中只保留的列，列表（作用于所有部分）或 {section: [列...]}
+            limit / offset: 明细与知识点列表的分页（默认 50 / 0，limit 最大 1000）
+            since: 上次响应中的 version；内容没有变化时只返回 notModified，否则只返回变化了的部分
         __callback__: JSONP 回调名称
     """
     payload = safe_json_loads(request.args.get('data', '{}'))
     callback = request.args.get('__callback__') or request.args.get('callback')
 
-    selected_class = payload.get('class') or payload.get('className')
-    student_id = payload.get('student_ID') or payload.get('studentId')
-
-    class_summary, class_details, available_classes = build_class_summary(selected_class)
-    student_details, available_students = build_student_mastery(student_id)
-    knowledge_snapshot = build_knowledge_snapshot(selected_class, student_id)
-
-    tracker_payload = {
-        'code': 0,
-        'message': 'success',
-        'requested': {
-            'class': selected_class,
-            'student': student_id,
-        },
-        'available': {
-            'classes': available_classes,
-            'students': available_students,
-        },
-        'timestamp': datetime.utcnow().isoformat() + 'Z',
-        'data': {
-            'classSummary': class_summary,
-            'classDetails': class_details,
-            'studentDetails': student_details,
-            'knowledge': knowledge_snapshot,
+    try:
+        query = TrackerQuery(payload if isinstance(payload, dict) else {})
+        tokens = query.section_tokens()
+        unchanged = query.unchanged_sections(tokens)
+        sections = build_tracker_sections(query, skip=unchanged)
+        tracker_payload = {
+            'code': 0,
+            'message': 'success',
+            'requested': {
+                'class': query.selected_class,
+                'student': query.student_id,
+            },
         }
-    }
+        if unchanged:
+            tracker_payload['unchanged'] = unchanged
+            if len(unchanged) == len(query.sections):
+                tracker_payload['message'] = 'not modified'
+                tracker_payload['notModified'] = True
+        # 构建了的部分重新取一次标识：构建过程中首次加载的数据集以实际读到的文件为准；
+        # 跳过的部分沿用客户端手中内容的标识
+        built = query.section_tokens()
+        tracker_payload['version'] = query.version({
+            path: tokens[path] if path in unchanged else built[path] for path in tokens
+        })
+    except ValueError as exc:
+        sections = {}
+        tracker_payload = {'code': 1, 'message': str(exc)}
+    if 'available' in sections:
+        tracker_payload['available'] = sections['available']
+    tracker_payload['timestamp'] = datetime.utcnow().isoformat() + 'Z'
+    if 'data' in sections:
+        tracker_payload['data'] = sections['data']
 
     if callback:
-        body = f"{callback}({json.dumps(tracker_payload, ensure_ascii=False)})"
-        return Response(body, mimetype='application/javascript')
+        return serializer.jsonp(callback, tracker_payload)
 
     return jsonify(tracker_payload)
 
 if __name__ == '__main__':
+    data_store.registry.preload()
     app.run(debug=True, port=5000)
\ No newline at end of file
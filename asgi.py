@@ -0,0 +1,179 @@
+"""
+可选的 ASGI 入口：以异步服务器运行同一个 Flask 应用（全部蓝图与 app.py 中的接口、相同的 JSON 格式）。
+
+    uvicorn asgi:application --host 0.0.0.0 --port 5000 --workers 4
+
+* 事件循环只负责收发数据；路由处理（pandas 计算、序列化）在线程池中执行，慢客户端不会占住计算线程。
+* 流式响应（如 /api/green/top/sunburst/batch?format=ndjson）每次只在线程池中取下一块，
+  发送期间不占线程；同一响应的各块在同一个 contextvars 上下文中执行，请求上下文与固定的数据 Snapshot 保持一致。
+* lifespan 启动时预热数据集（与 python app.py 相同）。
+
+| 环境变量 | 默认值 | 说明 |
+| --- | --- | --- |
+| ASGI_THREADS | 8 | 执行路由处理的线程数 |
+| ASGI_MAX_BODY | 16 MiB | 请求体上限，超过返回 413 |
+"""
+import asyncio
+import contextvars
+import io
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+DEFAULT_THREADS = 8
+DEFAULT_MAX_BODY = 16 * 1024 * 1024
+_END = object()
+
+
+class RequestTooLarge(Exception):
+    pass
+
+
+def _latin1(value: str) -> str:
+    return value.encode('utf-8').decode('latin-1')
+
+
+def build_environ(scope: Dict[str, Any], body: bytes) -> Dict[str, Any]:
+    """把 ASGI HTTP scope 转换为 WSGI environ（PEP 3333）。"""
+    root_path = scope.get('root_path', '')
+    path = scope['path']
+    if root_path and path.startswith(root_path):
+        path = path[len(root_path):]
+    server = scope.get('server') or ('localhost', 80)
+    client = scope.get('client') or ('', 0)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': _latin1(root_path),
+        'PATH_INFO': _latin1(path),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': str(server[0]),
+        'SERVER_PORT': str(server[1]) if server[1] is not None else '80',
+        'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+        'REMOTE_ADDR': client[0],
+        'REMOTE_PORT': str(client[1]),
+        'CONTENT_LENGTH': str(len(body)),
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    for raw_name, raw_value in scope.get('headers', []):
+        name = raw_name.decode('latin-1').upper().replace('-', '_')
+        value = raw_value.decode('latin-1')
+        if name == 'CONTENT_TYPE':
+            environ['CONTENT_TYPE'] = value
+            continue
+        if name == 'CONTENT_LENGTH':
+            continue
+        key = f'HTTP_{name}'
+        environ[key] = f'{environ[key]},{value}' if key in environ else value
+    return environ
+
+
+class FlaskASGI:
+    """把 WSGI 应用包装为 ASGI 应用，路由处理放到线程池中执行。"""
+
+    def __init__(self, wsgi_app: Callable, threads: int = DEFAULT_THREADS, max_body: int = DEFAULT_MAX_BODY,
+                 on_startup: Optional[Callable[[], None]] = None):
+        self.wsgi_app = wsgi_app
+        self.executor = ThreadPoolExecutor(max_workers=max(1, threads), thread_name_prefix='asgi')
+        self.max_body = max_body
+        self.on_startup = on_startup
+
+    async def __call__(self, scope: Dict[str, Any], receive: Callable, send: Callable) -> None:
+        if scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+        elif scope['type'] == 'http':
+            await self._http(scope, receive, send)
+        else:
+            raise RuntimeError(f"不支持的 ASGI scope: {scope['type']}")
+
+    async def _lifespan(self, receive: Callable, send: Callable) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                try:
+                    if self.on_startup is not None:
+                        await loop.run_in_executor(self.executor, self.on_startup)
+                except Exception as exc:
+                    await send({'type': 'lifespan.startup.failed', 'message': str(exc)})
+                    return
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                self.executor.shutdown(wait=False)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def _read_body(self, receive: Callable) -> bytes:
+        chunks: List[bytes] = []
+        size = 0
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                break
+            chunk = message.get('body', b'')
+            size += len(chunk)
+            if size > self.max_body:
+                raise RequestTooLarge()
+            chunks.append(chunk)
+            if not message.get('more_body', False):
+                break
+        return b''.join(chunks)
+
+    async def _http(self, scope: Dict[str, Any], receive: Callable, send: Callable) -> None:
+        try:
+            body = await self._read_body(receive)
+        except RequestTooLarge:
+            await send({'type': 'http.response.start', 'status': 413,
+                        'headers': [(b'content-type', b'text/plain; charset=utf-8')]})
+            await send({'type': 'http.response.body', 'body': b'Request Entity Too Large'})
+            return
+
+        environ = build_environ(scope, body)
+        loop = asyncio.get_running_loop()
+        # 同一响应的所有步骤在同一个上下文中执行：Flask 请求上下文与数据 Snapshot 的固定都基于 contextvars
+        context = contextvars.copy_context()
+        started: Dict[str, Any] = {}
+
+        def start_response(status: str, headers: List[Tuple[str, str]], exc_info: Any = None):
+            started['status'] = int(status.split(' ', 1)[0])
+            started['headers'] = [(name.lower().encode('latin-1'), value.encode('latin-1')) for name, value in headers]
+            return lambda data: started.setdefault('written', []).append(data)
+
+        def call() -> Tuple[Iterable[bytes], Any]:
+            result = self.wsgi_app(environ, start_response)
+            return result, iter(result)
+
+        result, iterator = await loop.run_in_executor(self.executor, context.run, call)
+        try:
+            await send({'type': 'http.response.start', 'status': started['status'], 'headers': started['headers']})
+            for data in started.pop('written', []):
+                await send({'type': 'http.response.body', 'body': data, 'more_body': True})
+            while True:
+                chunk = await loop.run_in_executor(self.executor, context.run, next, iterator, _END)
+                if chunk is _END:
+                    break
+                if chunk:
+                    await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+            await send({'type': 'http.response.body', 'body': b''})
+        finally:
+            close = getattr(result, 'close', None)
+            if close is not None:
+                await loop.run_in_executor(self.executor, context.run, close)
+
+
+def create_application() -> FlaskASGI:
+    import data_store
+    from app import app
+
+    threads = int(os.environ.get('ASGI_THREADS') or DEFAULT_THREADS)
+    max_body = int(os.environ.get('ASGI_MAX_BODY') or DEFAULT_MAX_BODY)
+    return FlaskASGI(app, threads=threads, max_body=max_body, on_startup=data_store.registry.preload)
+
+
+application = create_application()
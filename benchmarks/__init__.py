@@ -0,0 +1 @@
+"""性能基准脚本，使用方式见各模块的说明。"""
@@ -0,0 +1,156 @@
+"""
+构建函数基准：逐个测量各视图构建函数的冷启动与热运行耗时，结果写成 JSON 便于跟踪回归。
+
+    python -m benchmarks.builders                                   # 仓库自带数据
+    python -m benchmarks.synthetic /tmp/bench-data --students 100000 --records 10000000
+    python -m benchmarks.builders --data /tmp/bench-data --repeat 5 --json result.json
+
+* cold：清空全部已加载的数据集后运行一次，包含该构建函数所需数据集的加载（CSV 或列式快照）与派生数据的计算；
+* warm：数据集已加载后重复运行 --repeat 次，取中位数与最小值。
+直接调用构建函数，不经过响应缓存，也不包含 JSON 序列化。
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+
+def _builders(class_name: str, student_id: str) -> List[Tuple[str, Callable[[], Any]]]:
+    import app
+    import green_topViews
+    import pink_views
+    from benchmarks import sunburst_baseline
+
+    def tracker(sections: Optional[List[str]] = None) -> Callable[[], Any]:
+        payload = {'class': class_name, 'student_ID': student_id, 'sections': sections}
+        return lambda: app.build_tracker_sections(app.TrackerQuery(payload))
+
+    builders = [
+        ('pink.heatmap', pink_views.build_heatmap_payload),
+        ('pink.bubbles', pink_views.build_bubble_payload),
+        ('pink.state_trends', lambda: pink_views.build_state_trends_payload()),
+        ('pink.state_trends.class', lambda: pink_views.build_state_trends_payload(class_name, granularity='day')),
+        ('pink.state_trends.student', lambda: pink_views.build_state_trends_payload(student_id=student_id)),
+        ('green.sunburst', lambda: green_topViews.build_sunburst_payload(class_name, student_id)),
+        ('green.sunburst.reference', lambda: sunburst_baseline.build_sunburst_payload(class_name, student_id)),
+        ('green.sunburst_batch', lambda: green_topViews.build_sunburst_batch_payload(class_name)),
+        ('tracker', tracker()),
+    ]
+    builders.extend((f'tracker.{path}', tracker([path])) for path in app.TRACKER_SECTIONS)
+    return builders
+
+
+def _pick_subjects() -> Tuple[str, str]:
+    """取提交记录最多的班级，以及该班级中有掌握度数据的第一个学生。"""
+    import data_store
+
+    by_class = data_store.index('submit_records', 'class')
+    class_name = max(by_class.keys(), key=lambda key: len(by_class.slice(key)))
+    mastered = data_store.index('individual_title_mastery', 'student_ID')
+    students = sorted(set(by_class.slice(class_name)['student_ID'].astype(str)))
+    student_id = next(sid for sid in students if sid in mastered)
+    return str(class_name), student_id
+
+
+def _time_ms(fn: Callable[[], Any]) -> float:
+    start = time.perf_counter()
+    fn()
+    return (time.perf_counter() - start) * 1000
+
+
+def run(repeat: int, only: Optional[List[str]] = None) -> Dict[str, Any]:
+    import numpy as np
+    import pandas as pd
+
+    import data_store
+    from app import app
+
+    with app.app_context():
+        class_name, student_id = _pick_subjects()
+        builders = [(name, fn) for name, fn in _builders(class_name, student_id)
+                    if not only or any(name.startswith(prefix) for prefix in only)]
+
+        rows = []
+        for name, fn in builders:
+            data_store.registry.invalidate()
+            with data_store.registry.pinned():
+                cold = _time_ms(fn)
+            with data_store.registry.pinned():
+                samples = [_time_ms(fn) for _ in range(repeat)]
+            rows.append({
+                'builder': name,
+                'cold_ms': round(cold, 3),
+                'warm_ms': round(statistics.median(samples), 3),
+                'warm_min_ms': round(min(samples), 3),
+            })
+
+        data_store.registry.preload()
+        snapshot = data_store.registry.current()
+        datasets = {}
+        for name, value in sorted(list(snapshot.values.items()), key=lambda item: item[0]):
+            frame = getattr(value, 'frame', value)
+            datasets[name] = {
+                'rows': len(frame) if hasattr(frame, 'shape') else None,
+                'load_ms': round(data_store.registry.load_seconds.get(name, 0.0) * 1000, 3),
+            }
+
+    synthetic = None
+    if os.path.exists(os.path.join(data_store.DATA_DIR, 'synthetic.json')):
+        with open(os.path.join(data_store.DATA_DIR, 'synthetic.json'), encoding='utf-8') as fh:
+            synthetic = json.load(fh)
+    return {
+        'data_dir': data_store.DATA_DIR,
+        'synthetic': synthetic,
+        'mastery_source': data_store.MASTERY_SOURCE,
+        'subjects': {'class': class_name, 'student_ID': student_id},
+        'repeat': repeat,
+        'environment': {
+            'python': platform.python_version(),
+            'pandas': pd.__version__,
+            'numpy': np.__version__,
+            'machine': platform.machine(),
+            'cpus': os.cpu_count(),
+        },
+        'builders': rows,
+        'datasets': datasets,
+    }
+
+
+def report(result: Dict[str, Any]) -> None:
+    print(f"data: {result['data_dir']}  class={result['subjects']['class']}  "
+          f"student={result['subjects']['student_ID']}")
+    print(f"{'builder':<45}{'cold':>12}{'warm':>12}{'warm min':>12}")
+    for row in result['builders']:
+        print(f"{row['builder']:<45}{row['cold_ms']:>10.2f}ms{row['warm_ms']:>10.2f}ms{row['warm_min_ms']:>10.2f}ms")
+    print()
+    print(f"{'dataset':<50}{'rows':>10}{'load':>12}")
+    for name, info in result['datasets'].items():
+        rows = '' if info['rows'] is None else info['rows']
+        print(f"{name:<50}{rows:>10}{info['load_ms']:>10.2f}ms")
+
+
+def main(argv: List[str]) -> int:
+    parser = argparse.ArgumentParser(description='构建函数冷 / 热耗时基准')
+    parser.add_argument('--data', help='数据目录（默认为仓库的 data/，也可用环境变量 DATA_DIR 指定）')
+    parser.add_argument('--repeat', type=int, default=10)
+    parser.add_argument('--only', nargs='*', help='只测名称以这些前缀开头的构建函数，如 pink green.sunburst')
+    parser.add_argument('--json', dest='output', help='把结果写入 JSON 文件')
+    args = parser.parse_args(argv)
+    # data_store 在导入时读取这些环境变量
+    if args.data:
+        os.environ['DATA_DIR'] = os.path.abspath(args.data)
+    os.environ.setdefault('DATA_STORE_CHECK_INTERVAL', '0')
+    result = run(args.repeat, args.only)
+    report(result)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as fh:
+            json.dump(result, fh, ensure_ascii=False, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,335 @@
+"""
+并发压测 / 长稳测试：模拟多个同时打开看板的用户，按配置的比例请求各接口，
+报告吞吐、各接口 p50 / p95 / p99 延迟、错误率以及进程 RSS 随时间的变化。
+
+    python -m benchmarks.load                                       # 进程内启动服务，32 个客户端跑 30 秒
+    python -m benchmarks.load --clients 64 --duration 600 --interval 30 --json soak.json
+    python -m benchmarks.load --data /tmp/bench-data --mix pink=1,tracker=3
+    python -m benchmarks.load --url http://127.0.0.1:5000 --pid 12345   # 压测已启动的服务（--pid 用于读取其 RSS）
+
+* 进程内模式用 werkzeug 的多线程服务器在随机端口启动 app.py 中的应用，客户端与服务端共享 GIL，
+  绝对数值偏保守；需要准确的吞吐时请单独启动服务（python app.py / uvicorn asgi:application）并用 --url。
+* 每个客户端一个长连接，请求之间可用 --think 加入间隔；班级、学生、专业从 /api/students 与 JSONP 接口中随机选取。
+* 状态码 >= 400 或连接异常记为错误。全程不访问外网，可直接使用自带数据或 benchmarks.synthetic 生成的数据。
+"""
+import argparse
+import http.client
+import json
+import math
+import os
+import random
+import statistics
+import sys
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import quote, urlsplit
+
+# 接口组 -> (名称, 路径模板)；{class} / {student} / {major} 在每次请求时随机替换
+MIX_GROUPS: Dict[str, List[Tuple[str, str]]] = {
+    'pink': [
+        ('pink.heatmap', '/api/pink/heatmap'),
+        ('pink.bubbles', '/api/pink/bubbles'),
+        ('pink.state_trends', '/api/pink/state-trends?class={class}&granularity=week'),
+    ],
+    'green': [
+        ('green.sunburst', '/api/green/top/sunburst?class={class}&student_ID={student}'),
+        ('green.sunburst_batch', '/api/green/top/sunburst/batch?class={class}'),
+    ],
+    'students': [
+        ('students', '/api/students'),
+        ('students.by_major', '/api/students/{major}'),
+    ],
+    'tracker': [
+        ('tracker', '/hybridaction/zybTrackerStatisticsAction?__callback__=cb&data={tracker}'),
+    ],
+}
+DEFAULT_MIX = 'pink=3,green=2,students=2,tracker=3'
+
+
+def parse_mix(text: str) -> List[Tuple[float, str, str]]:
+    """'pink=3,tracker=1' -> [(权重, 名称, 模板), ...]，组内各接口平分该组的权重。"""
+    mix = []
+    for part in text.split(','):
+        group, _, weight = part.partition('=')
+        group = group.strip()
+        if group not in MIX_GROUPS:
+            raise ValueError(f"未知的接口组: {group}（可选 {' / '.join(MIX_GROUPS)}）")
+        endpoints = MIX_GROUPS[group]
+        for name, template in endpoints:
+            mix.append((float(weight or 1) / len(endpoints), name, template))
+    return mix
+
+
+def rss_mb(pid: Optional[int] = None) -> Optional[float]:
+    """读取 /proc/<pid>/status 中的 VmRSS（MB）；不支持时返回 None。"""
+    try:
+        with open(f"/proc/{pid or 'self'}/status", encoding='ascii') as fh:
+            for line in fh:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        return None
+    return None
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    # nearest-rank
+    rank = max(0, min(len(sorted_values) - 1, math.ceil(q / 100 * len(sorted_values)) - 1))
+    return sorted_values[rank]
+
+
+def _summary(samples: List[float], errors: int, seconds: float) -> Dict[str, Any]:
+    ordered = sorted(samples)
+    count = len(ordered)
+    return {
+        'requests': count,
+        'errors': errors,
+        'error_rate': round(errors / count, 4) if count else 0.0,
+        'rps': round(count / seconds, 2) if seconds else 0.0,
+        'p50_ms': round(percentile(ordered, 50), 2),
+        'p95_ms': round(percentile(ordered, 95), 2),
+        'p99_ms': round(percentile(ordered, 99), 2),
+        'max_ms': round(ordered[-1], 2) if ordered else 0.0,
+        'mean_ms': round(statistics.fmean(ordered), 2) if ordered else 0.0,
+    }
+
+
+class Recorder:
+    """收集每个请求的 (接口, 耗时, 是否出错)，并按时间窗口汇总。"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.samples: Dict[str, List[float]] = {}
+            self.errors: Dict[str, int] = {}
+            self._window: List[Tuple[float, bool]] = []
+
+    def add(self, name: str, elapsed_ms: float, failed: bool) -> None:
+        with self._lock:
+            self.samples.setdefault(name, []).append(elapsed_ms)
+            if failed:
+                self.errors[name] = self.errors.get(name, 0) + 1
+            self._window.append((elapsed_ms, failed))
+
+    def take_window(self) -> List[Tuple[float, bool]]:
+        with self._lock:
+            window, self._window = self._window, []
+        return window
+
+
+class Client(threading.Thread):
+    def __init__(self, host: str, port: int, mix: List[Tuple[float, str, str]], subjects: Dict[str, List[str]],
+                 recorder: Recorder, stop: threading.Event, think: float, gzip: bool, seed: int):
+        super().__init__(daemon=True)
+        self.host = host
+        self.port = port
+        self.mix = mix
+        self.subjects = subjects
+        self.recorder = recorder
+        self.stop = stop
+        self.think = think
+        self.headers = {'Accept-Encoding': 'gzip'} if gzip else {}
+        self.random = random.Random(seed)
+        self.connection: Optional[http.client.HTTPConnection] = None
+
+    def _path(self, template: str) -> str:
+        student = self.random.choice(self.subjects['students'])
+        klass = self.random.choice(self.subjects['classes'])
+        tracker = json.dumps({'class': klass, 'student_ID': student})
+        return template.format(**{
+            'class': quote(klass),
+            'student': quote(student),
+            'major': quote(self.random.choice(self.subjects['majors'])),
+            'tracker': quote(tracker),
+        })
+
+    def _get(self, path: str) -> int:
+        if self.connection is None:
+            self.connection = http.client.HTTPConnection(self.host, self.port, timeout=60)
+        try:
+            self.connection.request('GET', path, headers=self.headers)
+            response = self.connection.getresponse()
+            response.read()
+            return response.status
+        except (OSError, http.client.HTTPException):
+            self.connection.close()
+            self.connection = None
+            raise
+
+    def run(self) -> None:
+        weights = [weight for weight, _, _ in self.mix]
+        while not self.stop.is_set():
+            _, name, template = self.random.choices(self.mix, weights=weights)[0]
+            path = self._path(template)
+            started = time.perf_counter()
+            try:
+                failed = self._get(path) >= 400
+            except (OSError, http.client.HTTPException):
+                failed = True
+            self.recorder.add(name, (time.perf_counter() - started) * 1000, failed)
+            if self.think:
+                self.stop.wait(self.random.uniform(0, 2 * self.think))
+        if self.connection is not None:
+            self.connection.close()
+
+
+def discover_subjects(host: str, port: int) -> Dict[str, List[str]]:
+    """通过接口取得可用的班级、学生与专业。"""
+    connection = http.client.HTTPConnection(host, port, timeout=300)
+
+    def get_json(path: str) -> Any:
+        connection.request('GET', path)
+        response = connection.getresponse()
+        body = response.read()
+        if response.status != 200:
+            raise RuntimeError(f'{path} 返回 {response.status}')
+        return json.loads(body)
+
+    students = get_json('/api/students')
+    # available.students 为有掌握度数据的学生，旭日图等接口只对这些学生有数据
+    data = quote(json.dumps({'sections': ['available']}))
+    available = get_json(f'/hybridaction/zybTrackerStatisticsAction?data={data}')['available']
+    connection.close()
+    subjects = {
+        'students': [str(sid) for sid in available['students']],
+        'majors': sorted({str(row['major']) for row in students if row.get('major') is not None}),
+        'classes': [str(name) for name in available['classes']],
+    }
+    if not all(subjects.values()):
+        raise RuntimeError('数据中没有可用的班级 / 学生 / 专业')
+    return subjects
+
+
+def start_server() -> Tuple[Any, int]:
+    """在当前进程的后台线程中启动 app.py 的应用，返回 (server, 端口)。"""
+    from werkzeug.serving import WSGIRequestHandler, make_server
+
+    import data_store
+    from app import app
+
+    class QuietHandler(WSGIRequestHandler):
+        def log_request(self, *args: Any, **kwargs: Any) -> None:
+            pass
+
+    data_store.registry.preload()
+    server = make_server('127.0.0.1', 0, app, threaded=True, request_handler=QuietHandler)
+    threading.Thread(target=server.serve_forever, name='load-server', daemon=True).start()
+    return server, server.server_port
+
+
+def run(url: Optional[str], clients: int, duration: float, interval: float, mix: List[Tuple[float, str, str]],
+        think: float = 0.0, gzip: bool = True, pid: Optional[int] = None, warmup: float = 0.0,
+        seed: int = 0) -> Dict[str, Any]:
+    server = None
+    if url:
+        parts = urlsplit(url)
+        host, port = parts.hostname or '127.0.0.1', parts.port or 80
+    else:
+        server, port = start_server()
+        host = '127.0.0.1'
+    rss_pid = pid if url else None
+    try:
+        subjects = discover_subjects(host, port)
+        recorder = Recorder()
+        stop = threading.Event()
+        workers = [Client(host, port, mix, subjects, recorder, stop, think, gzip, seed + pos) for pos in range(clients)]
+        for worker in workers:
+            worker.start()
+        if warmup > 0:
+            time.sleep(warmup)
+            recorder.reset()
+
+        started = time.perf_counter()
+        rss_start = rss_mb(rss_pid)
+        timeline = []
+        while True:
+            elapsed = time.perf_counter() - started
+            if elapsed >= duration:
+                break
+            time.sleep(min(interval, duration - elapsed))
+            window = recorder.take_window()
+            samples = [ms for ms, _ in window]
+            point = _summary(samples, sum(failed for _, failed in window), interval)
+            point['t'] = round(time.perf_counter() - started, 1)
+            point['rss_mb'] = rss_mb(rss_pid)
+            timeline.append(point)
+            print(f"[{point['t']:>7.1f}s] {point['rps']:>8.1f} req/s  p95 {point['p95_ms']:>8.1f}ms  "
+                  f"errors {point['error_rate']:.2%}  rss {point['rss_mb'] or 0:.0f}MB", file=sys.stderr)
+        stop.set()
+        for worker in workers:
+            worker.join(timeout=60)
+        seconds = time.perf_counter() - started
+    finally:
+        if server is not None:
+            server.shutdown()
+
+    endpoints = {
+        name: _summary(samples, recorder.errors.get(name, 0), seconds)
+        for name, samples in sorted(recorder.samples.items())
+    }
+    every = [ms for samples in recorder.samples.values() for ms in samples]
+    rss_end = rss_mb(rss_pid)
+    return {
+        'target': url or 'in-process',
+        'clients': clients,
+        'duration_s': round(seconds, 1),
+        'think_s': think,
+        'mix': [{'endpoint': name, 'weight': round(weight, 3), 'path': template} for weight, name, template in mix],
+        'total': _summary(every, sum(recorder.errors.values()), seconds),
+        'endpoints': endpoints,
+        'rss_mb': {
+            'start': rss_start,
+            'end': rss_end,
+            'growth': round(rss_end - rss_start, 1) if rss_start is not None and rss_end is not None else None,
+        },
+        'timeline': timeline,
+    }
+
+
+def report(result: Dict[str, Any]) -> None:
+    print(f"{result['target']}  clients={result['clients']}  duration={result['duration_s']}s")
+    print(f"{'endpoint':<24}{'req':>8}{'rps':>9}{'p50':>10}{'p95':>10}{'p99':>10}{'max':>10}{'errors':>9}")
+    rows = list(result['endpoints'].items()) + [('TOTAL', result['total'])]
+    for name, row in rows:
+        print(f"{name:<24}{row['requests']:>8}{row['rps']:>9.1f}{row['p50_ms']:>8.1f}ms{row['p95_ms']:>8.1f}ms"
+              f"{row['p99_ms']:>8.1f}ms{row['max_ms']:>8.1f}ms{row['error_rate']:>9.2%}")
+    rss = result['rss_mb']
+    if rss['start'] is not None:
+        print(f"RSS: {rss['start']:.0f}MB -> {rss['end']:.0f}MB ({rss['growth']:+.1f}MB)")
+
+
+def main(argv: List[str]) -> int:
+    parser = argparse.ArgumentParser(description='并发压测 / 长稳测试')
+    parser.add_argument('--url', help='压测已启动的服务，如 http://127.0.0.1:5000；不传时在进程内启动')
+    parser.add_argument('--pid', type=int, help='--url 模式下读取该进程的 RSS')
+    parser.add_argument('--data', help='进程内模式使用的数据目录（等同环境变量 DATA_DIR）')
+    parser.add_argument('--clients', type=int, default=32)
+    parser.add_argument('--duration', type=float, default=30, help='持续秒数')
+    parser.add_argument('--interval', type=float, default=5, help='时间线的采样间隔（秒）')
+    parser.add_argument('--warmup', type=float, default=0, help='正式计时前的预热秒数，不计入结果')
+    parser.add_argument('--think', type=float, default=0, help='每个客户端两次请求之间的平均间隔（秒）')
+    parser.add_argument('--mix', default=DEFAULT_MIX, help=f'接口组权重，默认 {DEFAULT_MIX}')
+    parser.add_argument('--no-gzip', dest='gzip', action='store_false', help='不发送 Accept-Encoding: gzip')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', dest='output', help='把结果写入 JSON 文件')
+    args = parser.parse_args(argv)
+    if args.data:
+        os.environ['DATA_DIR'] = os.path.abspath(args.data)
+    os.environ.setdefault('DATA_STORE_CHECK_INTERVAL', '0')
+    result = run(args.url, args.clients, args.duration, args.interval, parse_mix(args.mix),
+                 think=args.think, gzip=args.gzip, pid=args.pid, warmup=args.warmup, seed=args.seed)
+    report(result)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as fh:
+            json.dump(result, fh, ensure_ascii=False, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
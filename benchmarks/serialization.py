@@ -0,0 +1,135 @@
+"""
+序列化基准：对比各接口在不同 JSON 序列化方式下的耗时。
+
+    python -m benchmarks.serialization              # 默认每个接口重复 20 次
+    python -m benchmarks.serialization --repeat 50 --json result.json
+
+对比的方式：
+    flask   旧实现：Flask 默认的 JSON provider、DataFrame.to_dict('records')、JSONP 直接 json.dumps
+    json    serializer.py 的标准库路径
+    orjson  serializer.py 的 orjson 路径（未安装 orjson 时跳过）
+另外单独对比 DataFrame.to_dict('records') 与 serializer.records() 的耗时。
+每次请求前清空响应缓存，测的是完整的构建 + 序列化耗时。
+"""
+import argparse
+import json
+import statistics
+import sys
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List
+
+from flask import Response
+from flask.json.provider import DefaultJSONProvider
+
+ENDPOINTS = [
+    '/api/students',
+    '/api/class-data/Class1',
+    '/api/pink/heatmap',
+    '/api/pink/bubbles',
+    '/api/pink/state-trends',
+    '/api/green/top/sunburst/batch?class=Class1',
+    '/hybridaction/zybTrackerStatisticsAction?data=%7B%22class%22%3A%22Class1%22%7D',
+    '/hybridaction/zybTrackerStatisticsAction?__callback__=cb&data=%7B%22class%22%3A%22Class1%22%7D',
+]
+FRAMES = ['student_info', 'class_title_mastery', 'class_knowledge_mastery', 'major_title_mastery']
+
+
+def _median_ms(fn: Callable[[], Any], repeat: int) -> float:
+    fn()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+@contextmanager
+def _baseline(app) -> Iterator[None]:
+    """临时换回引入 serializer.py 之前的编码路径，结束后恢复。"""
+    import serializer
+
+    def to_dict_records(frame):
+        return frame.to_dict('records')
+
+    def jsonp(callback: str, obj: Any) -> Response:
+        return Response(f"{callback}({json.dumps(obj, ensure_ascii=False)})", mimetype='application/javascript')
+
+    provider, records, dumps_jsonp = app.json, serializer.records, serializer.jsonp
+    app.json, serializer.records, serializer.jsonp = DefaultJSONProvider(app), to_dict_records, jsonp
+    try:
+        yield
+    finally:
+        app.json, serializer.records, serializer.jsonp = provider, records, dumps_jsonp
+
+
+def run(repeat: int) -> Dict[str, Any]:
+    import data_store
+    import response_cache
+    import serializer
+    from app import app
+
+    data_store.registry.preload()
+    client = app.test_client()
+    modes = ['flask', 'json'] + (['orjson'] if serializer.orjson is not None else [])
+
+    def request(url: str) -> None:
+        response_cache.cache.clear()
+        response = client.get(url)
+        assert response.status_code == 200, (url, response.status_code)
+
+    endpoints: List[Dict[str, Any]] = []
+    for url in ENDPOINTS:
+        row: Dict[str, Any] = {'endpoint': url}
+        for mode in modes:
+            if mode == 'flask':
+                with _baseline(app):
+                    row[mode] = _median_ms(lambda: request(url), repeat)
+                continue
+            serializer.use(mode)
+            row[mode] = _median_ms(lambda: request(url), repeat)
+        endpoints.append(row)
+    serializer.use()
+
+    frames = []
+    for name in FRAMES:
+        frame = data_store.get(name)
+        frames.append({
+            'dataset': name,
+            'rows': len(frame),
+            'to_dict': _median_ms(lambda: frame.to_dict('records'), repeat),
+            'records': _median_ms(lambda: serializer.records(frame), repeat),
+        })
+    return {'repeat': repeat, 'modes': modes, 'endpoints': endpoints, 'frames': frames}
+
+
+def report(result: Dict[str, Any]) -> None:
+    modes = result['modes']
+    print(f"{'endpoint':<60}" + ''.join(f'{mode:>10}' for mode in modes) + f"{'speedup':>10}")
+    for row in result['endpoints']:
+        best = min(row[mode] for mode in modes[1:])
+        print(f"{row['endpoint'][:60]:<60}" + ''.join(f'{row[mode]:>9.2f}ms' for mode in modes)
+              + f"{row['flask'] / best:>9.2f}x")
+    print()
+    print(f"{'dataset':<30}{'rows':>8}{'to_dict':>12}{'records':>12}{'speedup':>10}")
+    for row in result['frames']:
+        print(f"{row['dataset']:<30}{row['rows']:>8}{row['to_dict']:>10.2f}ms{row['records']:>10.2f}ms"
+              f"{row['to_dict'] / row['records']:>9.2f}x")
+
+
+def main(argv: List[str]) -> int:
+    parser = argparse.ArgumentParser(description='JSON 序列化基准')
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--json', dest='output', help='把结果写入 JSON 文件')
+    args = parser.parse_args(argv)
+    result = run(args.repeat)
+    report(result)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as fh:
+            json.dump(result, fh, ensure_ascii=False, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,125 @@
+"""
+改为按分组偏移构建之前的旭日图构建（逐层布尔筛选 + iterrows），从当时的 green_topViews.py 原样复制，不作修改：
+基准中的 green.sunburst.reference 与 green.sunburst 比较耗时，tests/test_sunburst.py 检查两者输出相同。
+"""
+import pandas as pd
+from typing import Dict, Any, List
+
+import data_store
+
+
+def load_title_info() -> pd.DataFrame:
+    return data_store.get('title_info')[['title_ID', 'knowledge', 'sub_knowledge']].drop_duplicates()
+
+
+def load_individual_title_mastery() -> pd.DataFrame:
+    return data_store.get('individual_title_mastery')
+
+
+def load_individual_sub_mastery() -> pd.DataFrame:
+    return data_store.get('individual_sub_knowledge_mastery')
+
+
+def _split_knowledge(sub_code: str) -> str:
+    if not isinstance(sub_code, str):
+        return ''
+    return sub_code.split('_')[0]
+
+
+def build_sunburst_payload(class_name: str, student_id: str) -> Dict[str, Any]:
+    title_info = load_title_info()
+    title_mastery = load_individual_title_mastery()
+    student_titles = title_mastery[title_mastery['student_ID'] == student_id].copy()
+    if student_titles.empty:
+        raise ValueError('未找到该学生的题目掌握数据')
+    student_titles = student_titles.merge(title_info, on='title_ID', how='left')
+
+    sub_mastery = load_individual_sub_mastery()
+    student_sub = sub_mastery[sub_mastery['student_ID'] == student_id].copy()
+    student_sub['knowledge'] = student_sub['sub_knowledge'].apply(_split_knowledge)
+
+    knowledge_from_titles = (
+        student_titles.groupby('knowledge')['title_mastery_score']
+        .mean()
+        .dropna()
+        .to_dict()
+    )
+    knowledge_from_sub = (
+        student_sub.groupby('knowledge')['knowledge_mastery_score']
+        .mean()
+        .dropna()
+        .to_dict()
+        if not student_sub.empty else {}
+    )
+
+    knowledge_keys = set(knowledge_from_titles.keys()) | set(knowledge_from_sub.keys())
+
+    hierarchy_children: List[Dict[str, Any]] = []
+    for knowledge in sorted(knowledge_keys):
+        knowledge_mastery = knowledge_from_sub.get(
+            knowledge,
+            knowledge_from_titles.get(knowledge, 0.0)
+        )
+        knowledge_node = {
+            'name': knowledge,
+            'mastery': round(float(knowledge_mastery), 4) if pd.notna(knowledge_mastery) else None,
+            'children': [],
+            'value': 0
+        }
+
+        sub_rows = student_sub[student_sub['knowledge'] == knowledge]
+        if sub_rows.empty:
+            sub_rows = pd.DataFrame()
+
+        for _, sub_row in sub_rows.iterrows():
+            sub_code = sub_row['sub_knowledge']
+            sub_node = {
+                'name': sub_code,
+                'mastery': round(float(sub_row['knowledge_mastery_score']), 4),
+                'children': [],
+                'value': 0
+            }
+            question_rows = student_titles[student_titles['sub_knowledge'] == sub_code]
+            for _, q_row in question_rows.iterrows():
+                sub_node['children'].append({
+                    'name': q_row['title_ID'],
+                    'mastery': round(float(q_row['title_mastery_score']), 4),
+                    'value': 1
+                })
+            if not sub_node['children']:
+                # fallback: attach questions by knowledge only
+                fallback_rows = student_titles[student_titles['knowledge'] == knowledge]
+                for _, q_row in fallback_rows.iterrows():
+                    sub_node['children'].append({
+                        'name': q_row['title_ID'],
+                        'mastery': round(float(q_row['title_mastery_score']), 4),
+                        'value': 1
+                    })
+                    sub_node['value'] += 1
+                if not fallback_rows.empty:
+                    knowledge_node['value'] += len(fallback_rows)
+            else:
+                sub_node['value'] = len(sub_node['children'])
+                knowledge_node['value'] += sub_node['value']
+            knowledge_node['children'].append(sub_node)
+
+        if not knowledge_node['children']:
+            question_rows = student_titles[student_titles['knowledge'] == knowledge]
+            for _, q_row in question_rows.iterrows():
+                knowledge_node['children'].append({
+                    'name': q_row['title_ID'],
+                    'mastery': round(float(q_row['title_mastery_score']), 4),
+                    'value': 1
+                })
+                knowledge_node['value'] += 1
+
+        hierarchy_children.append(knowledge_node)
+
+    return {
+        'class': class_name,
+        'student': student_id,
+        'sunburst': {
+            'name': '知识体系',
+            'children': hierarchy_children
+        }
+    }
@@ -0,0 +1,197 @@
+"""
+合成数据：按指定规模生成与 data/ 目录结构、列名一致的数据，用于基准测试。
+
+    python -m benchmarks.synthetic /tmp/bench-data                                  # 1 万学生，100 万条记录
+    python -m benchmarks.synthetic /tmp/bench-data --students 100000 --records 50000000 --classes 60
+
+生成的文件：
+    Data_SubmitRecord/SubmitRecord-Class<N>.csv   每个班级一个文件，分块写入，内存占用与记录总数无关
+    Data_StudentInfo.csv、Data_TitleInfo.csv
+    mastery/*.csv                                 由 mastery.py 从生成的记录计算；--no-mastery 时跳过
+                                                  （服务端以 MASTERY_SOURCE=engine 现算）
+状态、得分、内存、耗时的分布参照仓库自带数据；参数与 --seed 相同时生成的数据完全相同。
+生成后用 DATA_DIR=<目录> 启动服务或运行 benchmarks.builders。
+"""
+import argparse
+import json
+import os
+import string
+import sys
+import time
+from typing import Any, Dict, List
+
+import numpy as np
+import pandas as pd
+
+# 状态分布（参照仓库自带数据）
+STATE_WEIGHTS = {
+    'Absolutely_Correct': 0.25, 'Error1': 0.222, 'Absolutely_Error': 0.2, 'Partially_Correct': 0.172,
+    'Error2': 0.081, 'Error3': 0.031, 'Error4': 0.026, 'Error5': 0.011, 'Error6': 0.004,
+    'Error7': 0.002, 'Error8': 0.0008, 'Error9': 0.0002,
+}
+TITLE_SCORES = [1, 2, 3, 3, 3, 4]
+METHODS_PER_TITLE = 5
+TIME_RANGE = (1693471583, 1706158726)
+CHUNK_ROWS = 1_000_000
+
+_ALNUM = np.array(list(string.ascii_letters + string.digits))
+_HEX = np.array(list('0123456789abcdef'))
+_LOWER = np.array(list(string.ascii_lowercase + string.digits))
+
+
+def _random_ids(rng: np.random.Generator, count: int, alphabet: np.ndarray, length: int, prefix: str = '') -> List[str]:
+    """生成 count 个互不相同的随机 ID。"""
+    ids: List[str] = []
+    seen = set()
+    while len(ids) < count:
+        chars = alphabet[rng.integers(0, len(alphabet), size=(count - len(ids), length))]
+        for row in chars:
+            value = prefix + ''.join(row)
+            if value not in seen:
+                seen.add(value)
+                ids.append(value)
+    return ids
+
+
+def make_title_info(rng: np.random.Generator, titles: int) -> pd.DataFrame:
+    """每道题属于一个知识点下的 1～2 个子知识点（与自带数据一样，同一题目可出现多行）。"""
+    knowledge = _random_ids(rng, max(1, titles // 5), _ALNUM, 5)
+    subs = {k: [f'{k}_{s}' for s in _random_ids(rng, 2, _LOWER, 8)] for k in knowledge}
+    rows = []
+    for pos, title_id in enumerate(_random_ids(rng, titles, _ALNUM, 20, 'Question_')):
+        k = knowledge[pos % len(knowledge)]
+        score = int(rng.choice(TITLE_SCORES))
+        for sub in subs[k][:int(rng.integers(1, 3))]:
+            rows.append((title_id, score, k, sub))
+    frame = pd.DataFrame(rows, columns=['title_ID', 'score', 'knowledge', 'sub_knowledge'])
+    frame.insert(0, 'index', np.arange(1, len(frame) + 1))
+    return frame
+
+
+def make_student_info(rng: np.random.Generator, students: int, majors: int) -> pd.DataFrame:
+    major_ids = [f'J{value}' for value in rng.choice(np.arange(10000, 100000), size=majors, replace=False)]
+    return pd.DataFrame({
+        'index': np.arange(1, students + 1),
+        'student_ID': _random_ids(rng, students, _HEX, 20),
+        'sex': rng.choice(['female', 'male'], size=students),
+        'age': rng.integers(18, 25, size=students),
+        'major': rng.choice(major_ids, size=students),
+    })
+
+
+def _record_chunk(rng: np.random.Generator, size: int, start: int, class_name: str, students: np.ndarray,
+                  title_ids: np.ndarray, title_scores: np.ndarray, methods: np.ndarray) -> pd.DataFrame:
+    states = np.array(list(STATE_WEIGHTS))
+    weights = np.array(list(STATE_WEIGHTS.values()))
+    state = states[rng.choice(len(states), size=size, p=weights / weights.sum())]
+    title = rng.integers(0, len(title_ids), size=size)
+    full = title_scores[title]
+    score = np.where(state == 'Absolutely_Correct', full, 0)
+    partial = state == 'Partially_Correct'
+    score[partial] = rng.integers(0, np.maximum(full[partial], 1))
+    # 约 15% 的错误提交没有运行结果（内存为 0）
+    failed = (score == 0) & (rng.random(size) < 0.15)
+    memory = np.where(failed, 0, np.clip(rng.normal(324, 60, size=size), 100, 65536).round())
+    return pd.DataFrame({
+        'index': np.arange(start, start + size),
+        'class': class_name,
+        'time': rng.integers(*TIME_RANGE, size=size).astype('float64'),
+        'state': state,
+        'score': score,
+        'title_ID': title_ids[title],
+        'method': methods[title, rng.integers(0, METHODS_PER_TITLE, size=size)],
+        'memory': memory.astype('int64'),
+        'timeconsume': rng.integers(1, 11, size=size),
+        'student_ID': students[rng.integers(0, len(students), size=size)],
+    })
+
+
+def generate(out_dir: str, students: int = 10_000, records: int = 1_000_000, classes: int = 15,
+             titles: int = 43, majors: int = 5, seed: int = 0, with_mastery: bool = True) -> Dict[str, Any]:
+    """生成全部文件，返回生成参数与各部分行数（同时写入 <out_dir>/synthetic.json）。"""
+    rng = np.random.default_rng(seed)
+    record_dir = os.path.join(out_dir, 'Data_SubmitRecord')
+    os.makedirs(record_dir, exist_ok=True)
+    started = time.perf_counter()
+
+    title_info = make_title_info(rng, titles)
+    title_info.to_csv(os.path.join(out_dir, 'Data_TitleInfo.csv'), index=False)
+    student_info = make_student_info(rng, students, majors)
+    student_info.to_csv(os.path.join(out_dir, 'Data_StudentInfo.csv'), index=False)
+
+    unique_titles = title_info.drop_duplicates('title_ID')
+    title_ids = unique_titles['title_ID'].to_numpy()
+    title_scores = unique_titles['score'].to_numpy()
+    methods = np.array(_random_ids(rng, len(title_ids) * METHODS_PER_TITLE, _ALNUM, 20, 'Method_'),
+                       dtype=object).reshape(len(title_ids), METHODS_PER_TITLE)
+
+    # 学生随机分到各班级，记录数按班级人数分配
+    class_of = rng.integers(0, classes, size=students)
+    student_ids = student_info['student_ID'].to_numpy()
+    total = 0
+    for pos in range(classes):
+        members = student_ids[class_of == pos]
+        if not len(members):
+            continue
+        count = records * len(members) // students
+        path = os.path.join(record_dir, f'SubmitRecord-Class{pos + 1}.csv')
+        with open(path, 'w', encoding='utf-8', newline='') as fh:
+            for start in range(0, max(count, 1), CHUNK_ROWS):
+                size = min(CHUNK_ROWS, count - start)
+                chunk = _record_chunk(rng, size, start, f'Class{pos + 1}', members, title_ids, title_scores, methods)
+                chunk.to_csv(fh, header=start == 0, index=False)
+        total += count
+
+    summary = {
+        'seed': seed,
+        'students': students,
+        'records': total,
+        'classes': classes,
+        'titles': len(title_ids),
+        'majors': majors,
+        'mastery': with_mastery,
+    }
+    if with_mastery:
+        summary['mastery_rows'] = write_mastery(out_dir, title_info, student_info)
+    summary['seconds'] = round(time.perf_counter() - started, 2)
+    with open(os.path.join(out_dir, 'synthetic.json'), 'w', encoding='utf-8') as fh:
+        json.dump(summary, fh, ensure_ascii=False, indent=2)
+    return summary
+
+
+def write_mastery(out_dir: str, title_info: pd.DataFrame, student_info: pd.DataFrame) -> Dict[str, int]:
+    """用 mastery.py 从生成的提交记录计算全部掌握度表。"""
+    import glob
+
+    import data_store
+    import mastery
+
+    files = sorted(glob.glob(os.path.join(out_dir, 'Data_SubmitRecord', 'SubmitRecord-Class*.csv')))
+    records = data_store.concat_submit_records([data_store.read_submit_record_file(path) for path in files])
+    tables = mastery.compute_all(records, title_info.drop(columns='index'), student_info)
+    mastery_dir = os.path.join(out_dir, 'mastery')
+    os.makedirs(mastery_dir, exist_ok=True)
+    for name, table in tables.items():
+        table.to_csv(os.path.join(mastery_dir, f'{name}.csv'), index=False, encoding='utf-8-sig')
+    return {name: len(table) for name, table in tables.items()}
+
+
+def main(argv: List[str]) -> int:
+    parser = argparse.ArgumentParser(description='生成基准测试用的合成数据')
+    parser.add_argument('out_dir')
+    parser.add_argument('--students', type=int, default=10_000)
+    parser.add_argument('--records', type=int, default=1_000_000)
+    parser.add_argument('--classes', type=int, default=15)
+    parser.add_argument('--titles', type=int, default=43)
+    parser.add_argument('--majors', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--no-mastery', dest='mastery', action='store_false', help='不生成 mastery/*.csv')
+    args = parser.parse_args(argv)
+    summary = generate(args.out_dir, args.students, args.records, args.classes, args.titles,
+                       args.majors, args.seed, args.mastery)
+    print(json.dumps(summary, ensure_ascii=False, indent=2))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
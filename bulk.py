@@ -0,0 +1,129 @@
+"""
+批量查询：一次请求取多个学生 / 班级的多个视图，代替逐个调用 /api/student-data、旭日图与 JSONP 接口。
+
+每张表只做一次 gather：所有请求的键交给 SortedIndex.take() 一次取出，整体序列化一次，再按各键的行数切分，
+因此 10 个学生与 1 个学生的开销相近。
+"""
+from typing import Any, Callable, Dict, List, Optional
+
+from flask import Blueprint, jsonify, request
+
+import data_store
+import metrics
+import serializer
+from green_topViews import build_sunburst_trees
+
+bulk_bp = Blueprint('bulk', __name__, url_prefix='/api/bulk')
+
+MAX_KEYS = 500
+# 视图 -> 掌握度表（学生按 student_ID、班级按 class 取）；profile、sunburst、students 单独处理
+STUDENT_TABLES = {
+    'titles': 'individual_title_mastery',
+    'knowledge': 'individual_knowledge_mastery',
+    'subKnowledge': 'individual_sub_knowledge_mastery',
+}
+CLASS_TABLES = {
+    'titles': 'class_title_mastery',
+    'knowledge': 'class_knowledge_mastery',
+}
+STUDENT_VIEWS = ('profile', *STUDENT_TABLES, 'sunburst')
+CLASS_VIEWS = (*CLASS_TABLES, 'students')
+# 不指定 views 时返回的视图（旭日图较重，需要显式请求）
+DEFAULT_VIEWS = ('profile', 'titles', 'knowledge', 'subKnowledge', 'students')
+
+
+def _gather(dataset: str, key: str, values: List[str]) -> Dict[str, List[Dict[str, Any]]]:
+    """一次取出多个键的行并序列化，返回 键 -> 记录列表（没有数据的键为空列表）。"""
+    index = data_store.index(dataset, key)
+    records = serializer.records(index.take(values))
+    result: Dict[str, List[Dict[str, Any]]] = {}
+    position = 0
+    for value in values:
+        start, stop = index.bounds(value)
+        result[value] = records[position:position + stop - start]
+        position += stop - start
+    return result
+
+
+def _student_views(student_ids: List[str], views: List[str]) -> Dict[str, Dict[str, Any]]:
+    builders: Dict[str, Callable[[], Dict[str, Any]]] = {
+        'profile': lambda: data_store.get('student_directory').find(student_ids),
+        'sunburst': lambda: build_sunburst_trees(student_ids),
+        **{view: (lambda table=table: _gather(table, 'student_ID', student_ids))
+           for view, table in STUDENT_TABLES.items()},
+    }
+    result: Dict[str, Dict[str, Any]] = {sid: {} for sid in student_ids}
+    for view in STUDENT_VIEWS:
+        if view not in views:
+            continue
+        with metrics.stage(f'bulk.student.{view}'):
+            values = builders[view]()
+        for sid in student_ids:
+            result[sid][view] = values.get(sid, [] if view in STUDENT_TABLES else None)
+    return result
+
+
+def _class_views(class_names: List[str], views: List[str]) -> Dict[str, Dict[str, Any]]:
+    builders: Dict[str, Callable[[], Dict[str, Any]]] = {
+        'students': lambda: {name: data_store.get('class_students').get(name, []) for name in class_names},
+        **{view: (lambda table=table: _gather(table, 'class', class_names))
+           for view, table in CLASS_TABLES.items()},
+    }
+    result: Dict[str, Dict[str, Any]] = {name: {} for name in class_names}
+    for view in CLASS_VIEWS:
+        if view not in views:
+            continue
+        with metrics.stage(f'bulk.class.{view}'):
+            values = builders[view]()
+        for name in class_names:
+            value = values[name]
+            result[name][view] = value.tolist() if hasattr(value, 'tolist') else value
+    return result
+
+
+def build_bulk_payload(student_ids: List[str], class_names: List[str],
+                       views: Optional[List[str]] = None) -> Dict[str, Any]:
+    views = list(views or DEFAULT_VIEWS)
+    return {
+        'views': views,
+        'students': _student_views(student_ids, views) if student_ids else {},
+        'classes': _class_views(class_names, views) if class_names else {},
+    }
+
+
+def _list_param(body: Dict[str, Any], name: str) -> List[str]:
+    """JSON 中的列表或逗号分隔字符串，以及 query 中重复或逗号分隔的参数；去重并保持顺序。"""
+    value = body.get(name) if name in body else request.args.getlist(name)
+    if isinstance(value, str):
+        value = [value]
+    if not isinstance(value, list):
+        raise ValueError(f'{name} 必须是列表')
+    items = []
+    for item in value:
+        items.extend(part.strip() for part in str(item).split(','))
+    return list(dict.fromkeys(item for item in items if item))
+
+
+@bulk_bp.route('', methods=['GET', 'POST'])
+def get_bulk():
+    """
+    批量查询学生 / 班级视图
+    参数（POST JSON 或 GET query）: students、classes（student_ID / 班级列表，各最多 500 个）,
+    views（profile / titles / knowledge / subKnowledge / sunburst / students，默认除 sunburst 外全部）
+    """
+    try:
+        body = request.get_json(silent=True) if request.method == 'POST' else None
+        body = body if isinstance(body, dict) else {}
+        student_ids = _list_param(body, 'students')
+        class_names = _list_param(body, 'classes')
+        views = _list_param(body, 'views') or list(DEFAULT_VIEWS)
+        unknown = [view for view in views if view not in STUDENT_VIEWS and view not in CLASS_VIEWS]
+        if unknown:
+            raise ValueError(f"未知的视图: {', '.join(unknown)}")
+        if not student_ids and not class_names:
+            raise ValueError('需要提供 students 或 classes')
+        if len(student_ids) > MAX_KEYS or len(class_names) > MAX_KEYS:
+            raise ValueError(f'students 与 classes 各最多 {MAX_KEYS} 个')
+        return jsonify(build_bulk_payload(student_ids, class_names, views))
+    except ValueError as exc:
+        return jsonify({'error': str(exc)}), 400
@@ -0,0 +1,167 @@
+"""
+列式二进制快照：把提交记录、mastery 等大表按列存成 NumPy .npy 文件，启动/重载时以 mmap 方式读取，
+避免每次都完整解析 CSV。
+
+目录结构（默认位于 data/.columnar/）：
+    <dataset>/manifest.json      列清单、行数、生成快照时源文件的 mtime/size 指纹
+    <dataset>/<column>.npy       数值列
+    <dataset>/<column>.codes.npy 字符串 / category 列的字典编码（缺失值为 -1）
+    <dataset>/<column>.dict.npy  对应的字典
+
+用法：
+    python columnar.py build            # 为所有支持快照的数据集生成快照
+    python columnar.py build submit_records
+    python columnar.py status
+"""
+import json
+import os
+import shutil
+import sys
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+FORMAT_VERSION = 2
+MANIFEST_FILE = 'manifest.json'
+
+
+def _relative_fingerprint(fingerprint: Optional[Tuple], base_dir: str) -> Optional[List[List[Any]]]:
+    if fingerprint is None:
+        return None
+    return [[os.path.relpath(path, base_dir), mtime, size] for path, mtime, size in fingerprint]
+
+
+def write(frame: pd.DataFrame, target_dir: str, fingerprint: Optional[Tuple], base_dir: str) -> Dict[str, Any]:
+    """把 frame 写成列式快照；先写临时目录再替换，读取方不会看到写了一半的快照。"""
+    parent = os.path.dirname(target_dir)
+    os.makedirs(parent, exist_ok=True)
+    tmp_dir = f'{target_dir}.tmp-{os.getpid()}'
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+
+    columns = []
+    for idx, name in enumerate(frame.columns):
+        series = frame[name]
+        stem = f'{idx:03d}'
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            np.save(os.path.join(tmp_dir, f'{stem}.codes.npy'), series.cat.codes.to_numpy())
+            np.save(os.path.join(tmp_dir, f'{stem}.dict.npy'), np.asarray(series.cat.categories, dtype=str))
+            columns.append({
+                'name': name,
+                'kind': 'category',
+                'codes': f'{stem}.codes.npy',
+                'dictionary': f'{stem}.dict.npy',
+            })
+        elif pd.api.types.is_numeric_dtype(series.dtype) or pd.api.types.is_bool_dtype(series.dtype):
+            np.save(os.path.join(tmp_dir, f'{stem}.npy'), series.to_numpy())
+            columns.append({'name': name, 'kind': 'numeric', 'dtype': str(series.dtype), 'file': f'{stem}.npy'})
+        else:
+            codes, uniques = pd.factorize(series, use_na_sentinel=True)
+            np.save(os.path.join(tmp_dir, f'{stem}.codes.npy'), codes.astype(np.int32))
+            np.save(os.path.join(tmp_dir, f'{stem}.dict.npy'), np.asarray(uniques, dtype=str))
+            columns.append({
+                'name': name,
+                'kind': 'string',
+                'dtype': str(series.dtype),
+                'codes': f'{stem}.codes.npy',
+                'dictionary': f'{stem}.dict.npy',
+            })
+
+    manifest = {
+        'format_version': FORMAT_VERSION,
+        'rows': int(len(frame)),
+        'columns': columns,
+        'sources': _relative_fingerprint(fingerprint, base_dir),
+    }
+    with open(os.path.join(tmp_dir, MANIFEST_FILE), 'w', encoding='utf-8') as fh:
+        json.dump(manifest, fh, ensure_ascii=False, indent=2)
+
+    old_dir = f'{target_dir}.old-{os.getpid()}'
+    if os.path.exists(target_dir):
+        os.replace(target_dir, old_dir)
+    os.replace(tmp_dir, target_dir)
+    shutil.rmtree(old_dir, ignore_errors=True)
+    return manifest
+
+
+def read_manifest(target_dir: str) -> Optional[Dict[str, Any]]:
+    try:
+        with open(os.path.join(target_dir, MANIFEST_FILE), encoding='utf-8') as fh:
+            manifest = json.load(fh)
+    except (OSError, ValueError):
+        return None
+    if manifest.get('format_version') != FORMAT_VERSION:
+        return None
+    return manifest
+
+
+def is_fresh(manifest: Optional[Dict[str, Any]], fingerprint: Optional[Tuple], base_dir: str) -> bool:
+    if manifest is None or fingerprint is None:
+        return False
+    return manifest.get('sources') == _relative_fingerprint(fingerprint, base_dir)
+
+
+def read(target_dir: str, fingerprint: Optional[Tuple], base_dir: str) -> Optional[pd.DataFrame]:
+    """
+    读取快照；快照不存在、格式不符或源文件指纹已变化（快照过期）时返回 None，由调用方回退到 CSV。
+    数值列直接 mmap，不复制到进程内存。
+    """
+    manifest = read_manifest(target_dir)
+    if not is_fresh(manifest, fingerprint, base_dir):
+        return None
+    return load(target_dir, manifest)
+
+
+def load(target_dir: str, manifest: Optional[Dict[str, Any]] = None) -> Optional[pd.DataFrame]:
+    """不检查源文件指纹直接读取快照（共享数据集由发布方保证一致，见 shared_store.py）；读取失败时返回 None。"""
+    if manifest is None:
+        manifest = read_manifest(target_dir)
+        if manifest is None:
+            return None
+    data = {}
+    try:
+        for column in manifest['columns']:
+            if column['kind'] == 'numeric':
+                data[column['name']] = np.load(os.path.join(target_dir, column['file']), mmap_mode='r')
+                continue
+            codes = np.load(os.path.join(target_dir, column['codes']), mmap_mode='r')
+            dictionary = np.load(os.path.join(target_dir, column['dictionary']))
+            values = pd.Categorical.from_codes(codes, categories=dictionary.tolist(), validate=False)
+            if column['kind'] == 'category':
+                data[column['name']] = values
+            else:
+                data[column['name']] = pd.Series(np.asarray(values, dtype=object), dtype=column['dtype'])
+    except (OSError, ValueError, KeyError):
+        return None
+    return pd.DataFrame(data, index=pd.RangeIndex(manifest['rows']), copy=False)
+
+
+def main(argv: Iterable[str]) -> int:
+    import data_store
+
+    argv = list(argv)
+    command = argv[0] if argv else 'build'
+    names = argv[1:] or data_store.COLUMNAR_DATASETS
+    if command == 'build':
+        for name in names:
+            try:
+                manifest = data_store.build_columnar_snapshot(name)
+            except FileNotFoundError as exc:
+                print(f'{name}: skipped ({exc})')
+                continue
+            print(f"{name}: {manifest['rows']} rows, {len(manifest['columns'])} columns")
+        return 0
+    if command == 'status':
+        for name in names:
+            manifest = read_manifest(data_store.columnar_dir(name))
+            fresh = is_fresh(manifest, data_store.registry.fingerprint(name), data_store.DATA_DIR)
+            state = 'missing' if manifest is None else ('fresh' if fresh else 'stale')
+            print(f'{name}: {state}')
+        return 0
+    print(__doc__)
+    return 2
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,132 @@
+"""
+重计算调度：
+* single-flight：同一个键（接口 + 规范化参数 + 数据版本）同时只有一次计算在进行，并发的相同请求等待并共享这一次的结果；
+* 有界线程池：计算放在固定大小的线程池中执行，正在排队 / 执行的计算数超过上限时直接拒绝（503），
+  等待超过超时时间返回 504（计算本身继续进行，结果仍会写入响应缓存）。
+
+计算在调用方固定的数据 Snapshot 与应用上下文中执行，与在请求线程中直接调用的结果一致。
+"""
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError
+from typing import Any, Callable, Dict, Hashable, Optional
+
+from flask import current_app, has_app_context, jsonify
+
+import data_store
+import metrics
+
+DEFAULT_WORKERS = min(4, os.cpu_count() or 1)
+DEFAULT_MAX_PENDING = 64
+DEFAULT_TIMEOUT = 30.0
+
+
+class ComputeError(RuntimeError):
+    status = 500
+
+
+class Overloaded(ComputeError):
+    """排队的计算已达上限。"""
+    status = 503
+
+
+class ComputeTimeout(ComputeError):
+    """等待计算结果超时。"""
+    status = 504
+
+
+class ComputeScheduler:
+    def __init__(self, max_workers: int = DEFAULT_WORKERS, max_pending: int = DEFAULT_MAX_PENDING,
+                 timeout: float = DEFAULT_TIMEOUT):
+        self.max_workers = max(1, max_workers)
+        self.max_pending = max(self.max_workers, max_pending)
+        self.timeout = timeout
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._inflight: Dict[Hashable, Future] = {}
+        # add_done_callback 在任务已完成时会在持锁的当前线程里同步回调，因此用可重入锁
+        self._lock = threading.RLock()
+        self._local = threading.local()
+        self.coalesced = 0
+        self.rejected = 0
+
+    def _executor(self) -> ThreadPoolExecutor:
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='compute')
+        return self._pool
+
+    @property
+    def pending(self) -> int:
+        return len(self._inflight)
+
+    def _wrap(self, fn: Callable[[], Any]) -> Callable[[], Any]:
+        snapshot = data_store.registry.current()
+        app = current_app._get_current_object() if has_app_context() else None
+        timings = metrics.collector()
+
+        def task() -> Any:
+            self._local.worker = True
+            with data_store.registry.pinned(snapshot), metrics.collecting(timings):
+                if app is None:
+                    return fn()
+                with app.app_context():
+                    return fn()
+        return task
+
+    def run(self, key: Hashable, fn: Callable[[], Any], timeout: Optional[float] = None) -> Any:
+        """
+        执行 fn 并返回结果；同一 key 的并发调用共享一次执行。key 需要包含数据版本。
+        fn 抛出的异常会原样抛给所有等待者。
+        """
+        if getattr(self._local, 'worker', False):
+            # 已经在计算线程中（嵌套调用），直接执行，避免占满线程池后互相等待
+            return fn()
+        with self._lock:
+            future = self._inflight.get(key)
+            if future is not None:
+                self.coalesced += 1
+            else:
+                if len(self._inflight) >= self.max_pending:
+                    self.rejected += 1
+                    raise Overloaded('服务繁忙，请稍后重试')
+                future = self._executor().submit(self._wrap(fn))
+                self._inflight[key] = future
+                future.add_done_callback(lambda _: self._forget(key, future))
+        try:
+            return future.result(timeout=self.timeout if timeout is None else timeout)
+        except TimeoutError:
+            raise ComputeTimeout('计算超时，请稍后重试')
+
+    def _forget(self, key: Hashable, future: Future) -> None:
+        with self._lock:
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+
+
+def _env_number(name: str, default: float) -> float:
+    try:
+        return float(os.environ.get(name) or default)
+    except ValueError:
+        return default
+
+
+scheduler = ComputeScheduler(
+    max_workers=int(_env_number('COMPUTE_WORKERS', DEFAULT_WORKERS)),
+    max_pending=int(_env_number('COMPUTE_MAX_PENDING', DEFAULT_MAX_PENDING)),
+    timeout=_env_number('COMPUTE_TIMEOUT', DEFAULT_TIMEOUT),
+)
+
+
+def run(key: Hashable, fn: Callable[[], Any], timeout: Optional[float] = None) -> Any:
+    return scheduler.run(key, fn, timeout)
+
+
+def init_app(app) -> None:
+    """繁忙返回 503（带 Retry-After），超时返回 504。"""
+
+    @app.errorhandler(ComputeError)
+    def _handle_compute_error(exc: ComputeError):
+        response = jsonify({'error': str(exc)})
+        response.status_code = exc.status
+        if exc.status == 503:
+            response.headers['Retry-After'] = '1'
+        return response
@@ -0,0 +1,803 @@
+import contextvars
+import glob
+import hashlib
+import io
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+import columnar
+import mastery
+import metrics
+import shared_store
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = os.path.dirname(__file__)
+# 数据目录，可用环境变量 DATA_DIR 指向其他目录（例如 benchmarks.synthetic 生成的数据）
+DATA_DIR = os.environ.get('DATA_DIR') or os.path.join(BASE_DIR, 'data')
+MASTERY_DIR = os.path.join(DATA_DIR, 'mastery')
+SUBMIT_RECORD_DIR = os.path.join(DATA_DIR, 'Data_SubmitRecord')
+
+TITLE_INFO_FILE = os.path.join(DATA_DIR, 'Data_TitleInfo.csv')
+STUDENT_INFO_FILE = os.path.join(DATA_DIR, 'Data_StudentInfo.csv')
+CLASS_TITLE_MASTERY = os.path.join(MASTERY_DIR, 'class_title_mastery.csv')
+INDIVIDUAL_TITLE_MASTERY = os.path.join(MASTERY_DIR, 'individual_title_mastery.csv')
+CLASS_KNOWLEDGE_MASTERY = os.path.join(MASTERY_DIR, 'class_knowledge_mastery.csv')
+INDIVIDUAL_KNOWLEDGE_MASTERY = os.path.join(MASTERY_DIR, 'individual_knowledge_mastery.csv')
+INDIVIDUAL_SUB_KNOWLEDGE_MASTERY = os.path.join(MASTERY_DIR, 'individual_sub_knowledge_mastery.csv')
+MAJOR_KNOWLEDGE_MASTERY = os.path.join(MASTERY_DIR, 'major_knowledge_mastery.csv')
+MAJOR_TITLE_MASTERY = os.path.join(MASTERY_DIR, 'major_title_mastery.csv')
+COLUMNAR_DIR = os.path.join(DATA_DIR, '.columnar')
+
+DEFAULT_CHECK_INTERVAL = 30
+# 掌握度表的来源：auto（文件存在时读文件，否则由 mastery.py 从提交记录计算）、files、engine
+MASTERY_SOURCE = os.environ.get('MASTERY_SOURCE', 'auto')
+# 多 worker 共享数据集的目录（见 shared_store.py）；为空时各进程自行加载
+SHARED_DATA_DIR = os.environ.get('SHARED_DATA_DIR', '')
+
+SUBMIT_RECORD_COLUMNS = ['class', 'time', 'state', 'score', 'title_ID', 'method', 'memory', 'timeconsume', 'student_ID']
+# 提交记录的紧凑 schema：重复出现的字符串列用 category，数值列用固定的窄 dtype
+SUBMIT_RECORD_CATEGORIES = ['class', 'state', 'title_ID', 'method', 'student_ID']
+SUBMIT_RECORD_NUMERIC = {'time': 'float64', 'score': 'int16', 'memory': 'float32', 'timeconsume': 'float32'}
+
+
+def normalize_columns(df: pd.DataFrame) -> pd.DataFrame:
+    df.columns = (
+        df.columns.astype(str)
+        .str.replace('\ufeff', '', regex=False)
+        .str.strip()
+    )
+    return df
+
+
+def normalize_column_name(df: pd.DataFrame, target: str) -> pd.DataFrame:
+    if target in df.columns:
+        return df
+    matches = [col for col in df.columns if col.lower() == target.lower()]
+    if matches:
+        df = df.rename(columns={matches[0]: target})
+    return df
+
+
+def read_table(path: str, columns: Iterable[str] = ()) -> pd.DataFrame:
+    """读取 CSV：去除 BOM / 空格，并按大小写不敏感的方式对齐指定列名。"""
+    df = pd.read_csv(path, encoding='utf-8-sig')
+    df = normalize_columns(df)
+    for col in columns:
+        df = normalize_column_name(df, col)
+    return df
+
+
+class Snapshot:
+    """
+    某一时刻全部数据集的一致视图。
+    发布后不再替换其中的值，只允许追加尚未加载过的数据集（懒加载）；数据变化时整体换成新的 Snapshot。
+    """
+
+    __slots__ = ('version', 'values', 'versions', 'fingerprints')
+
+    def __init__(self, version: int = 0, values: Optional[Dict[str, Any]] = None,
+                 versions: Optional[Dict[str, int]] = None,
+                 fingerprints: Optional[Dict[str, Any]] = None):
+        self.version = version
+        self.values: Dict[str, Any] = values or {}
+        self.versions: Dict[str, int] = versions or {}
+        self.fingerprints: Dict[str, Any] = fingerprints or {}
+
+
+class DatasetRegistry:
+    """
+    进程内数据集注册表。
+    每个数据集由一个无参 loader 生成，首次访问时加载并缓存，之后所有模块共享同一份对象。
+    通过 depends 声明派生关系，reload 上游数据集时会连带重建其下游。
+    通过 sources 声明数据文件，后台 watcher 按 mtime/size 发现变化后只重建受影响的数据集，
+    在新的 Snapshot 上构建完成后再整体替换，正在处理的请求仍读取自己固定的旧 Snapshot。
+    返回的 DataFrame 为共享只读对象，调用方需要修改时请先 copy()。
+    """
+
+    def __init__(self):
+        self._loaders: Dict[str, Callable[[], Any]] = {}
+        self._depends: Dict[str, Tuple[str, ...]] = {}
+        self._sources: Dict[str, Callable[[], List[str]]] = {}
+        self._snapshot = Snapshot()
+        self._pending: Dict[str, Any] = {}
+        # 用 ContextVar 而不是 threading.local：ASGI 模式下同一请求可能在不同线程中分段执行（见 asgi.py）
+        self._pins: contextvars.ContextVar[Tuple[Snapshot, ...]] = contextvars.ContextVar(f'pins-{id(self)}', default=())
+        self._lock = threading.RLock()
+        self._reload_lock = threading.RLock()
+        self._incremental: Dict[str, Callable[[Any, Any, Any], Optional[Tuple[Any, Any, Any]]]] = {}
+        self._deltas: Dict[str, Callable[[Any, Any], Any]] = {}
+        self._content_ids: Dict[str, Callable[[Any], Any]] = {}
+        self._watcher: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        # 各数据集最近一次加载的耗时（秒），由 /metrics 输出
+        self.load_seconds: Dict[str, float] = {}
+
+    def register(self, name: str, depends: Iterable[str] = (),
+                 sources: Union[None, Iterable[str], Callable[[], List[str]]] = None):
+        if sources is not None and not callable(sources):
+            paths = list(sources)
+            sources = lambda: paths
+        def decorator(loader: Callable[[], Any]) -> Callable[[], Any]:
+            with self._lock:
+                self._loaders[name] = loader
+                self._depends[name] = tuple(depends)
+                if sources is not None:
+                    self._sources[name] = sources
+                self._snapshot.values.pop(name, None)
+            return loader
+        return decorator
+
+    def loader(self, name: str) -> Callable[[], Any]:
+        return self._loaders[name]
+
+    def replace_loader(self, name: str, loader: Callable[[], Any], sources: Optional[Iterable[str]] = None,
+                       depends: Iterable[str] = ()) -> None:
+        """
+        替换已注册数据集的 loader 与数据文件（sources 为空序列表示不再有数据文件），
+        depends 为追加的上游数据集，原有依赖保留；去掉增量刷新。
+        """
+        with self._lock:
+            self._loaders[name] = loader
+            if sources is not None:
+                paths = list(sources)
+                if paths:
+                    self._sources[name] = lambda: paths
+                else:
+                    self._sources.pop(name, None)
+            self._depends[name] = tuple(dict.fromkeys([*self._depends[name], *depends]))
+            self._incremental.pop(name, None)
+            self._snapshot.values.pop(name, None)
+
+    def names(self) -> List[str]:
+        return sorted(self._loaders)
+
+    @property
+    def version(self) -> int:
+        return self.current().version
+
+    def dataset_version(self, name: str) -> int:
+        snapshot = self.current()
+        return snapshot.versions.get(name, snapshot.version)
+
+    def current(self) -> Snapshot:
+        stack = self._pins.get()
+        if stack:
+            return stack[-1]
+        return self._snapshot
+
+    def push(self, snapshot: Optional[Snapshot] = None) -> Snapshot:
+        """把当前线程（上下文）固定到某个 Snapshot（默认为最新），直到对应的 pop()。"""
+        snapshot = snapshot or self._snapshot
+        self._pins.set(self._pins.get() + (snapshot,))
+        return snapshot
+
+    def pop(self) -> None:
+        stack = self._pins.get()
+        if stack:
+            self._pins.set(stack[:-1])
+
+    @contextmanager
+    def pinned(self, snapshot: Optional[Snapshot] = None):
+        snapshot = self.push(snapshot)
+        try:
+            yield snapshot
+        finally:
+            self.pop()
+
+    def get(self, name: str) -> Any:
+        snapshot = self.current()
+        try:
+            return snapshot.values[name]
+        except KeyError:
+            pass
+        if name not in self._loaders:
+            raise KeyError(f'未注册的数据集: {name}')
+        with self._lock:
+            if name not in snapshot.values:
+                fingerprint = self.fingerprint(name)
+                started = time.perf_counter()
+                with metrics.stage(f'load.{name}'):
+                    snapshot.values[name] = self._loaders[name]()
+                self.load_seconds[name] = time.perf_counter() - started
+                snapshot.fingerprints[name] = fingerprint
+                snapshot.versions.setdefault(name, snapshot.version)
+            return snapshot.values[name]
+
+    def fingerprint(self, name: str) -> Optional[Tuple]:
+        source = self._sources.get(name)
+        if source is None:
+            return None
+        stats = []
+        for path in source():
+            try:
+                st = os.stat(path)
+            except OSError:
+                stats.append((path, None, None))
+                continue
+            stats.append((path, st.st_mtime_ns, st.st_size))
+        return tuple(stats)
+
+    def _dependents(self, names: Iterable[str]) -> List[str]:
+        pending = list(names)
+        affected: List[str] = []
+        while pending:
+            current = pending.pop(0)
+            if current in affected:
+                continue
+            affected.append(current)
+            pending.extend(n for n, deps in self._depends.items() if current in deps)
+        return affected
+
+    def roots(self, names: Iterable[str]) -> List[str]:
+        """names 及其全部上游中带数据文件的数据集（即内容的最终来源），按名称排序。"""
+        pending = list(names)
+        seen: List[str] = []
+        while pending:
+            current = pending.pop()
+            if current in seen:
+                continue
+            seen.append(current)
+            pending.extend(self._depends.get(current, ()))
+        return sorted(name for name in seen if name in self._sources)
+
+    def content_token(self, names: Iterable[str]) -> str:
+        """
+        names 内容的标识：上游数据文件指纹的摘要。已加载的取当前 Snapshot 记录的指纹，否则取磁盘上的指纹；
+        注册增量刷新时提供了 content_id 的数据集只取 content_id(指纹)，即指纹中与读取时机无关的部分。
+        与进程内的版本号不同，读取了同样内容的多个 worker 得到相同的值，可以交给客户端在后续请求中带回。
+        """
+        snapshot = self.current()
+        parts = []
+        for name in self.roots(names):
+            fingerprint = snapshot.fingerprints[name] if name in snapshot.fingerprints else self.fingerprint(name)
+            content_id = self._content_ids.get(name)
+            parts.append((name, content_id(fingerprint) if content_id and fingerprint else fingerprint))
+        return hashlib.sha1(repr(parts).encode('utf-8')).hexdigest()[:10]
+
+    def changed(self) -> List[str]:
+        """返回数据文件的 mtime/size 与已加载版本不一致的数据集。"""
+        snapshot = self._snapshot
+        return [
+            name for name in list(snapshot.values)
+            if name in self._sources and self.fingerprint(name) != snapshot.fingerprints.get(name)
+        ]
+
+    def _carry_over(self, current: Snapshot, excluded: List[str], version: int) -> Snapshot:
+        """把 current 中 excluded 以外的数据集复制到新的 Snapshot；持有 _lock，避免复制时其他线程的懒加载追加数据集。"""
+        with self._lock:
+            return Snapshot(
+                version,
+                {k: v for k, v in current.values.items() if k not in excluded},
+                {k: v for k, v in current.versions.items() if k not in excluded},
+                {k: v for k, v in current.fingerprints.items() if k not in excluded},
+            )
+
+    def _rebuild(self, names: Iterable[str], eager: bool = False) -> List[str]:
+        current = self._snapshot
+        affected = self._dependents(names)
+        version = current.version + 1
+        staging = self._carry_over(current, affected, version)
+        rebuilt = [name for name in affected if eager or name in current.values]
+        with self.pinned(staging):
+            for name in rebuilt:
+                self.get(name)
+        for name in affected:
+            staging.versions[name] = version
+        self._snapshot = staging
+        return rebuilt
+
+    def register_incremental(self, name: str,
+                             handler: Callable[[Any, Any, Any], Optional[Tuple[Any, Any, Any]]],
+                             content_id: Optional[Callable[[Any], Any]] = None) -> None:
+        """
+        为带数据文件的数据集注册增量刷新：handler(当前值, 旧指纹, 新指纹) 返回 (新值, 增量, 已消费到的指纹)，
+        增量为 None 表示没有新内容；整体返回 None 表示无法增量处理，改为整体重建。
+        已消费到的指纹中的 mtime 取决于各进程读取的时机，content_id(指纹) 给出只由内容决定的部分，供 content_token 使用。
+        """
+        self._incremental[name] = handler
+        if content_id is not None:
+            self._content_ids[name] = content_id
+
+    def register_delta(self, name: str, handler: Callable[[Any, Any], Any]) -> None:
+        """上游数据集以增量方式更新时，用 handler(旧值, 增量) 更新 name，而不是整体重建。"""
+        self._deltas[name] = handler
+
+    @contextmanager
+    def exclusive(self):
+        """与重建 / 增量更新互斥地执行一段操作（例如写入数据文件后立即应用增量）。"""
+        with self._reload_lock:
+            yield
+
+    def _apply_delta(self, name: str, value: Any, delta: Any, fingerprint: Any) -> List[str]:
+        current = self._snapshot
+        affected = self._dependents([name])
+        version = current.version + 1
+        staging = self._carry_over(current, affected, version)
+        staging.values[name] = value
+        staging.fingerprints[name] = fingerprint
+        updated = [name]
+        with self.pinned(staging):
+            for dep in affected[1:]:
+                if dep not in current.values or dep in staging.values:
+                    continue
+                handler = self._deltas.get(dep)
+                upstream_ok = all(d in updated or d not in affected for d in self._depends[dep])
+                if handler is not None and upstream_ok:
+                    staging.values[dep] = handler(current.values[dep], delta)
+                    staging.fingerprints[dep] = current.fingerprints.get(dep)
+                    updated.append(dep)
+                else:
+                    self.get(dep)
+        for dep in affected:
+            staging.versions[dep] = version
+        self._snapshot = staging
+        return updated
+
+    def apply_delta(self, name: str, value: Any, delta: Any, fingerprint: Any = None) -> List[str]:
+        """
+        以增量方式发布 name 的新值：注册了 register_delta 的下游用增量更新，其余已加载的下游重建，
+        全部完成后原子替换。返回以增量方式更新的数据集名。
+        """
+        with self._reload_lock:
+            if fingerprint is None:
+                fingerprint = self.fingerprint(name)
+            return self._apply_delta(name, value, delta, fingerprint)
+
+    def refresh(self) -> List[str]:
+        """
+        检查数据文件变化并重建受影响的数据集。
+        为避免读到写了一半的文件，同一指纹需要在连续两次检查中保持不变才会触发重建。
+        注册了增量刷新的数据集先尝试只读取新增部分。
+        """
+        with self._reload_lock:
+            ready = []
+            pending = {}
+            for name in self.changed():
+                fingerprint = self.fingerprint(name)
+                if self._pending.get(name) == fingerprint:
+                    ready.append(name)
+                else:
+                    pending[name] = fingerprint
+            self._pending = pending
+            refreshed = []
+            for name in list(ready):
+                handler = self._incremental.get(name)
+                if handler is None:
+                    continue
+                current = self._snapshot
+                result = handler(current.values[name], current.fingerprints.get(name), self.fingerprint(name))
+                if result is None:
+                    continue
+                ready.remove(name)
+                value, delta, fingerprint = result
+                if delta is None:
+                    # 没有新的完整内容，只推进已消费的位置
+                    current.fingerprints[name] = fingerprint
+                else:
+                    refreshed.extend(self._apply_delta(name, value, delta, fingerprint))
+            if ready:
+                refreshed.extend(self._rebuild(ready))
+            return refreshed
+
+    def invalidate(self, *names: str) -> List[str]:
+        """丢弃缓存（不指定时丢弃全部），下次访问时重新加载。返回被失效的数据集名。"""
+        with self._reload_lock:
+            current = self._snapshot
+            with self._lock:
+                targets = self._dependents(names) if names else list(current.values)
+                staging = self._carry_over(current, targets, current.version + 1)
+            for name in targets:
+                staging.versions[name] = current.version + 1
+            self._snapshot = staging
+            return targets
+
+    def reload(self, *names: str) -> List[str]:
+        """
+        立即重新加载指定数据集及其下游，完成后原子替换；
+        不指定名称时重新加载当前已加载过的全部数据集。
+        """
+        with self._reload_lock:
+            if names:
+                return self._rebuild(names, eager=True)
+            return self._rebuild(list(self._snapshot.values))
+
+    def preload(self, names: Optional[Iterable[str]] = None) -> List[str]:
+        """预热数据集；缺失的数据文件会被跳过，留待首次访问时报错。"""
+        loaded = []
+        for name in (names or self.names()):
+            try:
+                self.get(name)
+            except FileNotFoundError:
+                continue
+            loaded.append(name)
+        return loaded
+
+    def start_watcher(self, interval: float) -> None:
+        """启动后台线程，每隔 interval 秒检查一次数据文件。"""
+        if self._watcher is not None and self._watcher.is_alive():
+            return
+        self._stop.clear()
+
+        def run():
+            while not self._stop.wait(interval):
+                try:
+                    rebuilt = self.refresh()
+                except Exception:
+                    logger.exception('数据集热加载失败，继续使用旧版本')
+                    continue
+                if rebuilt:
+                    logger.info('数据集已重新加载: %s (version=%s)', ', '.join(rebuilt), self._snapshot.version)
+
+        self._watcher = threading.Thread(target=run, name='data-store-watcher', daemon=True)
+        self._watcher.start()
+
+    def stop_watcher(self) -> None:
+        self._stop.set()
+
+
+registry = DatasetRegistry()
+
+
+def get(name: str) -> Any:
+    return registry.get(name)
+
+
+def reload(*names: str) -> List[str]:
+    return registry.reload(*names)
+
+
+def init_app(app, check_interval: Optional[float] = None, shared_dir: Optional[str] = None) -> None:
+    """
+    请求开始时把线程固定到最新 Snapshot，保证同一请求内读到的各数据集版本一致；
+    check_interval > 0 时启动后台 watcher（默认读取环境变量 DATA_STORE_CHECK_INTERVAL，单位秒）；
+    shared_dir 非空时从共享目录挂载大表（默认读取环境变量 SHARED_DATA_DIR）。
+    """
+    if check_interval is None:
+        check_interval = float(os.environ.get('DATA_STORE_CHECK_INTERVAL', DEFAULT_CHECK_INTERVAL))
+    if shared_dir is None:
+        shared_dir = SHARED_DATA_DIR
+    if shared_dir:
+        attach_shared(shared_dir)
+
+    @app.before_request
+    def _pin_snapshot():
+        registry.push()
+
+    @app.teardown_request
+    def _unpin_snapshot(exc=None):
+        registry.pop()
+
+    if check_interval > 0:
+        registry.start_watcher(check_interval)
+
+
+@registry.register('title_info', sources=[TITLE_INFO_FILE])
+def _load_title_info() -> pd.DataFrame:
+    df = read_table(TITLE_INFO_FILE, ['title_ID', 'knowledge', 'sub_knowledge', 'score'])
+
+    if 'score' not in df.columns:
+        df['score'] = 1
+
+    for col in ['title_ID', 'knowledge', 'sub_knowledge']:
+        if col not in df.columns:
+            df[col] = ''
+        df[col] = df[col].astype(str).str.replace('\ufeff', '', regex=False).str.strip()
+
+    df['score'] = pd.to_numeric(df['score'], errors='coerce').fillna(0)
+    return df[['title_ID', 'score', 'knowledge', 'sub_knowledge']].drop_duplicates()
+
+
+@registry.register('student_info', sources=[STUDENT_INFO_FILE])
+def _load_student_info() -> pd.DataFrame:
+    return read_table(STUDENT_INFO_FILE, ['student_ID', 'sex', 'age', 'major'])
+
+
+class SortedIndex:
+    """
+    按某个键稳定排序后的数据集 + 键 -> (start, stop) 偏移表。
+    slice() 返回排好序的帧上的一段连续切片（零拷贝），行序与原始帧上的布尔筛选结果一致。
+    presorted=True 表示 frame 已按 key 稳定排序（例如从共享目录挂载的索引帧），直接使用而不再复制。
+    """
+
+    def __init__(self, frame: pd.DataFrame, key: str, presorted: bool = False):
+        self.key = key
+        self.frame = frame if presorted else frame.sort_values(key, kind='mergesort', na_position='last')
+        values = self.frame[key].to_numpy()
+        boundaries = np.flatnonzero(values[1:] != values[:-1]) + 1
+        starts = np.concatenate([[0], boundaries]).astype(np.int64) if len(values) else np.array([], dtype=np.int64)
+        stops = np.concatenate([boundaries, [len(values)]]).astype(np.int64) if len(values) else starts
+        self.offsets: Dict[Any, Tuple[int, int]] = {}
+        for start, stop in zip(starts.tolist(), stops.tolist()):
+            value = values[start]
+            if pd.notna(value):
+                self.offsets[value] = (start, stop)
+
+    def __contains__(self, value: Any) -> bool:
+        return value in self.offsets
+
+    def __len__(self) -> int:
+        return len(self.offsets)
+
+    def keys(self) -> List[Any]:
+        """全部键，已按排序顺序排列。"""
+        return list(self.offsets)
+
+    def bounds(self, value: Any) -> Tuple[int, int]:
+        return self.offsets.get(value, (0, 0))
+
+    def slice(self, value: Any) -> pd.DataFrame:
+        start, stop = self.bounds(value)
+        return self.frame.iloc[start:stop]
+
+    def take(self, values: Iterable[Any]) -> pd.DataFrame:
+        """按 values 的顺序一次性取出多个键的行（一次 gather）。"""
+        ranges = [np.arange(*self.offsets[v]) for v in values if v in self.offsets]
+        positions = np.concatenate(ranges) if ranges else np.array([], dtype=np.int64)
+        return self.frame.iloc[positions]
+
+
+def index_name(dataset: str, key: str) -> str:
+    return f'{dataset}:by:{key}'
+
+
+# 已注册的索引：索引名 -> 键
+_INDEX_KEYS: Dict[str, str] = {}
+
+
+def register_index(dataset: str, key: str) -> str:
+    """为 dataset 注册按 key 的索引；作为派生数据集随 dataset 一起加载、重载。"""
+    name = index_name(dataset, key)
+    _INDEX_KEYS[name] = key
+    registry.register(name, depends=[dataset])(lambda: SortedIndex(registry.get(dataset), key))
+    return name
+
+
+def index(dataset: str, key: str) -> SortedIndex:
+    return registry.get(index_name(dataset, key))
+
+
+def lookup(dataset: str, key: str, value: Any) -> pd.DataFrame:
+    """等价于 df[df[key] == value]，但走索引切片，耗时与数据集大小无关。"""
+    return index(dataset, key).slice(value)
+
+
+def _submit_record_files() -> List[str]:
+    return sorted(glob.glob(os.path.join(SUBMIT_RECORD_DIR, 'SubmitRecord-Class*.csv')))
+
+
+def _column_mapping(source: Union[str, io.BytesIO], targets: Iterable[str]) -> Dict[str, str]:
+    """只读表头，按 normalize_columns / normalize_column_name 的规则求出 原始列名 -> 规范列名。"""
+    raw = pd.read_csv(source, encoding='utf-8-sig', nrows=0).columns
+    if hasattr(source, 'seek'):
+        source.seek(0)
+    cleaned = [str(col).replace('\ufeff', '').strip() for col in raw]
+    mapping = {}
+    for target in targets:
+        matches = [r for r, c in zip(raw, cleaned) if c == target]
+        if not matches:
+            matches = [r for r, c in zip(raw, cleaned) if c.lower() == target.lower()]
+        if matches:
+            mapping[matches[0]] = target
+    return mapping
+
+
+def read_submit_record_file(source: Union[str, io.BytesIO]) -> pd.DataFrame:
+    """读取单个提交记录文件（路径或带表头的字节流），返回紧凑 schema 的帧（category 字典仅含本文件的值）。"""
+    mapping = _column_mapping(source, SUBMIT_RECORD_COLUMNS)
+    dtype = {raw: 'category' for raw, col in mapping.items() if col in SUBMIT_RECORD_CATEGORIES}
+    df = pd.read_csv(source, encoding='utf-8-sig', usecols=list(mapping), dtype=dtype)
+    df = df.rename(columns=mapping)[SUBMIT_RECORD_COLUMNS]
+    for col, target in SUBMIT_RECORD_NUMERIC.items():
+        values = pd.to_numeric(df[col], errors='coerce')
+        if col == 'score':
+            values = values.fillna(0)
+        df[col] = values.astype(target)
+    return df
+
+
+def concat_submit_records(frames: List[pd.DataFrame]) -> pd.DataFrame:
+    """合并多个紧凑 schema 的帧，category 列统一为排好序的并集字典。"""
+    frames = [frame.copy(deep=False) for frame in frames]
+    for col in SUBMIT_RECORD_CATEGORIES:
+        categories = sorted(set().union(*(frame[col].cat.categories for frame in frames)))
+        for frame in frames:
+            if list(frame[col].cat.categories) != categories:
+                frame[col] = frame[col].cat.set_categories(categories)
+    return pd.concat(frames, ignore_index=True)
+
+
+def empty_submit_records() -> pd.DataFrame:
+    df = pd.DataFrame(columns=SUBMIT_RECORD_COLUMNS)
+    return df.astype({**{col: 'category' for col in SUBMIT_RECORD_CATEGORIES}, **SUBMIT_RECORD_NUMERIC})
+
+
+def _read_submit_records_csv() -> pd.DataFrame:
+    """
+    合并全部提交记录，并转换为紧凑表示：
+    字符串列为 category（所有文件共用一份排好序的字典，codes 为窄整数），数值列为固定的窄 dtype。
+    """
+    csv_files = _submit_record_files()
+    if not csv_files:
+        return empty_submit_records()
+    return concat_submit_records([read_submit_record_file(path) for path in csv_files])
+
+
+# 支持列式快照的数据集：名称 -> 直接解析 CSV 的读取函数
+_CSV_READERS: Dict[str, Callable[[], pd.DataFrame]] = {'submit_records': _read_submit_records_csv}
+COLUMNAR_DATASETS: List[str] = ['submit_records']
+
+
+def columnar_dir(name: str) -> str:
+    return os.path.join(COLUMNAR_DIR, name)
+
+
+def build_columnar_snapshot(name: str) -> Dict[str, Any]:
+    """从 CSV 重新生成某个数据集的列式快照。"""
+    fingerprint = registry.fingerprint(name)
+    frame = _CSV_READERS[name]()
+    return columnar.write(frame, columnar_dir(name), fingerprint, DATA_DIR)
+
+
+def _load_columnar_or_csv(name: str) -> pd.DataFrame:
+    frame = columnar.read(columnar_dir(name), registry.fingerprint(name), DATA_DIR)
+    if frame is not None:
+        return frame
+    return _CSV_READERS[name]()
+
+
+@registry.register('submit_records', sources=_submit_record_files)
+def _load_submit_records() -> pd.DataFrame:
+    return _load_columnar_or_csv('submit_records')
+
+
+MASTERY_FILES = {
+    'class_title_mastery': CLASS_TITLE_MASTERY,
+    'individual_title_mastery': INDIVIDUAL_TITLE_MASTERY,
+    'class_knowledge_mastery': CLASS_KNOWLEDGE_MASTERY,
+    'individual_knowledge_mastery': INDIVIDUAL_KNOWLEDGE_MASTERY,
+    'individual_sub_knowledge_mastery': INDIVIDUAL_SUB_KNOWLEDGE_MASTERY,
+    'major_knowledge_mastery': MAJOR_KNOWLEDGE_MASTERY,
+    'major_title_mastery': MAJOR_TITLE_MASTERY,
+}
+
+
+def _mastery_from_engine(name: str) -> bool:
+    """auto 时仓库中已有的文件照常读取，只有缺少的表由引擎计算；engine 时全部计算（try_num_count 口径与文件不同）。"""
+    if MASTERY_SOURCE == 'auto':
+        return not os.path.exists(MASTERY_FILES[name])
+    return MASTERY_SOURCE == 'engine'
+
+
+def _register_mastery_stats(key: str) -> None:
+    """按 (key, title_ID) 累计的统计量；新提交以增量方式累加，只有受影响的学生 / 班级 / 专业的行会变化。"""
+    name = f'mastery_stats:{key}'
+    depends = ['submit_records', 'student_info'] if key == 'major' else ['submit_records']
+
+    def stats(records: pd.DataFrame) -> pd.DataFrame:
+        majors = mastery.major_map(get('student_info')) if key == 'major' else None
+        return mastery.title_stats(records, key, majors)
+
+    def apply(old: pd.DataFrame, delta: pd.DataFrame) -> pd.DataFrame:
+        return mastery.merge_stats(old, stats(mastery.unseen_submissions(get('submit_records'), delta)), key)
+
+    registry.register(name, depends=depends)(lambda: stats(mastery.distinct_submissions(get('submit_records'))))
+    registry.register_delta(name, apply)
+
+
+def _compute_mastery(name: str) -> pd.DataFrame:
+    key, level = mastery.TABLES[name]
+    title_info = get('title_info')
+    if level is None:
+        return mastery.title_mastery(get(f'mastery_stats:{key}'), key, mastery.title_score_map(title_info))
+    titles = get(mastery.title_table_for(key))
+    return mastery.knowledge_mastery(titles, key, mastery.knowledge_pairs(title_info, level), level)
+
+
+def _register_mastery(name: str, columns: Iterable[str]) -> None:
+    path = MASTERY_FILES[name]
+    if _mastery_from_engine(name):
+        key, level = mastery.TABLES[name]
+        upstream = f'mastery_stats:{key}' if level is None else mastery.title_table_for(key)
+        registry.register(name, depends=[upstream, 'title_info'])(lambda: _compute_mastery(name))
+        return
+    columns = tuple(columns)
+    _CSV_READERS[name] = lambda: read_table(path, columns)
+    COLUMNAR_DATASETS.append(name)
+    registry.register(name, sources=[path])(lambda: _load_columnar_or_csv(name))
+
+
+for _key in ('class', 'student_ID', 'major'):
+    _register_mastery_stats(_key)
+
+_register_mastery('class_title_mastery', ['class', 'title_ID', 'title_mastery_score'])
+_register_mastery('individual_title_mastery', ['student_ID', 'title_ID', 'title_mastery_score'])
+_register_mastery('class_knowledge_mastery', ['class', 'knowledge', 'knowledge_mastery_score'])
+_register_mastery('individual_knowledge_mastery', ['student_ID', 'knowledge', 'knowledge_mastery_score'])
+_register_mastery('individual_sub_knowledge_mastery', ['student_ID', 'sub_knowledge', 'knowledge_mastery_score'])
+_register_mastery('major_knowledge_mastery', ['major', 'knowledge', 'knowledge_mastery_score'])
+_register_mastery('major_title_mastery', ['major', 'title_ID', 'title_mastery_score'])
+
+for _dataset, _key in [
+    ('student_info', 'major'),
+    ('submit_records', 'class'),
+    ('submit_records', 'student_ID'),
+    ('class_title_mastery', 'class'),
+    ('class_knowledge_mastery', 'class'),
+    ('individual_title_mastery', 'student_ID'),
+    ('individual_knowledge_mastery', 'student_ID'),
+    ('individual_sub_knowledge_mastery', 'student_ID'),
+    ('major_knowledge_mastery', 'major'),
+    ('major_title_mastery', 'major'),
+]:
+    register_index(_dataset, _key)
+
+
+@registry.register('class_students', depends=[index_name('submit_records', 'class')])
+def _build_class_students() -> Dict[str, np.ndarray]:
+    """班级 -> 有提交记录的学生 ID（升序去重）。"""
+    by_class = index('submit_records', 'class')
+    return {
+        str(class_name): np.unique(by_class.slice(class_name)['student_ID'].dropna().astype(str).to_numpy())
+        for class_name in by_class.keys()
+    }
+
+
+# 共享模式下由发布进程加载、worker 只读挂载的数据集；索引以排好序的帧发布
+SHARED_DATASETS: List[str] = [
+    'title_info', 'student_info', 'submit_records',
+    *(f'mastery_stats:{key}' for key in ('class', 'student_ID', 'major')), *mastery.TABLES, *_INDEX_KEYS,
+]
+_shared_dir: Optional[str] = None
+# 共享模式下的数据集：当前 Snapshot 租用的已发布版本（shared_store.Lease），CURRENT 为其数据文件
+SHARED_LEASE = 'shared_lease'
+
+
+def shared_mode() -> bool:
+    return _shared_dir is not None
+
+
+def shared_frames() -> Dict[str, pd.DataFrame]:
+    """发布进程：当前 Snapshot 中要发布的全部帧（数据文件缺失的数据集跳过）。"""
+    frames = {}
+    for name in SHARED_DATASETS:
+        try:
+            value = get(name)
+        except FileNotFoundError:
+            continue
+        frames[name] = value.frame if isinstance(value, SortedIndex) else value
+    return frames
+
+
+def _shared_loader(name: str, local: Callable[[], Any]) -> Callable[[], Any]:
+    def load() -> Any:
+        # 同一 Snapshot 中的全部共享数据集都从 SHARED_LEASE 租用的同一版本挂载
+        lease = get(SHARED_LEASE)
+        frame = shared_store.attach(lease, name) if lease is not None else None
+        if frame is None:
+            return local()
+        if name in _INDEX_KEYS:
+            return SortedIndex(frame, _INDEX_KEYS[name], presorted=True)
+        return frame
+    return load
+
+
+def attach_shared(directory: str) -> None:
+    """
+    worker 进程：SHARED_DATASETS 改为从共享目录只读挂载，它们都依赖 SHARED_LEASE（数据文件为共享目录的 CURRENT），
+    发布新版本后由 watcher 整体切换。提交记录的增量读取由发布进程负责。
+    """
+    global _shared_dir
+    _shared_dir = directory
+    registry.register(SHARED_LEASE, sources=[shared_store.current_path(directory)])(
+        lambda: shared_store.pin(directory))
+    for name in SHARED_DATASETS:
+        loader = _shared_loader(name, registry.loader(name))
+        registry.replace_loader(name, loader, sources=(), depends=[SHARED_LEASE])
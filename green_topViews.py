@@ -1,58 +1,53 @@
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, Response, current_app, jsonify, request, stream_with_context
+import numpy as np
 import pandas as pd
 import os
-from functools import lru_cache
-from typing import Dict, Any, List, Set
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Any, Iterator, List, Optional, Set, Tuple
+
+import compute
+import data_store
+import metrics
+from response_cache import cached_json
 
 green_top_bp = Blueprint('green_top', __name__, url_prefix='/api/green/top')
 
-BASE_DIR = os.path.dirname(__file__)
-DATA_DIR = os.path.join(BASE_DIR, 'data')
-MASTER_DIR = os.path.join(DATA_DIR, 'mastery')
-SUBMIT_DIR = os.path.join(DATA_DIR, 'Data_SubmitRecord')
+BATCH_FORMATS = ('json', 'stream', 'ndjson')
+BATCH_CHUNK_SIZE = 64
+# 班级旭日图所依赖的数据集，用于响应缓存的版本判断
+SUNBURST_DATASETS = ['submit_records', 'title_hierarchy_lookup', 'individual_title_mastery',
+                     'individual_sub_knowledge_mastery']
 
-TITLE_INFO_FILE = os.path.join(DATA_DIR, 'Data_TitleInfo.csv')
-INDIVIDUAL_TITLE_FILE = os.path.join(MASTER_DIR, 'individual_title_mastery.csv')
-INDIVIDUAL_SUB_FILE = os.path.join(MASTER_DIR, 'individual_sub_knowledge_mastery.csv')
 
+def load_title_info() -> pd.DataFrame:
+    return data_store.get('title_hierarchy')
 
-def _normalize_columns(df: pd.DataFrame) -> pd.DataFrame:
-    df.columns = df.columns.astype(str).str.replace('\ufeff', '', regex=False).str.strip()
-    return df
 
+def load_title_lookup() -> Dict[str, List[Tuple[Any, Any]]]:
+    return data_store.get('title_hierarchy_lookup')
 
-def _normalize_column_name(df: pd.DataFrame, target: str) -> pd.DataFrame:
-    if target in df.columns:
-        return df
-    matches = [col for col in df.columns if col.lower() == target.lower()]
-    if matches:
-        df = df.rename(columns={matches[0]: target})
-    return df
 
+def load_individual_title_mastery() -> pd.DataFrame:
+    return data_store.get('individual_title_mastery')
 
-@lru_cache(maxsize=1)
-def load_title_info() -> pd.DataFrame:
-    df = pd.read_csv(TITLE_INFO_FILE, encoding='utf-8-sig')
-    df = _normalize_columns(df)
-    for col in ['title_ID', 'knowledge', 'sub_knowledge']:
-        df = _normalize_column_name(df, col)
-    return df[['title_ID', 'knowledge', 'sub_knowledge']].drop_duplicates()
 
+def load_individual_sub_mastery() -> pd.DataFrame:
+    return data_store.get('individual_sub_knowledge_mastery')
 
-@lru_cache(maxsize=1)
-def load_individual_title_mastery() -> pd.DataFrame:
-    df = pd.read_csv(INDIVIDUAL_TITLE_FILE)
-    df = _normalize_columns(df)
-    return df
 
+@data_store.registry.register('title_hierarchy', depends=['title_info'])
+def _build_title_hierarchy() -> pd.DataFrame:
+    return data_store.get('title_info')[['title_ID', 'knowledge', 'sub_knowledge']].drop_duplicates()
 
-@lru_cache(maxsize=1)
-def load_individual_sub_mastery() -> pd.DataFrame:
-    df = pd.read_csv(INDIVIDUAL_SUB_FILE)
-    df = _normalize_columns(df)
-    df = _normalize_column_name(df, 'sub_knowledge')
-    df = _normalize_column_name(df, 'knowledge_mastery_score')
-    return df
+
+@data_store.registry.register('title_hierarchy_lookup', depends=['title_hierarchy'])
+def _build_title_hierarchy_lookup() -> Dict[str, List[Tuple[Any, Any]]]:
+    """title_ID -> [(knowledge, sub_knowledge), ...]，同一题目可能挂在多个子知识点下，顺序与 title_info 一致。"""
+    lookup: Dict[str, List[Tuple[Any, Any]]] = {}
+    df = load_title_info()
+    for title_id, knowledge, sub_knowledge in zip(df['title_ID'], df['knowledge'], df['sub_knowledge']):
+        lookup.setdefault(title_id, []).append((knowledge, sub_knowledge))
+    return lookup
 
 
 def _split_knowledge(sub_code: str) -> str:
@@ -62,46 +57,42 @@ def _split_knowledge(sub_code: str) -> str:
 
 
 def _get_class_student_ids(class_name: str) -> Set[str]:
-    filename = f'SubmitRecord-{class_name}.csv'
-    path = os.path.join(SUBMIT_DIR, filename)
-    if not os.path.exists(path):
-        return set()
-    df = pd.read_csv(path)
-    if 'student_ID' not in df.columns:
-        return set()
-    return set(df['student_ID'].dropna().astype(str).tolist())
-
-
-def build_sunburst_payload(class_name: str, student_id: str) -> Dict[str, Any]:
-    title_info = load_title_info()
-    title_mastery = load_individual_title_mastery()
-    student_titles = title_mastery[title_mastery['student_ID'] == student_id].copy()
-    if student_titles.empty:
-        raise ValueError('未找到该学生的题目掌握数据')
-    student_titles = student_titles.merge(title_info, on='title_ID', how='left')
-
-    sub_mastery = load_individual_sub_mastery()
-    student_sub = sub_mastery[sub_mastery['student_ID'] == student_id].copy()
-    student_sub['knowledge'] = student_sub['sub_knowledge'].apply(_split_knowledge)
-
-    knowledge_from_titles = (
-        student_titles.groupby('knowledge')['title_mastery_score']
-        .mean()
-        .dropna()
-        .to_dict()
-    )
-    knowledge_from_sub = (
-        student_sub.groupby('knowledge')['knowledge_mastery_score']
-        .mean()
-        .dropna()
-        .to_dict()
-        if not student_sub.empty else {}
-    )
-
-    knowledge_keys = set(knowledge_from_titles.keys()) | set(knowledge_from_sub.keys())
+    class_df = data_store.lookup('submit_records', 'class', class_name)
+    return {str(sid) for sid in class_df['student_ID'].dropna().unique().tolist()}
+
+
+def _knowledge_means(keys: List[Any], scores: List[float]) -> Dict[str, float]:
+    frame = pd.DataFrame({'knowledge': keys, 'score': pd.Series(scores, dtype='float64')})
+    return frame.groupby('knowledge')['score'].mean().dropna().to_dict()
+
+
+def _build_hierarchy(titles: List[Tuple[Any, Any, Any, float]],
+                     subs: List[Tuple[Any, str, float]],
+                     knowledge_from_titles: Dict[str, float],
+                     knowledge_from_sub: Dict[str, float]) -> List[Dict[str, Any]]:
+    """
+    由单个学生的数据构造 knowledge -> sub_knowledge -> 题目 三层树。
+    titles: (title_ID, knowledge, sub_knowledge, 已保留 4 位的 mastery)，保持原始行序
+    subs:   (sub_knowledge, knowledge, knowledge_mastery_score)，保持原始行序
+    先一次遍历建立分组下标，之后每个节点直接按下标取题目，不再对整表做布尔筛选。
+    """
+    by_sub: Dict[Any, List[int]] = {}
+    by_knowledge: Dict[Any, List[int]] = {}
+    for pos, (_, knowledge, sub_code, _) in enumerate(titles):
+        if pd.notna(sub_code):
+            by_sub.setdefault(sub_code, []).append(pos)
+        if pd.notna(knowledge):
+            by_knowledge.setdefault(knowledge, []).append(pos)
+
+    subs_by_knowledge: Dict[str, List[Tuple[Any, float]]] = {}
+    for sub_code, knowledge, mastery in subs:
+        subs_by_knowledge.setdefault(knowledge, []).append((sub_code, mastery))
+
+    def leaves(positions: List[int]) -> List[Dict[str, Any]]:
+        return [{'name': titles[pos][0], 'mastery': titles[pos][3], 'value': 1} for pos in positions]
 
     hierarchy_children: List[Dict[str, Any]] = []
-    for knowledge in sorted(knowledge_keys):
+    for knowledge in sorted(set(knowledge_from_titles) | set(knowledge_from_sub)):
         knowledge_mastery = knowledge_from_sub.get(
             knowledge,
             knowledge_from_titles.get(knowledge, 0.0)
@@ -112,88 +103,213 @@ def build_sunburst_payload(class_name: str, student_id: str) -> Dict[str, Any]:
             'children': [],
             'value': 0
         }
+        knowledge_titles = by_knowledge.get(knowledge, [])
 
-        sub_rows = student_sub[student_sub['knowledge'] == knowledge]
-        if sub_rows.empty:
-            sub_rows = pd.DataFrame()
-
-        for _, sub_row in sub_rows.iterrows():
-            sub_code = sub_row['sub_knowledge']
+        for sub_code, sub_mastery in subs_by_knowledge.get(knowledge, []):
+            matched = by_sub.get(sub_code, []) if pd.notna(sub_code) else []
             sub_node = {
                 'name': sub_code,
-                'mastery': round(float(sub_row['knowledge_mastery_score']), 4),
-                'children': [],
+                'mastery': round(float(sub_mastery), 4),
+                'children': leaves(matched),
                 'value': 0
             }
-            question_rows = student_titles[student_titles['sub_knowledge'] == sub_code]
-            for _, q_row in question_rows.iterrows():
-                sub_node['children'].append({
-                    'name': q_row['title_ID'],
-                    'mastery': round(float(q_row['title_mastery_score']), 4),
-                    'value': 1
-                })
-            if not sub_node['children']:
+            if not matched:
                 # fallback: attach questions by knowledge only
-                fallback_rows = student_titles[student_titles['knowledge'] == knowledge]
-                for _, q_row in fallback_rows.iterrows():
-                    sub_node['children'].append({
-                        'name': q_row['title_ID'],
-                        'mastery': round(float(q_row['title_mastery_score']), 4),
-                        'value': 1
-                    })
-                    sub_node['value'] += 1
-                if not fallback_rows.empty:
-                    knowledge_node['value'] += len(fallback_rows)
+                sub_node['children'] = leaves(knowledge_titles)
+                sub_node['value'] += len(knowledge_titles)
             else:
-                sub_node['value'] = len(sub_node['children'])
-                knowledge_node['value'] += sub_node['value']
+                sub_node['value'] = len(matched)
+            knowledge_node['value'] += sub_node['value']
             knowledge_node['children'].append(sub_node)
 
         if not knowledge_node['children']:
-            question_rows = student_titles[student_titles['knowledge'] == knowledge]
-            for _, q_row in question_rows.iterrows():
-                knowledge_node['children'].append({
-                    'name': q_row['title_ID'],
-                    'mastery': round(float(q_row['title_mastery_score']), 4),
-                    'value': 1
-                })
-                knowledge_node['value'] += 1
+            knowledge_node['children'] = leaves(knowledge_titles)
+            knowledge_node['value'] += len(knowledge_titles)
 
         hierarchy_children.append(knowledge_node)
+    return hierarchy_children
+
+
+def _title_rows(student_titles: pd.DataFrame) -> Tuple[List[Tuple[Any, Any, Any, float]], List[float], List[Any]]:
+    """
+    给题目掌握行补上 knowledge / sub_knowledge，等价于与 title_info 做 left merge
+    （一道题对应多个子知识点时展开为多行，找不到的题目为 NaN）。
+    返回 (title_ID, knowledge, sub_knowledge, 保留 4 位的 mastery) 列表，以及展开后的原始 mastery 与 student_ID 列表。
+    """
+    lookup = load_title_lookup()
+    missing = [(np.nan, np.nan)]
+    rows: List[Tuple[Any, Any, Any, float]] = []
+    scores: List[float] = []
+    owners: List[Any] = []
+    for title_id, score, owner in zip(student_titles['title_ID'].tolist(),
+                                      student_titles['title_mastery_score'].tolist(),
+                                      student_titles['student_ID'].tolist()):
+        rounded = round(float(score), 4)
+        for knowledge, sub_knowledge in lookup.get(title_id, missing):
+            rows.append((title_id, knowledge, sub_knowledge, rounded))
+            scores.append(score)
+            owners.append(owner)
+    return rows, scores, owners
+
+
+def _sub_rows(student_sub: pd.DataFrame) -> Tuple[List[Tuple[Any, str, float]], List[float]]:
+    sub_codes = student_sub['sub_knowledge'].tolist()
+    scores = student_sub['knowledge_mastery_score'].tolist()
+    knowledge = [_split_knowledge(code) for code in sub_codes]
+    return list(zip(sub_codes, knowledge, scores)), scores
 
+
+def build_sunburst_payload(class_name: str, student_id: str) -> Dict[str, Any]:
+    with metrics.stage('sunburst.filter'):
+        student_titles = data_store.lookup('individual_title_mastery', 'student_ID', student_id)
+        student_sub = data_store.lookup('individual_sub_knowledge_mastery', 'student_ID', student_id)
+    if student_titles.empty:
+        raise ValueError('未找到该学生的题目掌握数据')
+    with metrics.stage('sunburst.merge'):
+        titles, title_scores, _ = _title_rows(student_titles)
+        subs, sub_scores = _sub_rows(student_sub)
+        knowledge_from_titles = _knowledge_means([row[1] for row in titles], title_scores)
+        knowledge_from_sub = _knowledge_means([row[1] for row in subs], sub_scores) if subs else {}
+
+    with metrics.stage('sunburst.tree'):
+        children = _build_hierarchy(titles, subs, knowledge_from_titles, knowledge_from_sub)
     return {
         'class': class_name,
         'student': student_id,
         'sunburst': {
             'name': '知识体系',
-            'children': hierarchy_children
+            'children': children
         }
     }
 
 
+def _positions(keys: List[Any]) -> Dict[Any, List[int]]:
+    """一次遍历得到 key -> 行下标列表（保持原始行序）。"""
+    positions: Dict[Any, List[int]] = {}
+    for pos, key in enumerate(keys):
+        positions.setdefault(key, []).append(pos)
+    return positions
+
+
+def _means_by_student(student_ids: List[str], keys: List[Any], scores: List[float]) -> Dict[str, Dict[str, float]]:
+    """按 (student_ID, knowledge) 一次性求均值，结果与逐个学生调用 _knowledge_means 相同。"""
+    frame = pd.DataFrame({
+        'student_ID': student_ids,
+        'knowledge': keys,
+        'score': pd.Series(scores, dtype='float64'),
+    })
+    means = frame.groupby(['student_ID', 'knowledge'])['score'].mean().dropna()
+    result: Dict[str, Dict[str, float]] = {}
+    for (sid, knowledge), value in means.items():
+        result.setdefault(sid, {})[knowledge] = value
+    return result
+
+
+def _build_trees(jobs: List[Tuple[str, list, list, dict, dict]]) -> List[Dict[str, Any]]:
+    return [
+        {'student_ID': sid, 'sunburst': {'name': '知识体系', 'children': _build_hierarchy(*args)}}
+        for sid, *args in jobs
+    ]
+
+
+_batch_pool: Optional[ProcessPoolExecutor] = None
+
+
+def _get_batch_pool() -> Optional[ProcessPoolExecutor]:
+    """SUNBURST_BATCH_WORKERS > 1 时把建树分摊到进程池，默认在当前进程内完成。"""
+    global _batch_pool
+    workers = int(os.environ.get('SUNBURST_BATCH_WORKERS', '0') or 0)
+    if workers <= 1:
+        return None
+    if _batch_pool is None:
+        _batch_pool = ProcessPoolExecutor(max_workers=workers)
+    return _batch_pool
+
+
+def _sunburst_jobs(student_ids: List[str]) -> List[Tuple[str, list, list, dict, dict]]:
+    """一次 gather 取出这些学生的题目 / 子知识点掌握数据并按学生分组，返回建树所需的参数（跳过没有题目数据的学生）。"""
+    student_titles = data_store.index('individual_title_mastery', 'student_ID').take(student_ids)
+    titles, title_scores, title_owner = _title_rows(student_titles)
+    title_positions = _positions(title_owner)
+    ready = [sid for sid in student_ids if sid in title_positions]
+    if not ready:
+        return []
+
+    student_subs = data_store.index('individual_sub_knowledge_mastery', 'student_ID').take(ready)
+    subs, sub_scores = _sub_rows(student_subs)
+    sub_owner = student_subs['student_ID'].tolist()
+    sub_positions = _positions(sub_owner)
+
+    knowledge_from_titles = _means_by_student(title_owner, [row[1] for row in titles], title_scores)
+    knowledge_from_sub = _means_by_student(sub_owner, [row[1] for row in subs], sub_scores)
+    return [
+        (
+            sid,
+            [titles[pos] for pos in title_positions[sid]],
+            [subs[pos] for pos in sub_positions.get(sid, [])],
+            knowledge_from_titles.get(sid, {}),
+            knowledge_from_sub.get(sid, {}),
+        )
+        for sid in ready
+    ]
+
+
+def build_sunburst_trees(student_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+    """多个学生的旭日图：student_ID -> {'name', 'children'}，没有题目掌握数据的学生不出现在结果中。"""
+    return {item['student_ID']: item['sunburst'] for item in _build_trees(_sunburst_jobs(student_ids))}
+
+
+def iter_sunburst_batch(class_name: str, chunk_size: int = BATCH_CHUNK_SIZE) -> Iterator[Dict[str, Any]]:
+    """
+    一次性按学生分组班级内的掌握数据，再逐个产出 {'student_ID', 'sunburst'}（按 student_ID 排序）。
+    参数校验在返回迭代器之前完成，因此流式响应开始前就能返回 400。
+    """
+    with metrics.stage('sunburst_batch.filter'):
+        student_ids = sorted(_get_class_student_ids(class_name))
+        if not student_ids:
+            raise ValueError('未找到该班级的学生数据')
+
+    with metrics.stage('sunburst_batch.merge'):
+        jobs = _sunburst_jobs(student_ids)
+        if not jobs:
+            raise ValueError('该班级没有可用的学生掌握数据')
+    chunks = [jobs[i:i + chunk_size] for i in range(0, len(jobs), chunk_size)]
+
+    def generate() -> Iterator[Dict[str, Any]]:
+        pool = _get_batch_pool()
+        results = iter(pool.map(_build_trees, chunks) if pool is not None else map(_build_trees, chunks))
+        while True:
+            with metrics.stage('sunburst_batch.tree'):
+                trees = next(results, None)
+            if trees is None:
+                return
+            yield from trees
+
+    return generate()
+
+
 def build_sunburst_batch_payload(class_name: str) -> Dict[str, Any]:
-    student_ids = _get_class_student_ids(class_name)
-    if not student_ids:
-        raise ValueError('未找到该班级的学生数据')
-
-    results = []
-    for sid in sorted(student_ids):
-        try:
-            payload = build_sunburst_payload(class_name, sid)
-            results.append({
-                'student_ID': sid,
-                'sunburst': payload['sunburst']
-            })
-        except ValueError:
-            continue
-    if not results:
-        raise ValueError('该班级没有可用的学生掌握数据')
     return {
         'class': class_name,
-        'students': results
+        'students': list(iter_sunburst_batch(class_name))
     }
 
 
+def _stream_ndjson(items: Iterator[Dict[str, Any]]) -> Iterator[str]:
+    dumps = current_app.json.dumps
+    for item in items:
+        yield dumps(item) + '\n'
+
+
+def _stream_json(class_name: str, items: Iterator[Dict[str, Any]]) -> Iterator[str]:
+    """与一次性返回的结构相同，只是按学生分块发送。"""
+    dumps = current_app.json.dumps
+    yield '{"class": ' + dumps(class_name) + ', "students": ['
+    for idx, item in enumerate(items):
+        yield (', ' if idx else '') + dumps(item)
+    yield ']}\n'
+
+
 def _required_params() -> Dict[str, str]:
     class_name = request.args.get('class')
     student_id = request.args.get('student_ID')
@@ -220,12 +336,19 @@ def get_green_sunburst_batch():
         class_name = request.args.get('class')
         if not class_name:
             raise ValueError('需要提供 class 参数')
-        payload = build_sunburst_batch_payload(class_name)
-        return jsonify(payload)
+        output = request.args.get('format', 'json')
+        if output not in BATCH_FORMATS:
+            raise ValueError(f"format 只能是 {' / '.join(BATCH_FORMATS)}")
+        if output == 'json':
+            return cached_json('sunburst-batch', SUNBURST_DATASETS,
+                               lambda: build_sunburst_batch_payload(class_name), (class_name,))
+        items = iter_sunburst_batch(class_name)
+        if output == 'ndjson':
+            return Response(stream_with_context(_stream_ndjson(items)), mimetype='application/x-ndjson')
+        return Response(stream_with_context(_stream_json(class_name, items)), mimetype='application/json')
     except ValueError as exc:
         return jsonify({'error': str(exc)}), 400
+    except compute.ComputeError:
+        raise
     except Exception as exc:
         return jsonify({'error': str(exc)}), 500
-
-
-
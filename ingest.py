@@ -0,0 +1,246 @@
+"""
+提交记录的增量接入：
+* 热加载时只读取各班级文件新追加的完整行，以增量（delta）方式更新 submit_records 及下游聚合；
+* POST /api/ingest/submit-records 追加新提交并立即生效（需配置 INGEST_TOKEN）；
+  共享数据集模式下（见 shared_store.py）只写入文件，由发布进程发布新版本后生效。
+
+已消费到的位置记录在 submit_records 指纹的 size 中（字节偏移），文件被截断或已有内容被改写时回退为全量重建；
+内容标识（registry.content_token）只取各文件的已消费位置，不取 mtime。
+"""
+import csv
+import hmac
+import io
+import os
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+import pandas as pd
+from flask import Blueprint, jsonify, request
+
+import data_store
+
+ingest_bp = Blueprint('ingest', __name__, url_prefix='/api/ingest')
+
+TOKEN_HEADER = 'X-Ingest-Token'
+MAX_BATCH = 10000
+INDEX_COLUMN = 'index'
+# 每个文件在已消费位置之前保留的一小段字节，用于确认已读内容没有被改写
+MARK_SIZE = 256
+
+_marks: Dict[str, Tuple[int, bytes]] = {}
+_marks_lock = threading.Lock()
+
+
+def _read_bytes(path: str, start: int, stop: int) -> bytes:
+    with open(path, 'rb') as fh:
+        fh.seek(start)
+        return fh.read(stop - start)
+
+
+def _header(path: str) -> bytes:
+    with open(path, 'rb') as fh:
+        return fh.readline()
+
+
+def _remember(path: str, offset: int) -> None:
+    mark = _read_bytes(path, max(0, offset - MARK_SIZE), offset)
+    with _marks_lock:
+        _marks[path] = (offset, mark)
+
+
+def _prefix_unchanged(path: str, offset: int) -> bool:
+    """已消费的部分必须以完整行结束，且与上次记录的末尾字节一致（没有记录时只检查行边界）。"""
+    if offset == 0:
+        return True
+    if _read_bytes(path, offset - 1, offset) != b'\n':
+        return False
+    with _marks_lock:
+        mark = _marks.get(path)
+    if mark is None or mark[0] != offset:
+        return True
+    return _read_bytes(path, max(0, offset - MARK_SIZE), offset) == mark[1]
+
+
+def _read_tail(path: str, start: int, size: int) -> Tuple[Optional[pd.DataFrame], int]:
+    """读取 [start, size) 中的完整行，返回 (新增记录, 新的已消费位置)；末尾不完整的行留到下次。"""
+    chunk = _read_bytes(path, start, size)
+    end = chunk.rfind(b'\n') + 1
+    if end == 0:
+        return None, start
+    body = chunk[:end]
+    if start == 0:
+        source = io.BytesIO(body)
+    else:
+        source = io.BytesIO(_header(path) + body)
+    frame = data_store.read_submit_record_file(source)
+    return frame, start + end
+
+
+def _tail_submit_records(records: pd.DataFrame, old_fingerprint: Any,
+                         new_fingerprint: Any) -> Optional[Tuple[pd.DataFrame, pd.DataFrame, Any]]:
+    """submit_records 的增量刷新：只解析新追加的行；无法确认是纯追加时返回 None（全量重建）。"""
+    if not old_fingerprint or not new_fingerprint:
+        return None
+    consumed = {path: size for path, _, size in old_fingerprint}
+    if not set(consumed) <= {path for path, _, _ in new_fingerprint}:
+        return None
+
+    frames: List[pd.DataFrame] = []
+    fingerprint = []
+    for path, mtime, size in new_fingerprint:
+        start = consumed.get(path, 0)
+        if size is None or start is None or size < start or not _prefix_unchanged(path, start):
+            return None
+        offset = start
+        if size > start:
+            try:
+                frame, offset = _read_tail(path, start, size)
+            except (ValueError, KeyError, pd.errors.ParserError):
+                return None
+            if frame is not None and not frame.empty:
+                frames.append(frame)
+        fingerprint.append((path, mtime, offset))
+
+    for path, _, offset in fingerprint:
+        _remember(path, offset)
+    if not frames:
+        return records, None, tuple(fingerprint)
+    delta = data_store.concat_submit_records(frames)
+    return data_store.concat_submit_records([records, delta]), delta, tuple(fingerprint)
+
+
+def _consumed_content(fingerprint: Any) -> Tuple:
+    """
+    只追加的文件，已消费的字节数即确定了读到的内容；mtime 取决于读取时机（例如读到半行时），不计入内容标识。
+    全量加载时记录的是文件大小，文件以完整行结束时与逐段消费的位置相同。
+    """
+    return tuple((path, size) for path, _, size in fingerprint)
+
+
+data_store.registry.register_incremental('submit_records', _tail_submit_records, _consumed_content)
+
+
+def _validate(payload: Any) -> List[Dict[str, Any]]:
+    if isinstance(payload, dict):
+        payload = payload.get('records')
+    if not isinstance(payload, list) or not payload:
+        raise ValueError('请求体应为非空的提交记录列表')
+    if len(payload) > MAX_BATCH:
+        raise ValueError(f'单次最多提交 {MAX_BATCH} 条记录')
+    rows = []
+    for idx, item in enumerate(payload):
+        if not isinstance(item, dict):
+            raise ValueError(f'第 {idx} 条记录不是对象')
+        missing = [col for col in data_store.SUBMIT_RECORD_COLUMNS if item.get(col) in (None, '')]
+        if missing:
+            raise ValueError(f"第 {idx} 条记录缺少字段: {', '.join(missing)}")
+        row = {col: item[col] for col in data_store.SUBMIT_RECORD_COLUMNS}
+        for col in ('time', 'score'):
+            try:
+                row[col] = float(row[col]) if col == 'time' else int(row[col])
+            except (TypeError, ValueError):
+                raise ValueError(f'第 {idx} 条记录的 {col} 不是数字')
+        class_name = str(row['class'])
+        if not class_name or os.sep in class_name or '/' in class_name or class_name.startswith('.'):
+            raise ValueError(f'第 {idx} 条记录的 class 不合法')
+        rows.append(row)
+    return rows
+
+
+def _file_columns(path: str) -> List[str]:
+    """现有文件的表头，按 read_submit_record_file 的规则（去 BOM / 空格、大小写不敏感）对应到规范列名。"""
+    raw = next(csv.reader([_header(path).decode('utf-8-sig')]), [])
+    canonical = {col.lower(): col for col in [INDEX_COLUMN] + data_store.SUBMIT_RECORD_COLUMNS}
+    columns = [col.replace('\ufeff', '').strip() for col in raw]
+    columns = [canonical.get(col.lower(), col) for col in columns]
+    missing = [col for col in data_store.SUBMIT_RECORD_COLUMNS if col not in columns]
+    if missing:
+        raise ValueError(f"{os.path.basename(path)} 的表头缺少列: {', '.join(missing)}")
+    return columns
+
+
+def _next_index(path: str, position: int) -> int:
+    """延续文件中 index 列（第 position 列）的编号。"""
+    size = os.path.getsize(path)
+    tail = _read_bytes(path, max(0, size - 4096), size).rstrip(b'\r\n')
+    last_line = tail.rsplit(b'\n', 1)[-1].decode('utf-8-sig')
+    try:
+        return int(float(next(csv.reader([last_line]))[position])) + 1
+    except (ValueError, IndexError):
+        return 0
+
+
+def _class_rows(path: str, rows: List[Dict[str, Any]]) -> str:
+    """按文件已有表头的列顺序写出记录（新文件使用 index + SUBMIT_RECORD_COLUMNS）；表头中其他列留空。"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator='\r\n')
+    if os.path.exists(path) and os.path.getsize(path) > 0:
+        columns = _file_columns(path)
+        start = _next_index(path, columns.index(INDEX_COLUMN)) if INDEX_COLUMN in columns else 0
+    else:
+        columns = [INDEX_COLUMN] + data_store.SUBMIT_RECORD_COLUMNS
+        start = 0
+        writer.writerow(columns)
+    for offset, row in enumerate(rows):
+        values = {**row, INDEX_COLUMN: start + offset}
+        writer.writerow([values.get(col, '') for col in columns])
+    return buffer.getvalue()
+
+
+def append_submit_records(rows: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    把记录追加到对应班级的 SubmitRecord 文件（按文件表头的列顺序），并立即以增量方式更新内存中的数据集。
+    已有文件的表头缺少必需的列时抛出 ValueError，不写入任何文件。
+    """
+    registry = data_store.registry
+    by_class: Dict[str, List[Dict[str, Any]]] = {}
+    for row in rows:
+        by_class.setdefault(str(row['class']), []).append(row)
+
+    with registry.exclusive(), registry.pinned():
+        records = registry.get('submit_records')
+        old_fingerprint = registry.current().fingerprints.get('submit_records')
+        os.makedirs(data_store.SUBMIT_RECORD_DIR, exist_ok=True)
+        # 先按各文件的表头生成全部内容，表头不合法时不写入任何文件
+        pending = {}
+        for class_name, class_rows in by_class.items():
+            path = os.path.join(data_store.SUBMIT_RECORD_DIR, f'SubmitRecord-{class_name}.csv')
+            pending[path] = _class_rows(path, class_rows)
+        for path, content in pending.items():
+            with open(path, 'a', encoding='utf-8', newline='') as fh:
+                fh.write(content)
+
+        if data_store.shared_mode():
+            # 共享模式下由发布进程读取新增记录并发布新版本，各 worker 随 watcher 切换
+            return {'accepted': len(rows), 'classes': sorted(by_class), 'mode': 'deferred', 'updated': [],
+                    'version': registry.version}
+        result = _tail_submit_records(records, old_fingerprint, registry.fingerprint('submit_records'))
+        if result is None or result[1] is None:
+            updated = registry.reload('submit_records')
+            mode = 'rebuild'
+        else:
+            updated = registry.apply_delta('submit_records', *result)
+            mode = 'delta'
+    with registry.pinned():
+        version = registry.version
+    return {
+        'accepted': len(rows),
+        'classes': sorted(by_class),
+        'mode': mode,
+        'updated': updated,
+        'version': version,
+    }
+
+
+@ingest_bp.route('/submit-records', methods=['POST'])
+def post_submit_records():
+    token = os.environ.get('INGEST_TOKEN')
+    if not token:
+        return jsonify({'error': '未开启数据接入（未配置 INGEST_TOKEN）'}), 404
+    if not hmac.compare_digest(request.headers.get(TOKEN_HEADER, '').encode('utf-8'), token.encode('utf-8')):
+        return jsonify({'error': '无效的接入令牌'}), 403
+    try:
+        rows = _validate(request.get_json(silent=True))
+        return jsonify(append_submit_records(rows))
+    except ValueError as exc:
+        return jsonify({'error': str(exc)}), 400
@@ -0,0 +1,165 @@
+"""
+掌握度排行榜：每道题、每个知识点以及学生总体掌握度上的前 k 名 / 后 k 名，可限定班级或专业。
+
+排行榜在加载时预先计算：按 (范围, 题目 / 知识点) 分组后，每组用 np.partition 只选出前后各 LEADERBOARD_DEPTH 名
+再排序，不对整组排序；随掌握度表、班级名单与学生信息一起重载。请求只是取出现成数组的前 k 项，耗时 O(k)。
+"""
+import os
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from flask import Blueprint, jsonify, request
+
+import data_store
+
+leaderboard_bp = Blueprint('leaderboard', __name__, url_prefix='/api/leaderboard')
+
+# 排行对象 -> (掌握度表, 分组键, 分数列)；overall 为学生在全部题目上的平均掌握度
+SUBJECTS: Dict[str, Tuple[str, Optional[str], str]] = {
+    'title': ('individual_title_mastery', 'title_ID', 'title_mastery_score'),
+    'knowledge': ('individual_knowledge_mastery', 'knowledge', 'knowledge_mastery_score'),
+    'overall': ('individual_title_mastery', None, 'title_mastery_score'),
+}
+ORDERS = ('top', 'bottom')
+# 每个排行榜预先保留的名次数，即 k 的上限
+LEADERBOARD_DEPTH = int(os.environ.get('LEADERBOARD_DEPTH', '100'))
+DEFAULT_K = 10
+
+ALL_SCOPE = ('all', '')
+
+
+class Board:
+    """一个排行榜：前 / 后 depth 名的 student_ID 与分数（已排好序），以及参与排名的总人数。"""
+    __slots__ = ('total', 'top_ids', 'top_scores', 'bottom_ids', 'bottom_scores')
+
+    def __init__(self, ids: np.ndarray, scores: np.ndarray, depth: int):
+        self.total = len(ids)
+        self.top_ids, self.top_scores = _select(ids, scores, depth, descending=True)
+        self.bottom_ids, self.bottom_scores = _select(ids, scores, depth, descending=False)
+
+    def entries(self, order: str, k: int) -> List[Dict[str, Any]]:
+        ids, scores = (self.top_ids, self.top_scores) if order == 'top' else (self.bottom_ids, self.bottom_scores)
+        return [
+            {'rank': rank, 'student_ID': str(student_id), 'score': round(float(score), 6)}
+            for rank, (student_id, score) in enumerate(zip(ids[:k], scores[:k]), start=1)
+        ]
+
+
+def _select(ids: np.ndarray, scores: np.ndarray, depth: int, descending: bool) -> Tuple[np.ndarray, np.ndarray]:
+    """部分选择出 depth 个最高（或最低）分，再只对这 depth 个排序；同分按 student_ID 升序。"""
+    keys = -scores if descending else scores
+    if len(keys) > depth:
+        # 第 depth 名的分数可能有并列，先取出不劣于它的全部行，保证同分时按 student_ID 取舍
+        threshold = np.partition(keys, depth - 1)[depth - 1]
+        chosen = np.flatnonzero(keys <= threshold)
+    else:
+        chosen = np.arange(len(keys))
+    order = chosen[np.lexsort((ids[chosen], keys[chosen]))][:depth]
+    return ids[order], scores[order]
+
+
+class Leaderboards:
+    """(范围类型, 范围值, 分组键) -> Board；范围类型为 all / class / major。"""
+
+    def __init__(self, scores: pd.DataFrame, memberships: pd.DataFrame, depth: int = LEADERBOARD_DEPTH):
+        rows = scores.merge(memberships, on='student_ID', how='inner')
+        ids = rows['student_ID'].to_numpy(dtype=str)
+        values = rows['score'].to_numpy(dtype='float64')
+        self.boards: Dict[Tuple[str, str, str], Board] = {}
+        groups = rows.groupby(['scope', 'scope_value', 'key'], sort=False, observed=True).indices
+        for (scope, scope_value, key), positions in groups.items():
+            self.boards[(scope, scope_value, key)] = Board(ids[positions], values[positions], depth)
+
+    def get(self, scope: Tuple[str, str], key: str = '') -> Optional[Board]:
+        return self.boards.get((scope[0], scope[1], key))
+
+
+def _memberships() -> pd.DataFrame:
+    """student_ID -> 所属范围：全部学生、有提交记录的班级、专业。"""
+    classes = data_store.get('class_students')
+    students = data_store.get('student_info').dropna(subset=['student_ID', 'major'])
+    frames = [
+        pd.DataFrame({'student_ID': students['student_ID'].astype(str).unique(), 'scope': ALL_SCOPE[0],
+                      'scope_value': ALL_SCOPE[1]}),
+        pd.DataFrame({'student_ID': students['student_ID'].astype(str), 'scope': 'major',
+                      'scope_value': students['major'].astype(str)}),
+    ]
+    frames.extend(pd.DataFrame({'student_ID': ids, 'scope': 'class', 'scope_value': class_name})
+                  for class_name, ids in classes.items())
+    return pd.concat(frames, ignore_index=True).drop_duplicates()
+
+
+def _subject_scores(subject: str) -> pd.DataFrame:
+    dataset, key, column = SUBJECTS[subject]
+    df = data_store.get(dataset)
+    scores = pd.DataFrame({
+        'student_ID': df['student_ID'].astype(str),
+        'key': df[key].astype(str) if key else '',
+        'score': pd.to_numeric(df[column], errors='coerce'),
+    }).dropna(subset=['score'])
+    if key is None:
+        scores = scores.groupby('student_ID', as_index=False)['score'].mean().assign(key='')
+    return scores
+
+
+def _register_leaderboard(subject: str) -> None:
+    dataset = SUBJECTS[subject][0]
+    data_store.registry.register(f'leaderboard:{subject}', depends=[dataset, 'class_students', 'student_info'])(
+        lambda: Leaderboards(_subject_scores(subject), _memberships()))
+
+
+for _subject in SUBJECTS:
+    _register_leaderboard(_subject)
+
+
+def load_leaderboards(subject: str) -> Leaderboards:
+    return data_store.get(f'leaderboard:{subject}')
+
+
+def build_leaderboard_payload(subject: str, key: Optional[str] = None, class_name: Optional[str] = None,
+                              major: Optional[str] = None, order: str = 'top', k: int = DEFAULT_K) -> Dict[str, Any]:
+    if SUBJECTS[subject][1] and not key:
+        raise ValueError(f'{subject} 排行榜需要提供 key 参数')
+    if class_name and major:
+        raise ValueError('class 与 major 只能指定一个')
+    scope = ('class', class_name) if class_name else ('major', major) if major else ALL_SCOPE
+    board = load_leaderboards(subject).get(scope, key if SUBJECTS[subject][1] else '')
+    if board is None:
+        raise LookupError('没有符合条件的掌握度数据')
+    return {
+        'subject': subject,
+        'key': key if SUBJECTS[subject][1] else None,
+        'class': class_name,
+        'major': major,
+        'order': order,
+        'total': board.total,
+        'entries': board.entries(order, k),
+    }
+
+
+@leaderboard_bp.route('/<subject>', methods=['GET'])
+def get_leaderboard(subject):
+    """
+    掌握度排行榜，subject 为 title / knowledge / overall
+    query 参数: key（title 为 title_ID，knowledge 为知识点，overall 不需要）, class 或 major（可选）,
+    order（top / bottom，默认 top）, k（默认 10，最大 LEADERBOARD_DEPTH）
+    """
+    try:
+        if subject not in SUBJECTS:
+            raise LookupError(f"未知的排行榜: {subject}，可选 {' / '.join(SUBJECTS)}")
+        order = request.args.get('order', 'top')
+        if order not in ORDERS:
+            raise ValueError(f"order 只能是 {' / '.join(ORDERS)}")
+        try:
+            k = int(request.args.get('k', DEFAULT_K))
+        except ValueError:
+            raise ValueError('k 必须是整数')
+        payload = build_leaderboard_payload(subject, request.args.get('key') or None,
+                                            request.args.get('class') or None, request.args.get('major') or None,
+                                            order, min(max(k, 1), LEADERBOARD_DEPTH))
+        return jsonify(payload)
+    except ValueError as exc:
+        return jsonify({'error': str(exc)}), 400
+    except LookupError as exc:
+        return jsonify({'error': str(exc)}), 404
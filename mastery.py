@@ -0,0 +1,235 @@
+"""
+掌握度计算引擎：直接从原始提交记录 + Data_TitleInfo.csv 算出 data/mastery/ 下的全部表，不再依赖外部离线任务。
+
+计算分三层，全部为向量化的分组归约：
+1. title_stats：按 (维度, title_ID) 求可累加的统计量（提交数、得分和、耗时 / 内存的和与个数、各错误状态的次数）；
+   新记录到来时只需把增量记录的统计量加到受影响的行上（merge_stats），不必重扫全部记录。
+2. title_mastery：由统计量得到 score_rate / average_tc / average_memory / error_type_count / try_num_count，
+   在整张表上做 min-max 归一化（score_rate 越大越好，其余越小越好），按 WEIGHTS 加权得到 title_mastery_score。
+3. knowledge_mastery：按题目分值对 title_mastery_score 加权求和，除以该知识点（子知识点）全部题目的总分。
+
+与仓库中的 data/mastery/*.csv 对照（tests/test_mastery.py）：同一学生对同一题目在同一时刻的重复提交只计一次，
+score_rate / average_tc / average_memory / error_type_count、归一化、权重与知识点汇总都与文件一致；
+try_num_count 在文件中的口径无法从提交记录还原（含 Partially_Correct 提交的题目上偏小），这里取提交次数，
+因此它的 _norm 与 title_mastery_score 与文件不同。MASTERY_SOURCE=auto 时已有的文件照常读取，只计算缺少的表；
+全部改用引擎计算需显式设置 MASTERY_SOURCE=engine。
+
+用法：
+    python mastery.py build            # 重新生成 data/mastery/*.csv
+    python mastery.py build <目录>      # 输出到其他目录
+"""
+import os
+import sys
+from typing import Dict, Iterable, Optional
+
+import numpy as np
+import pandas as pd
+
+from state_cube import ALLOWED_STATES, recode
+
+ERROR_STATES = sorted(ALLOWED_STATES - {'Absolutely_Correct', 'Partially_Correct'})
+ERROR_COLUMNS = [f'error_{state}' for state in ERROR_STATES]
+# 这些列相同的提交视为同一次提交（原始数据中跨文件重复出现的行）
+SUBMISSION_KEYS = ['student_ID', 'title_ID', 'time']
+STAT_COLUMNS = ['try_num_count', 'score_sum', 'tc_sum', 'tc_n', 'memory_sum', 'memory_n'] + ERROR_COLUMNS
+
+# title_mastery_score = Σ 权重 × 归一化后的指标
+WEIGHTS = {
+    'score_rate': 0.3,
+    'average_tc': 0.2,
+    'average_memory': 0.1,
+    'error_type_count': 0.2,
+    'try_num_count': 0.2,
+}
+METRICS = list(WEIGHTS)
+TITLE_COLUMNS = METRICS + ['title_total_score'] + [f'{metric}_norm' for metric in METRICS] + ['title_mastery_score']
+KNOWLEDGE_COLUMNS = ['knowledge_mastery_score', 'knowledge_total_score']
+
+
+def distinct_submissions(records: pd.DataFrame) -> pd.DataFrame:
+    """去掉 SUBMISSION_KEYS 相同的重复提交，保留第一条。"""
+    return records[~records.duplicated(SUBMISSION_KEYS).to_numpy()]
+
+
+def unseen_submissions(records: pd.DataFrame, delta: pd.DataFrame) -> pd.DataFrame:
+    """
+    records 为已追加 delta 之后的全部提交记录，返回 delta 中此前未出现过的提交（delta 内部的重复同样只保留第一条）。
+    只比较 delta 涉及的学生的已有记录。
+    """
+    head = records.iloc[:len(records) - len(delta)]
+    head = head[head['student_ID'].isin(delta['student_ID'].unique()).to_numpy()]
+    keys = pd.concat([head[SUBMISSION_KEYS].astype(object), delta[SUBMISSION_KEYS].astype(object)], ignore_index=True)
+    return delta[~keys.duplicated().to_numpy()[len(head):]]
+
+
+def title_stats(records: pd.DataFrame, key: str, key_map: Optional[Dict[str, str]] = None) -> pd.DataFrame:
+    """
+    按 (key, title_ID) 求可累加的统计量。records 为紧凑 schema、已去重（distinct_submissions）的提交记录；
+    key_map 不为空时先把 student_ID 映射到其他维度（如专业），key 为映射后的列名。
+    状态不在 ALLOWED_STATES 中的行（乱码状态）计入提交次数与各项平均值，但不算作一种错误状态。
+    """
+    if key_map is not None:
+        keys = recode(records['student_ID'], key_map)
+    else:
+        keys = records[key].array
+    states = records['state'].astype(str).to_numpy() if len(records) else np.array([], dtype=object)
+    tc = records['timeconsume'].to_numpy(dtype='float64')
+    memory = records['memory'].to_numpy(dtype='float64')
+    # 内存为 0 的提交视为未成功运行，不计入平均内存
+    memory = np.where(memory > 0, memory, np.nan)
+
+    frame = pd.DataFrame({
+        key: keys,
+        'title_ID': records['title_ID'].array,
+        'try_num_count': 1,
+        'score_sum': records['score'].to_numpy(dtype='int64'),
+        'tc_sum': np.nan_to_num(tc),
+        'tc_n': ~np.isnan(tc),
+        'memory_sum': np.nan_to_num(memory),
+        'memory_n': ~np.isnan(memory),
+    })
+    for state, column in zip(ERROR_STATES, ERROR_COLUMNS):
+        frame[column] = states == state
+    stats = frame.groupby([key, 'title_ID'], observed=True, sort=True).sum().reset_index()
+    for column in (key, 'title_ID'):
+        stats[column] = stats[column].astype(str)
+    counts = [col for col in STAT_COLUMNS if col not in ('tc_sum', 'memory_sum')]
+    stats[counts] = stats[counts].astype('int64')
+    return stats[[key, 'title_ID'] + STAT_COLUMNS]
+
+
+def merge_stats(stats: pd.DataFrame, delta: pd.DataFrame, key: str) -> pd.DataFrame:
+    """把增量统计量加到已有统计量上：只有增量中出现的 (key, title_ID) 行会变化。"""
+    if delta.empty:
+        return stats
+    keys = [key, 'title_ID']
+    merged = stats.set_index(keys).add(delta.set_index(keys), fill_value=0).sort_index()
+    merged = merged.reset_index()
+    counts = [col for col in STAT_COLUMNS if col not in ('tc_sum', 'memory_sum')]
+    merged[counts] = merged[counts].astype('int64')
+    return merged[keys + STAT_COLUMNS]
+
+
+def _normalize(values: pd.Series, higher_is_better: bool) -> pd.Series:
+    """整张表上的 min-max 归一化，越好越接近 1；缺失值记 0，所有值相同时记 1。"""
+    low, high = values.min(), values.max()
+    span = high - low
+    if not span or pd.isna(span):
+        return pd.Series(np.where(values.notna(), 1.0, 0.0), index=values.index)
+    scaled = (values - low) / span if higher_is_better else (high - values) / span
+    return scaled.fillna(0.0)
+
+
+def title_mastery(stats: pd.DataFrame, key: str, title_scores: Dict[str, float]) -> pd.DataFrame:
+    """由 title_stats 的统计量得到与 *_title_mastery.csv 相同列的掌握度表。不在题目信息中的题目被忽略。"""
+    total = stats['title_ID'].map(title_scores)
+    stats = stats[total.notna()]
+    total = total[total.notna()].astype('int64')
+    attempts = stats['try_num_count']
+
+    table = stats[[key, 'title_ID']].copy()
+    table['score_rate'] = stats['score_sum'] / (attempts * total)
+    table['average_tc'] = stats['tc_sum'] / stats['tc_n'].where(stats['tc_n'] > 0)
+    table['average_memory'] = stats['memory_sum'] / stats['memory_n'].where(stats['memory_n'] > 0)
+    table['error_type_count'] = (stats[ERROR_COLUMNS] > 0).sum(axis=1).astype('int64')
+    table['try_num_count'] = attempts
+    table['title_total_score'] = total
+    return score_titles(table)[[key, 'title_ID'] + TITLE_COLUMNS].reset_index(drop=True)
+
+
+def score_titles(table: pd.DataFrame) -> pd.DataFrame:
+    """按 METRICS 各列在整张表上归一化，加权得到 title_mastery_score（原地写入 *_norm 列并返回 table）。"""
+    score = pd.Series(0.0, index=table.index)
+    for metric, weight in WEIGHTS.items():
+        table[f'{metric}_norm'] = _normalize(table[metric], higher_is_better=metric == 'score_rate')
+        score += weight * table[f'{metric}_norm']
+    table['title_mastery_score'] = score
+    return table
+
+
+def knowledge_pairs(title_info: pd.DataFrame, level: str) -> pd.DataFrame:
+    """题目与知识点（或子知识点）的对应关系及题目分值；同一题目可能属于多个知识点。"""
+    pairs = title_info[['title_ID', level, 'score']].dropna(subset=['title_ID', level])
+    return pairs.drop_duplicates(subset=['title_ID', level]).reset_index(drop=True)
+
+
+def knowledge_mastery(titles: pd.DataFrame, key: str, pairs: pd.DataFrame, level: str) -> pd.DataFrame:
+    """
+    knowledge_mastery_score = Σ(title_mastery_score × 题目分值) / 该知识点全部题目的总分，
+    没有作答的题目按 0 计；knowledge_total_score 为该知识点全部题目的总分。
+    """
+    totals = pairs.groupby(level)['score'].sum()
+    joined = titles[[key, 'title_ID', 'title_mastery_score', 'title_total_score']].merge(
+        pairs[['title_ID', level]], on='title_ID'
+    )
+    joined['weighted'] = joined['title_mastery_score'] * joined['title_total_score']
+    table = joined.groupby([key, level], sort=True)['weighted'].sum().reset_index()
+    table['knowledge_total_score'] = table[level].map(totals).astype('int64')
+    table['knowledge_mastery_score'] = table['weighted'] / table['knowledge_total_score']
+    return table[[key, level] + KNOWLEDGE_COLUMNS]
+
+
+# 每张掌握度表：名称 -> (统计维度, 知识点层级；None 表示题目级)
+TABLES = {
+    'class_title_mastery': ('class', None),
+    'individual_title_mastery': ('student_ID', None),
+    'major_title_mastery': ('major', None),
+    'class_knowledge_mastery': ('class', 'knowledge'),
+    'individual_knowledge_mastery': ('student_ID', 'knowledge'),
+    'individual_sub_knowledge_mastery': ('student_ID', 'sub_knowledge'),
+    'major_knowledge_mastery': ('major', 'knowledge'),
+}
+
+
+def title_table_for(key: str) -> str:
+    return next(name for name, (k, level) in TABLES.items() if k == key and level is None)
+
+
+def compute_all(records: pd.DataFrame, title_info: pd.DataFrame,
+                student_info: pd.DataFrame) -> Dict[str, pd.DataFrame]:
+    """一次算出全部掌握度表（离线生成 CSV 时使用；在线服务走 data_store 中按依赖注册的派生数据集）。"""
+    title_scores = title_score_map(title_info)
+    majors = major_map(student_info)
+    records = distinct_submissions(records)
+    titles = {}
+    for key in ('class', 'student_ID', 'major'):
+        stats = title_stats(records, key, majors if key == 'major' else None)
+        titles[key] = title_mastery(stats, key, title_scores)
+    tables = {}
+    for name, (key, level) in TABLES.items():
+        if level is None:
+            tables[name] = titles[key]
+        else:
+            tables[name] = knowledge_mastery(titles[key], key, knowledge_pairs(title_info, level), level)
+    return tables
+
+
+def title_score_map(title_info: pd.DataFrame) -> Dict[str, float]:
+    scores = title_info[['title_ID', 'score']].dropna().drop_duplicates(subset=['title_ID'])
+    return dict(zip(scores['title_ID'], scores['score']))
+
+
+def major_map(student_info: pd.DataFrame) -> Dict[str, str]:
+    students = student_info[['student_ID', 'major']].dropna().drop_duplicates(subset=['student_ID'])
+    return dict(zip(students['student_ID'].astype(str), students['major'].astype(str)))
+
+
+def main(argv: Iterable[str]) -> int:
+    import data_store
+
+    argv = list(argv)
+    command = argv[0] if argv else 'build'
+    if command != 'build':
+        print(__doc__)
+        return 2
+    out_dir = argv[1] if len(argv) > 1 else data_store.MASTERY_DIR
+    os.makedirs(out_dir, exist_ok=True)
+    tables = compute_all(data_store.get('submit_records'), data_store.get('title_info'), data_store.get('student_info'))
+    for name, table in tables.items():
+        table.to_csv(os.path.join(out_dir, f'{name}.csv'), index=False, encoding='utf-8-sig')
+        print(f'{name}: {len(table)} rows')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,218 @@
+"""
+请求与分阶段耗时统计，以 Prometheus 文本格式在 /metrics 输出；可选地在响应中附带 Server-Timing 头。
+
+* metrics.stage('sunburst.tree') 计时一个阶段：耗时计入 app_stage_seconds{stage=...} 直方图，
+  开启 Server-Timing 时同时记入当前请求；数据集加载（load.<数据集>）、各视图的构建与序列化都已接入。
+* 每个请求的总耗时按 endpoint / status 计入 app_request_seconds。
+* 响应缓存命中数、重计算调度、数据集行数与版本等在抓取 /metrics 时才读取，不增加请求开销。
+
+| 环境变量 | 默认值 | 说明 |
+| --- | --- | --- |
+| METRICS | 1 | 为 0 时关闭请求与阶段计时（stage() 退化为空操作），/metrics 只输出抓取时读取的指标 |
+| SERVER_TIMING | 0 | 为 1 时在响应中附带 Server-Timing 头（各阶段与 total 的毫秒数） |
+"""
+import bisect
+import contextvars
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from flask import Response, g, request
+
+ENABLED = os.environ.get('METRICS', '1') != '0'
+SERVER_TIMING = os.environ.get('SERVER_TIMING', '0') == '1'
+
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# 当前请求的阶段耗时（仅开启 Server-Timing 时存在）；计算线程中通过 collecting() 接续
+_timings: contextvars.ContextVar[Optional[List[Tuple[str, float]]]] = contextvars.ContextVar('timings', default=None)
+_NOOP = nullcontext()
+
+
+class Histogram:
+    """按标签值分组的累计直方图。"""
+
+    def __init__(self, name: str, help_text: str, labels: Tuple[str, ...], buckets: Tuple[float, ...] = BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labels = labels
+        self.buckets = buckets
+        self._series: Dict[Tuple[str, ...], List[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, label_values: Tuple[str, ...], seconds: float) -> None:
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                # [落在各 bucket（最后一个为 +Inf）内的计数..., 总和, 总数]，输出时再累加
+                series = self._series[label_values] = [0.0] * (len(self.buckets) + 3)
+            series[bisect.bisect_left(self.buckets, seconds)] += 1
+            series[-2] += seconds
+            series[-1] += 1
+
+    def render(self) -> Iterator[str]:
+        yield f'# HELP {self.name} {self.help}'
+        yield f'# TYPE {self.name} histogram'
+        with self._lock:
+            items = sorted((key, list(values)) for key, values in self._series.items())
+        for label_values, series in items:
+            labels = _labels(zip(self.labels, label_values))
+            prefix = labels[1:-1] + ',' if labels else ''
+            cumulative = 0.0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                yield f'{self.name}_bucket{{{prefix}le="{bound}"}} {cumulative:g}'
+            yield f'{self.name}_bucket{{{prefix}le="+Inf"}} {series[-1]:g}'
+            yield f'{self.name}_sum{labels} {series[-2]:.6f}'
+            yield f'{self.name}_count{labels} {series[-1]:g}'
+
+
+STAGE_SECONDS = Histogram('app_stage_seconds', '各处理阶段耗时（秒）', ('stage',))
+REQUEST_SECONDS = Histogram('app_request_seconds', '请求总耗时（秒）', ('endpoint', 'status'))
+
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(pairs: Iterable[Tuple[str, str]]) -> str:
+    text = ','.join(f'{key}="{_escape(value)}"' for key, value in pairs)
+    return f'{{{text}}}' if text else ''
+
+
+class _Stage:
+    __slots__ = ('name', 'started')
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self) -> '_Stage':
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        elapsed = time.perf_counter() - self.started
+        STAGE_SECONDS.observe((self.name,), elapsed)
+        timings = _timings.get()
+        if timings is not None:
+            timings.append((self.name, elapsed))
+
+
+def stage(name: str):
+    """计时一个处理阶段；关闭统计时返回空的上下文管理器。"""
+    return _Stage(name) if ENABLED else _NOOP
+
+
+def collector() -> Optional[List[Tuple[str, float]]]:
+    """当前请求的阶段耗时列表（未开启 Server-Timing 时为 None），交给 collecting() 在其他线程中接续。"""
+    return _timings.get()
+
+
+@contextmanager
+def collecting(timings: Optional[List[Tuple[str, float]]]):
+    token = _timings.set(timings)
+    try:
+        yield
+    finally:
+        _timings.reset(token)
+
+
+def _server_timing(timings: List[Tuple[str, float]], total: float) -> str:
+    # 同一阶段出现多次（如多个 section 的序列化）时合并
+    merged: Dict[str, float] = {}
+    for name, seconds in timings:
+        token = re.sub(r'[^A-Za-z0-9_.\-]', '_', name)
+        merged[token] = merged.get(token, 0.0) + seconds
+    parts = [f'{name};dur={seconds * 1000:.2f}' for name, seconds in merged.items()]
+    parts.append(f'total;dur={total * 1000:.2f}')
+    return ', '.join(parts)
+
+
+def _gauges() -> Iterator[str]:
+    """抓取时读取的指标：响应缓存、重计算调度、数据集。"""
+    import compute
+    import data_store
+    import response_cache
+
+    cache = response_cache.cache
+    yield '# HELP app_response_cache_requests_total 响应缓存查询次数'
+    yield '# TYPE app_response_cache_requests_total counter'
+    yield f'app_response_cache_requests_total{{result="hit"}} {cache.hits}'
+    yield f'app_response_cache_requests_total{{result="miss"}} {cache.misses}'
+    yield '# HELP app_response_cache_entries 响应缓存条目数'
+    yield '# TYPE app_response_cache_entries gauge'
+    yield f'app_response_cache_entries {len(cache)}'
+
+    scheduler = compute.scheduler
+    yield '# HELP app_compute_coalesced_total 合并到进行中计算的请求数'
+    yield '# TYPE app_compute_coalesced_total counter'
+    yield f'app_compute_coalesced_total {scheduler.coalesced}'
+    yield '# HELP app_compute_rejected_total 因排队已满被拒绝（503）的计算数'
+    yield '# TYPE app_compute_rejected_total counter'
+    yield f'app_compute_rejected_total {scheduler.rejected}'
+    yield '# HELP app_compute_pending 正在排队或执行的计算数'
+    yield '# TYPE app_compute_pending gauge'
+    yield f'app_compute_pending {scheduler.pending}'
+
+    snapshot = data_store.registry.current()
+    yield '# HELP app_data_version 当前数据 Snapshot 的版本号'
+    yield '# TYPE app_data_version gauge'
+    yield f'app_data_version {snapshot.version}'
+    yield '# HELP app_dataset_rows 已加载数据集的行数'
+    yield '# TYPE app_dataset_rows gauge'
+    # 其他线程的懒加载可能同时向 Snapshot 追加数据集，先取一份副本再遍历
+    for name, value in sorted(list(snapshot.values.items()), key=lambda item: item[0]):
+        frame = getattr(value, 'frame', value)
+        if hasattr(frame, 'shape'):
+            yield f'app_dataset_rows{_labels([("dataset", name)])} {len(frame)}'
+    yield '# HELP app_dataset_load_seconds 数据集最近一次加载的耗时（秒）'
+    yield '# TYPE app_dataset_load_seconds gauge'
+    for name, seconds in sorted(data_store.registry.load_seconds.items()):
+        yield f'app_dataset_load_seconds{_labels([("dataset", name)])} {seconds:.6f}'
+
+
+def render() -> str:
+    lines = list(_gauges())
+    if ENABLED:
+        lines.extend(REQUEST_SECONDS.render())
+        lines.extend(STAGE_SECONDS.render())
+    return '\n'.join(lines) + '\n'
+
+
+def init_app(app) -> None:
+    """注册 /metrics，并在开启统计时记录每个请求的耗时（以及 Server-Timing 头）。"""
+
+    @app.route('/metrics', methods=['GET'])
+    def get_metrics():
+        return Response(render(), content_type=CONTENT_TYPE)
+
+    if not ENABLED:
+        return
+
+    @app.before_request
+    def _start_timer():
+        g.metrics_started = time.perf_counter()
+        if SERVER_TIMING:
+            _timings.set([])
+
+    @app.after_request
+    def _record_request(response: Response) -> Response:
+        started = g.pop('metrics_started', None)
+        if started is None:
+            return response
+        elapsed = time.perf_counter() - started
+        REQUEST_SECONDS.observe((request.endpoint or 'unknown', str(response.status_code)), elapsed)
+        if SERVER_TIMING:
+            timings = _timings.get()
+            if timings is not None:
+                response.headers['Server-Timing'] = _server_timing(timings, elapsed)
+        return response
+
+    if SERVER_TIMING:
+        @app.teardown_request
+        def _clear_timings(exc=None):
+            _timings.set(None)
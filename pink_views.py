@@ -1,89 +1,40 @@
-from flask import Blueprint, jsonify
+from flask import Blueprint, jsonify, request
 import pandas as pd
-import os
-from functools import lru_cache
-from typing import List, Dict, Any
-import glob
+from typing import List, Dict, Any, Optional
+
+import data_store
+from response_cache import cached_json
+from state_cube import GRANULARITIES, StateCube, parse_day, time_buckets
 
 
 pink_bp = Blueprint('pink', __name__, url_prefix='/api/pink')
 
-DATA_DIR = os.path.join(os.path.dirname(__file__), 'data')
-TITLE_INFO_FILE = os.path.join(DATA_DIR, 'Data_TitleInfo.csv')
-SUBMIT_RECORD_DIR = os.path.join(DATA_DIR, 'Data_SubmitRecord')
-CLASS_TITLE_MASTERY = os.path.join(DATA_DIR, 'mastery', 'class_title_mastery.csv')
-ALLOWED_STATES = {
-    'Absolutely_Correct',
-    'Absolutely_Error',
-    'Partially_Correct',
-    'Error1', 'Error2', 'Error3', 'Error4', 'Error5', 'Error6', 'Error7', 'Error8', 'Error9'
-}
-
-
-def _normalize_columns(df: pd.DataFrame) -> pd.DataFrame:
-    df.columns = (
-        df.columns.astype(str)
-        .str.replace('\ufeff', '', regex=False)
-        .str.strip()
-    )
-    return df
 
+def load_title_info() -> pd.DataFrame:
+    return data_store.get('title_info')
 
-def _normalize_column_name(df: pd.DataFrame, target: str) -> pd.DataFrame:
-    if target in df.columns:
-        return df
-    matches = [col for col in df.columns if col.lower() == target.lower()]
-    if matches:
-        df = df.rename(columns={matches[0]: target})
-    return df
 
+def load_title_alias_map() -> Dict[str, str]:
+    return data_store.get('title_alias_map')
 
-@lru_cache(maxsize=1)
-def load_title_info() -> pd.DataFrame:
-    df = pd.read_csv(TITLE_INFO_FILE, encoding='utf-8-sig')
-    df = _normalize_columns(df)
-    for col in ['title_ID', 'knowledge', 'sub_knowledge', 'score']:
-        df = _normalize_column_name(df, col)
 
-    if 'score' not in df.columns:
-        df['score'] = 1
+def load_submit_records() -> pd.DataFrame:
+    return data_store.get('submit_records')
 
-    for col in ['title_ID', 'knowledge', 'sub_knowledge']:
-        if col not in df.columns:
-            df[col] = ''
-        df[col] = df[col].astype(str).str.replace('\ufeff', '', regex=False).str.strip()
 
-    df['score'] = pd.to_numeric(df['score'], errors='coerce').fillna(0)
-    return df[['title_ID', 'score', 'knowledge', 'sub_knowledge']].drop_duplicates()
+def load_title_metrics() -> pd.DataFrame:
+    return data_store.get('title_metrics')
 
 
-@lru_cache(maxsize=1)
-def load_title_alias_map() -> Dict[str, str]:
+@data_store.registry.register('title_alias_map', depends=['title_info'])
+def _build_title_alias_map() -> Dict[str, str]:
     titles = sorted(load_title_info()['title_ID'].dropna().unique().tolist())
     return {title: f"Q_{idx + 1:02d}" for idx, title in enumerate(titles)}
 
 
-@lru_cache(maxsize=1)
-def load_submit_records() -> pd.DataFrame:
-    csv_files = glob.glob(os.path.join(SUBMIT_RECORD_DIR, 'SubmitRecord-Class*.csv'))
-    if not csv_files:
-        columns = ['class', 'time', 'state', 'score', 'title_ID', 'method', 'memory', 'timeconsume', 'student_ID']
-        return pd.DataFrame(columns=columns)
-    frames = []
-    for path in csv_files:
-        df = pd.read_csv(path, encoding='utf-8-sig')
-        df = _normalize_columns(df)
-        for col in ['class', 'time', 'state', 'score', 'title_ID', 'method', 'memory', 'timeconsume', 'student_ID']:
-            df = _normalize_column_name(df, col)
-        frames.append(df[['class', 'time', 'state', 'score', 'title_ID', 'method', 'memory', 'timeconsume', 'student_ID']])
-    merged = pd.concat(frames, ignore_index=True)
-    merged['score'] = pd.to_numeric(merged['score'], errors='coerce').fillna(0)
-    return merged
-
-
-@lru_cache(maxsize=1)
-def load_title_metrics() -> pd.DataFrame:
-    df = pd.read_csv(CLASS_TITLE_MASTERY)
+@data_store.registry.register('title_metrics', depends=['class_title_mastery'])
+def _build_title_metrics() -> pd.DataFrame:
+    df = data_store.get('class_title_mastery')
     grouped = (
         df.groupby('title_ID')
         .agg({
@@ -101,6 +52,48 @@ def load_title_metrics() -> pd.DataFrame:
     return grouped[['title_ID', 'match_index', 'correct_rate', 'discrimination']]
 
 
+def load_title_submission_stats() -> pd.DataFrame:
+    return data_store.get('title_submission_stats')
+
+
+def _submission_stats(records: pd.DataFrame) -> pd.DataFrame:
+    """按题目累计提交数与耗时 / 内存的 和、非空个数；均值在使用时再算，便于增量累加。"""
+    # 先在 title_ID 的 category codes 上聚合，再转成字符串键
+    numeric = pd.DataFrame({
+        'title_ID': records['title_ID'],
+        'timeconsume': records['timeconsume'].astype('float64'),
+        'memory': records['memory'].astype('float64'),
+    })
+    stats = (
+        numeric.groupby('title_ID', observed=True)
+        .agg(
+            submission_count=('title_ID', 'size'),
+            timeconsume_sum=('timeconsume', 'sum'),
+            timeconsume_n=('timeconsume', 'count'),
+            memory_sum=('memory', 'sum'),
+            memory_n=('memory', 'count')
+        )
+        .reset_index()
+    )
+    stats['title_ID'] = stats['title_ID'].astype(str)
+    return stats
+
+
+@data_store.registry.register('title_submission_stats', depends=['submit_records'])
+def _build_title_submission_stats() -> pd.DataFrame:
+    return _submission_stats(load_submit_records())
+
+
+def _merge_title_submission_stats(stats: pd.DataFrame, delta: pd.DataFrame) -> pd.DataFrame:
+    if delta.empty:
+        return stats
+    merged = pd.concat([stats, _submission_stats(delta)], ignore_index=True)
+    return merged.groupby('title_ID', sort=True).sum().reset_index()
+
+
+data_store.registry.register_delta('title_submission_stats', _merge_title_submission_stats)
+
+
 def build_heatmap_payload() -> Dict[str, Any]:
     title_df = load_title_info()
     alias_map = load_title_alias_map()
@@ -111,27 +104,24 @@ def build_heatmap_payload() -> Dict[str, Any]:
     knowledge_index = {label: idx for idx, label in enumerate(x_labels)}
     title_index = {title: idx for idx, title in enumerate(y_titles)}
 
-    heatmap_rows: List[List[Any]] = []
-    for _, row in title_df.iterrows():
-        title_id = row['title_ID']
-        knowledge = row['knowledge']
-        sub_knowledge = row.get('sub_knowledge', '')
-        metric_row = metrics_df.loc[title_id] if title_id in metrics_df.index else None
-        match_index = int(metric_row['match_index']) if metric_row is not None else 0
-        correct_rate = float(metric_row['correct_rate']) if metric_row is not None else 0.0
-        discrimination = float(metric_row['discrimination']) if metric_row is not None else 0.0
-
-        heatmap_rows.append([
-            knowledge_index.get(knowledge, 0),
-            title_index.get(title_id, 0),
-            alias_map.get(title_id, title_id),
-            title_id,
-            knowledge,
-            sub_knowledge,
-            match_index,
-            correct_rate,
-            discrimination
-        ])
+    # 按列取值后再拼行，不逐行 iterrows；没有指标的题目记 0
+    titles = title_df['title_ID']
+    knowledge = title_df['knowledge']
+    matched = titles.isin(metrics_df.index)
+    sub_knowledge = (title_df['sub_knowledge'] if 'sub_knowledge' in title_df.columns
+                     else pd.Series('', index=title_df.index))
+    columns = [
+        knowledge.map(knowledge_index).fillna(0).astype('int64').tolist(),
+        titles.map(title_index).fillna(0).astype('int64').tolist(),
+        [alias_map.get(title_id, title_id) for title_id in titles.tolist()],
+        titles.tolist(),
+        knowledge.tolist(),
+        sub_knowledge.tolist(),
+        titles.map(metrics_df['match_index']).where(matched, 0).astype('int64').tolist(),
+        titles.map(metrics_df['correct_rate']).where(matched, 0.0).astype('float64').tolist(),
+        titles.map(metrics_df['discrimination']).where(matched, 0.0).astype('float64').tolist(),
+    ]
+    heatmap_rows: List[List[Any]] = [list(row) for row in zip(*columns)]
 
     return {
         'heatedConfig': {
@@ -145,25 +135,17 @@ def build_heatmap_payload() -> Dict[str, Any]:
 def build_bubble_payload() -> Dict[str, Any]:
     title_df = load_title_info()[['title_ID', 'knowledge', 'score']].drop_duplicates(subset=['title_ID'])
     title_df = title_df.rename(columns={'score': 'title_score'})
-    submit_df = load_submit_records()
-    if submit_df.empty:
+    stats = load_title_submission_stats()
+    if stats.empty:
         return {'bubbleData': [], 'xAxisLabels': []}
 
-    merged = submit_df.merge(title_df, on='title_ID', how='left')
-    merged['timeconsume'] = pd.to_numeric(merged['timeconsume'], errors='coerce')
-    merged['memory'] = pd.to_numeric(merged['memory'], errors='coerce')
-
-    agg = (
-        merged.groupby('title_ID')
-        .agg(
-            knowledge=('knowledge', 'first'),
-            title_score=('title_score', 'first'),
-            submission_count=('title_ID', 'count'),
-            avg_timeconsume=('timeconsume', lambda x: pd.Series(x).mean(skipna=True)),
-            avg_memory=('memory', lambda x: pd.Series(x).mean(skipna=True))
-        )
-        .reset_index()
-    )
+    agg = pd.DataFrame({
+        'title_ID': stats['title_ID'],
+        'submission_count': stats['submission_count'],
+        'avg_timeconsume': stats['timeconsume_sum'] / stats['timeconsume_n'].where(stats['timeconsume_n'] > 0),
+        'avg_memory': stats['memory_sum'] / stats['memory_n'].where(stats['memory_n'] > 0),
+    })
+    agg = agg.merge(title_df, on='title_ID', how='left')
 
     overall_time = agg['avg_timeconsume'].mean() or 1
     overall_memory = agg['avg_memory'].mean() or 1
@@ -198,14 +180,15 @@ def build_bubble_payload() -> Dict[str, Any]:
 
 
 def _build_state_series(df: pd.DataFrame, group_col: str, labels: List[str]) -> Dict[str, Any]:
+    """df 为立方体中的计数行（含 count 列）。"""
     if not labels:
         return {'xLabels': [], 'stateData': []}
     states = sorted(df['state'].dropna().unique().tolist())
     if not states:
         return {'xLabels': labels, 'stateData': []}
     counts = (
-        df.groupby([group_col, 'state'])
-        .size()
+        df.groupby([group_col, 'state'], observed=True)['count']
+        .sum()
         .unstack(fill_value=0)
         .reindex(index=labels, columns=states, fill_value=0)
     )
@@ -216,40 +199,79 @@ def _build_state_series(df: pd.DataFrame, group_col: str, labels: List[str]) ->
     for state in states:
         state_data.append({
             'stateCode': state,
-            'ratios': [float(ratios.loc[label, state]) for label in labels]
+            'ratios': [float(value) for value in ratios[state].to_numpy()]
         })
     return {'xLabels': labels, 'stateData': state_data}
 
 
-def build_state_trends_payload() -> Dict[str, Any]:
+def _rollup(counts: pd.DataFrame, dimension: str) -> pd.DataFrame:
+    """先把立方体收缩到 (dimension, state) 两维，丢弃 dimension 缺失的行。"""
+    return (
+        counts.groupby([dimension, 'state'], observed=True)['count']
+        .sum()
+        .reset_index()
+    )
+
+
+def load_title_knowledge() -> Dict[str, str]:
+    return data_store.get('title_knowledge')
+
+
+def load_state_cube() -> StateCube:
+    return data_store.get('state_cube')
+
+
+@data_store.registry.register('title_knowledge', depends=['title_info'])
+def _build_title_knowledge() -> Dict[str, str]:
+    title_meta = load_title_info()[['title_ID', 'knowledge']].drop_duplicates(subset=['title_ID'])
+    return dict(zip(title_meta['title_ID'], title_meta['knowledge']))
+
+
+@data_store.registry.register('state_cube', depends=['submit_records', 'title_knowledge'])
+def _build_state_cube() -> StateCube:
+    return StateCube.from_records(load_submit_records(), load_title_knowledge())
+
+
+def _merge_state_cube(cube: StateCube, delta: pd.DataFrame) -> StateCube:
+    return cube.merge(StateCube.from_records(delta, load_title_knowledge()))
+
+
+data_store.registry.register_delta('state_cube', _merge_state_cube)
+
+
+def build_state_trends_payload(class_name: Optional[str] = None, student_id: Optional[str] = None,
+                               start: Optional[pd.Timestamp] = None, end: Optional[pd.Timestamp] = None,
+                               granularity: str = 'week') -> Dict[str, Any]:
+    """
+    从状态立方体汇总三个维度的状态占比。
+    class_name / [start, end) 直接在立方体上过滤；指定 student_ID 时只用该学生的提交记录（索引切片）现建一个小立方体。
+    """
+    if granularity not in GRANULARITIES:
+        raise ValueError(f"granularity 只能是 {' / '.join(GRANULARITIES)}")
     records = load_submit_records()
     if records.empty:
         return {'dimensionData': {'time': {}, 'knowledge': {}, 'method': {}}}
 
-    title_meta = load_title_info()[['title_ID', 'knowledge']].drop_duplicates(subset=['title_ID'])
-    merged = records.merge(title_meta, on='title_ID', how='left')
-    merged['time_dt'] = pd.to_datetime(merged['time'], unit='s', errors='coerce')
-    merged = merged.dropna(subset=['state'])
-    merged['state'] = merged['state'].astype(str).str.strip()
-    merged = merged[merged['state'].isin(ALLOWED_STATES)]
-
-    time_section = {}
-    time_df = merged.dropna(subset=['time_dt']).copy()
+    if student_id:
+        student_records = data_store.lookup('submit_records', 'student_ID', student_id)
+        cube = StateCube.from_records(student_records, load_title_knowledge())
+    else:
+        cube = load_state_cube()
+    counts = cube.query(class_name, start, end)
+
+    time_df = _rollup(counts, 'day')
     if not time_df.empty:
-        time_df['week_start'] = time_df['time_dt'].dt.to_period('W').dt.start_time
-        unique_weeks = sorted(time_df['week_start'].dropna().unique().tolist())
-        week_labels = {wk: f"第{i + 1}周({wk.strftime('%Y-%m-%d')})" for i, wk in enumerate(unique_weeks)}
-        time_df['time_bucket'] = time_df['week_start'].map(week_labels)
-        ordered_time_labels = [week_labels[wk] for wk in unique_weeks]
+        buckets, ordered_time_labels = time_buckets(time_df['day'], granularity)
+        time_df = time_df.assign(time_bucket=buckets)
         time_section = _build_state_series(time_df, 'time_bucket', ordered_time_labels)
     else:
         time_section = {'xLabels': [], 'stateData': []}
 
-    knowledge_df = merged.dropna(subset=['knowledge']).copy()
+    knowledge_df = _rollup(counts, 'knowledge')
     knowledge_labels = sorted(knowledge_df['knowledge'].unique().tolist())
     knowledge_section = _build_state_series(knowledge_df, 'knowledge', knowledge_labels)
 
-    method_df = merged.dropna(subset=['method']).copy()
+    method_df = _rollup(counts, 'method')
     method_labels = sorted(method_df['method'].unique().tolist())
     method_section = _build_state_series(method_df, 'method', method_labels)
 
@@ -265,20 +287,35 @@ def build_state_trends_payload() -> Dict[str, Any]:
 @pink_bp.route('/heatmap', methods=['GET'])
 def get_heatmap_dataset():
     """粉色视图一：题目匹配热力图"""
-    payload = build_heatmap_payload()
-    return jsonify(payload)
+    return cached_json('heatmap', ['title_info', 'title_alias_map', 'title_metrics'], build_heatmap_payload)
 
 
 @pink_bp.route('/bubbles', methods=['GET'])
 def get_bubble_dataset():
     """粉色视图二：题目综合表现气泡图"""
-    payload = build_bubble_payload()
-    return jsonify(payload)
+    return cached_json('bubbles', ['title_info', 'title_submission_stats'], build_bubble_payload)
 
 
 @pink_bp.route('/state-trends', methods=['GET'])
 def get_state_trends():
-    """粉色视图三：三维度答题状态折线图"""
-    payload = build_state_trends_payload()
-    return jsonify(payload)
-
+    """
+    粉色视图三：三维度答题状态折线图
+    可选 query 参数: class, student_ID, from, to（YYYY-MM-DD 或 Unix 秒，左闭右开，精确到天）,
+    granularity（day / week / month，默认 week）
+    """
+    try:
+        params = (
+            request.args.get('class') or None,
+            request.args.get('student_ID') or None,
+            parse_day(request.args.get('from')),
+            parse_day(request.args.get('to')),
+            request.args.get('granularity', 'week'),
+        )
+        return cached_json(
+            'state-trends',
+            ['submit_records', 'state_cube'],
+            lambda: build_state_trends_payload(*params),
+            params,
+        )
+    except ValueError as exc:
+        return jsonify({'error': str(exc)}), 400
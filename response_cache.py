@@ -0,0 +1,132 @@
+"""
+全局视图的响应缓存：同一数据版本下的响应体只构建、序列化、压缩一次。
+
+* 缓存键为 (视图名, 查询参数)，条目记录生成时所依赖数据集的版本号；版本变化（热加载、增量接入）后自动重建。
+* 缓存的是序列化后的 JSON 字节及其 gzip / brotli（安装了 brotli 时）压缩版本，按 Accept-Encoding 直接返回。
+* 未命中时的构建经 compute.py 调度：并发的相同请求只构建一次，且受线程池大小与排队上限约束。
+* ETag 为响应体的摘要，带 If-None-Match 的重复请求直接返回 304。
+"""
+import gzip
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, NamedTuple, Optional, Tuple
+
+from flask import Response, jsonify, request
+
+import compute
+import data_store
+import metrics
+
+try:
+    import brotli
+except ImportError:  # brotli 为可选依赖
+    brotli = None
+
+DEFAULT_MAX_ENTRIES = 256
+# 小于该大小的响应不压缩
+MIN_COMPRESS_SIZE = 1024
+
+
+class CachedBody(NamedTuple):
+    etag: str
+    mimetype: str
+    encodings: Dict[str, bytes]
+
+
+class ResponseCache:
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries: 'OrderedDict[Tuple, Tuple[Tuple[int, ...], CachedBody]]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Tuple, versions: Tuple[int, ...]) -> Optional[CachedBody]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != versions:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key: Tuple, versions: Tuple[int, ...], body: CachedBody) -> None:
+        with self._lock:
+            self._entries[key] = (versions, body)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+cache = ResponseCache(int(os.environ.get('RESPONSE_CACHE_SIZE', DEFAULT_MAX_ENTRIES) or DEFAULT_MAX_ENTRIES))
+
+
+def _compress(raw: bytes) -> Dict[str, bytes]:
+    encodings = {'identity': raw}
+    if len(raw) < MIN_COMPRESS_SIZE:
+        return encodings
+    encodings['gzip'] = gzip.compress(raw, compresslevel=6)
+    if brotli is not None:
+        encodings['br'] = brotli.compress(raw, quality=5)
+    return encodings
+
+
+def _etag(raw: bytes) -> str:
+    # 按内容计算，进程重启或多个 worker 之间同样的响应体得到同样的 ETag
+    return hashlib.sha1(raw).hexdigest()[:20]
+
+
+def _negotiate(encodings: Dict[str, bytes]) -> str:
+    accepted = request.accept_encodings
+    for encoding in ('br', 'gzip'):
+        if encoding in encodings and accepted[encoding]:
+            return encoding
+    return 'identity'
+
+
+def _respond(body: CachedBody) -> Response:
+    if request.if_none_match.contains(body.etag):
+        response = Response(status=304)
+    else:
+        encoding = _negotiate(body.encodings)
+        response = Response(body.encodings[encoding], mimetype=body.mimetype)
+        if encoding != 'identity':
+            response.headers['Content-Encoding'] = encoding
+    response.set_etag(body.etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    if len(body.encodings) > 1:
+        response.headers['Vary'] = 'Accept-Encoding'
+    return response
+
+
+def cached_json(name: str, datasets: Iterable[str], build: Callable[[], Any], params: Tuple = ()) -> Response:
+    """
+    返回 build() 的 JSON 响应，同一数据版本下只构建一次。
+    datasets 为 build 所依赖的数据集（派生数据集的版本号会随上游一起变化，列出最终使用的即可）；
+    params 为影响结果的、已规范化的查询参数。build 抛出的异常不会被缓存。
+    未命中时在 compute 的线程池中构建，同一版本的并发请求只构建一次。
+    """
+    key = (name, params)
+    versions = tuple(data_store.registry.dataset_version(ds) for ds in datasets)
+    body = cache.get(key, versions)
+    if body is None:
+        def render() -> CachedBody:
+            with metrics.stage(f'build.{name}'):
+                payload = build()
+            raw = jsonify(payload).get_data()
+            with metrics.stage('compress'):
+                rendered = CachedBody(_etag(raw), 'application/json', _compress(raw))
+            cache.put(key, versions, rendered)
+            return rendered
+        body = compute.run(('response', key, versions), render)
+    return _respond(body)
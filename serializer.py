@@ -0,0 +1,158 @@
+"""
+JSON 序列化层：DataFrame / NumPy 按列转换，直接编码为 bytes，NaN / NaT / pd.NA 一律输出为 null。
+
+* 安装了 orjson 时使用 orjson（原生支持 NumPy 数组与标量），否则回退到标准库 json 的 C 编码器
+  （与 Flask 默认 provider 相同，只在含有 NaN / inf 时额外处理）；环境变量 JSON_SERIALIZER=json 可强制使用标准库。
+* FastJSONProvider 替换 Flask 默认的 JSON provider，jsonify 与流式接口都会走这里。
+* records(df) 替代 df.to_dict('records')：按列取值（每列一次 tolist），不逐行装箱。
+"""
+import json
+import math
+import os
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+from flask import Response
+from flask.json.provider import DefaultJSONProvider
+
+import metrics
+
+try:
+    import orjson
+except ImportError:  # orjson 为可选依赖
+    orjson = None
+
+BACKENDS = ('orjson', 'json')
+
+
+def _column_values(series: pd.Series) -> List[Any]:
+    """一列转为 Python 列表，缺失值为 None。"""
+    dtype = series.dtype
+    if isinstance(dtype, np.dtype) and dtype.kind in 'iub':
+        return series.to_numpy().tolist()
+    if isinstance(dtype, np.dtype) and dtype.kind == 'f':
+        values = series.to_numpy()
+        items = values.tolist()
+        mask = ~np.isfinite(values)
+    elif isinstance(dtype, np.dtype) and dtype.kind == 'M':
+        mask = series.isna().to_numpy()
+        items = [value.isoformat() for value in series]
+    else:
+        values = series.to_numpy(dtype=object)
+        items = values.tolist()
+        mask = pd.isna(values)
+    if mask.any():
+        for pos in np.flatnonzero(mask).tolist():
+            items[pos] = None
+    return items
+
+
+def records(frame: pd.DataFrame) -> List[Dict[str, Any]]:
+    """等价于 frame.to_dict('records')（缺失值为 None），按列转换后再拼行。"""
+    columns = [str(col) for col in frame.columns]
+    values = [_column_values(frame.iloc[:, pos]) for pos in range(frame.shape[1])]
+    return [dict(zip(columns, row)) for row in zip(*values)]
+
+
+def _default(obj: Any) -> Any:
+    """orjson / json 无法直接编码的对象。"""
+    if isinstance(obj, pd.DataFrame):
+        return records(obj)
+    if isinstance(obj, (pd.Series, pd.Index)):
+        return _column_values(pd.Series(obj))
+    if isinstance(obj, np.ndarray):
+        return _column_values(pd.Series(obj.ravel())) if obj.ndim == 1 else [_default(row) for row in obj]
+    if isinstance(obj, np.generic):
+        value = obj.item()
+        return None if isinstance(value, float) and not math.isfinite(value) else value
+    if isinstance(obj, pd.Timestamp):
+        return None if pd.isna(obj) else obj.isoformat()
+    if obj is pd.NA or obj is pd.NaT:
+        return None
+    if isinstance(obj, (set, frozenset)):
+        return sorted(obj)
+    if hasattr(obj, 'isoformat'):
+        return obj.isoformat()
+    raise TypeError(f'Object of type {type(obj).__name__} is not JSON serializable')
+
+
+def _sanitize(obj: Any) -> Any:
+    """标准库路径的回退：把 NaN / inf 换成 None，并提前转换 pandas / NumPy 对象。"""
+    if isinstance(obj, float):
+        return obj if math.isfinite(obj) else None
+    if isinstance(obj, dict):
+        return {key: _sanitize(value) for key, value in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_sanitize(value) for value in obj]
+    if isinstance(obj, (str, int, bool)) or obj is None:
+        return obj
+    return _sanitize(_default(obj))
+
+
+def _orjson_dumps(obj: Any, sort_keys: bool = False) -> bytes:
+    option = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+    if sort_keys:
+        option |= orjson.OPT_SORT_KEYS
+    return orjson.dumps(obj, default=_default, option=option)
+
+
+def _json_dumps(obj: Any, sort_keys: bool = False) -> bytes:
+    """
+    标准库路径：与 Flask 默认 provider 一样直接交给 C 编码器（pandas / NumPy 对象经 _default 转换）；
+    只有负载中确实含有 NaN / inf 时，才用 _sanitize 逐层替换为 None 后重新编码。
+    """
+    options = {'ensure_ascii': False, 'sort_keys': sort_keys, 'separators': (',', ':'), 'allow_nan': False}
+    try:
+        text = json.dumps(obj, default=_default, **options)
+    except ValueError:
+        text = json.dumps(_sanitize(obj), **options)
+    return text.encode('utf-8')
+
+
+def _select_backend(name: Optional[str] = None) -> Callable[..., bytes]:
+    name = name or os.environ.get('JSON_SERIALIZER') or ('orjson' if orjson is not None else 'json')
+    if name not in BACKENDS:
+        raise ValueError(f"JSON_SERIALIZER 只能是 {' / '.join(BACKENDS)}")
+    if name == 'orjson' and orjson is not None:
+        return _orjson_dumps
+    return _json_dumps
+
+
+_dumps = _select_backend()
+
+
+def use(name: Optional[str] = None) -> None:
+    """切换序列化后端（不传时按环境变量 / 是否安装 orjson 重新选择），供基准测试对比使用。"""
+    global _dumps
+    _dumps = _select_backend(name)
+
+
+def backend() -> str:
+    return 'orjson' if _dumps is _orjson_dumps else 'json'
+
+
+def dumps(obj: Any, sort_keys: bool = False) -> bytes:
+    """序列化为 UTF-8 编码的 JSON bytes。"""
+    with metrics.stage('serialize'):
+        return _dumps(obj, sort_keys=sort_keys)
+
+
+def jsonp(callback: str, obj: Any) -> Response:
+    body = callback.encode('utf-8') + b'(' + dumps(obj) + b')'
+    return Response(body, mimetype='application/javascript')
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """Flask JSON provider：jsonify / current_app.json.dumps 走 serializer.dumps。"""
+
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        return dumps(obj, sort_keys=kwargs.get('sort_keys', self.sort_keys)).decode('utf-8')
+
+    def response(self, *args: Any, **kwargs: Any) -> Response:
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(dumps(obj, sort_keys=self.sort_keys) + b'\n', mimetype=self.mimetype)
+
+
+def init_app(app) -> None:
+    app.json = FastJSONProvider(app)
@@ -0,0 +1,256 @@
+"""
+多 worker 进程共享数据集：由一个发布进程加载 / 计算全部大表，按列写入共享目录，
+各 worker 以只读 mmap 方式挂载，不再各自持有一份拷贝（数值列与 category 编码只占一份页缓存）。
+
+目录结构（环境变量 SHARED_DATA_DIR，建议放在 tmpfs 上，例如 /dev/shm/visualization-data）：
+    CURRENT                 当前版本：{"version": N, "datasets": [...], "published_at": ...}
+    v<N>/<dataset>/         第 N 版的列式快照（格式同 columnar.py）
+
+    leases/<pid>            该 worker 进程正在使用的版本号列表
+* 发布时先写完 v<N>/ 再原子替换 CURRENT，worker 不会读到写了一半的版本；只保留最近 KEEP_VERSIONS 个版本，
+  以及仍被存活 worker 租用（lease）的版本。
+* worker 的每个 Snapshot 只读取一次 CURRENT 并租用该版本（Lease），其中的全部共享数据集都从这一版本挂载，
+  不会出现一部分来自 v<N>、另一部分来自 v<N+1> 的情况；Snapshot 被替换并释放后租约随之解除。
+* worker 中 data_store.SHARED_DATASETS 列出的数据集改为从共享目录读取，CURRENT 作为它们共同的数据文件：
+  data_store 的 watcher 发现 CURRENT 变化后，把这些数据集连同下游一起切换到新的 Snapshot。
+  尚未发布过的数据集回退为各自加载。
+
+用法：
+    python shared_store.py publish <目录>               # 发布一次（不传目录时读取 SHARED_DATA_DIR）
+    python shared_store.py publish <目录> --watch 30    # 常驻：每 30 秒检查数据文件，变化后发布新版本
+    python shared_store.py status <目录>
+"""
+import json
+import os
+import shutil
+import sys
+import threading
+import time
+import weakref
+from typing import Any, Dict, Iterable, Optional, Set
+
+import pandas as pd
+
+import columnar
+
+CURRENT_FILE = 'CURRENT'
+LEASE_DIR = 'leases'
+KEEP_VERSIONS = 3
+# 读取 CURRENT 后发现该版本已被清理时，重新读取 CURRENT 的次数
+PIN_ATTEMPTS = 5
+# 非默认行索引（如排过序的索引帧）以该列保存，挂载时还原
+INDEX_COLUMN = '__index__'
+
+
+def current_path(directory: str) -> str:
+    return os.path.join(directory, CURRENT_FILE)
+
+
+def version_dir(directory: str, version: int) -> str:
+    return os.path.join(directory, f'v{version}')
+
+
+def read_current(directory: str) -> Optional[Dict[str, Any]]:
+    try:
+        with open(current_path(directory), encoding='utf-8') as fh:
+            return json.load(fh)
+    except (OSError, ValueError):
+        return None
+
+
+def _has_default_index(frame: pd.DataFrame) -> bool:
+    return isinstance(frame.index, pd.RangeIndex) and frame.index.start == 0 and frame.index.step == 1
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def leased_versions(directory: str) -> Set[int]:
+    """存活 worker 正在使用的版本；已退出进程留下的租约文件顺带删除。"""
+    lease_dir = os.path.join(directory, LEASE_DIR)
+    try:
+        entries = os.listdir(lease_dir)
+    except OSError:
+        return set()
+    versions: Set[int] = set()
+    for entry in entries:
+        if not entry.isdigit():
+            continue
+        path = os.path.join(lease_dir, entry)
+        if not _pid_alive(int(entry)):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            continue
+        try:
+            with open(path, encoding='utf-8') as fh:
+                versions.update(int(v) for v in json.load(fh))
+        except (OSError, ValueError, TypeError):
+            continue
+    return versions
+
+
+def _prune(directory: str, version: int) -> None:
+    leased = leased_versions(directory)
+    for entry in os.listdir(directory):
+        if not entry.startswith('v') or not entry[1:].isdigit():
+            continue
+        if int(entry[1:]) <= version - KEEP_VERSIONS and int(entry[1:]) not in leased:
+            shutil.rmtree(os.path.join(directory, entry), ignore_errors=True)
+
+
+# 本进程各版本的租用计数：(目录, 版本) -> 计数
+_leases: Dict[tuple, int] = {}
+_lease_lock = threading.Lock()
+
+
+def _write_leases(directory: str) -> None:
+    versions = sorted(version for (path, version), count in _leases.items() if path == directory and count > 0)
+    lease_dir = os.path.join(directory, LEASE_DIR)
+    os.makedirs(lease_dir, exist_ok=True)
+    path = os.path.join(lease_dir, str(os.getpid()))
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as fh:
+        json.dump(versions, fh)
+    os.replace(tmp_path, path)
+
+
+def _acquire(directory: str, version: int) -> None:
+    with _lease_lock:
+        _leases[(directory, version)] = _leases.get((directory, version), 0) + 1
+        _write_leases(directory)
+
+
+def _release(directory: str, version: int) -> None:
+    with _lease_lock:
+        count = _leases.get((directory, version), 0) - 1
+        if count > 0:
+            _leases[(directory, version)] = count
+        else:
+            _leases.pop((directory, version), None)
+        try:
+            _write_leases(directory)
+        except OSError:
+            pass
+
+
+class Lease:
+    """租用的一个已发布版本：对象存活期间该版本不会被 _prune 删除。"""
+
+    def __init__(self, directory: str, current: Dict[str, Any]):
+        self.directory = directory
+        self.version: int = current['version']
+        self.datasets = frozenset(current.get('datasets', ()))
+        _acquire(directory, self.version)
+        self._finalizer = weakref.finalize(self, _release, directory, self.version)
+
+    def release(self) -> None:
+        self._finalizer()
+
+
+def pin(directory: str) -> Optional[Lease]:
+    """
+    读取 CURRENT 并租用其版本；尚未发布时返回 None。
+    先登记租约再确认版本目录仍在，确认失败说明读取 CURRENT 之后该版本已被清理，重新读取 CURRENT。
+    """
+    for _ in range(PIN_ATTEMPTS):
+        current = read_current(directory)
+        if current is None:
+            return None
+        lease = Lease(directory, current)
+        if os.path.isdir(version_dir(directory, lease.version)):
+            return lease
+        lease.release()
+    raise RuntimeError(f'{directory} 中的版本在挂载前被清理，已重试 {PIN_ATTEMPTS} 次')
+
+
+def publish(directory: str, frames: Dict[str, pd.DataFrame]) -> Dict[str, Any]:
+    """把 frames 发布为新版本，返回新的 CURRENT 内容。"""
+    os.makedirs(directory, exist_ok=True)
+    version = (read_current(directory) or {}).get('version', 0) + 1
+    while os.path.exists(version_dir(directory, version)):
+        version += 1
+    target = version_dir(directory, version)
+    for name, frame in frames.items():
+        if not _has_default_index(frame):
+            frame = frame.reset_index(names=INDEX_COLUMN)
+        columnar.write(frame, os.path.join(target, name), None, directory)
+
+    current = {'version': version, 'datasets': sorted(frames), 'published_at': time.time()}
+    tmp_path = f'{current_path(directory)}.tmp-{os.getpid()}'
+    with open(tmp_path, 'w', encoding='utf-8') as fh:
+        json.dump(current, fh, ensure_ascii=False)
+    os.replace(tmp_path, current_path(directory))
+    _prune(directory, version)
+    return current
+
+
+def attach(lease: Lease, name: str) -> Optional[pd.DataFrame]:
+    """以只读 mmap 方式挂载租用版本中的 name；该版本没有发布 name 时返回 None。"""
+    if name not in lease.datasets:
+        return None
+    path = os.path.join(version_dir(lease.directory, lease.version), name)
+    frame = columnar.load(path)
+    if frame is None:
+        raise RuntimeError(f'无法读取已发布的数据集 {path}')
+    if INDEX_COLUMN in frame.columns:
+        frame = frame.set_index(INDEX_COLUMN)
+        frame.index.name = None
+    return frame
+
+
+def _publish_once(directory: str) -> Dict[str, Any]:
+    import data_store
+
+    with data_store.registry.pinned():
+        current = publish(directory, data_store.shared_frames())
+    print(f"v{current['version']}: {len(current['datasets'])} datasets")
+    return current
+
+
+def main(argv: Iterable[str]) -> int:
+    import data_store
+    import ingest  # noqa: F401  注册提交记录的增量读取，发布进程只解析新追加的行
+
+    argv = list(argv)
+    command = argv[0] if argv else 'status'
+    interval = 0.0
+    if '--watch' in argv:
+        pos = argv.index('--watch')
+        interval = float(argv[pos + 1])
+        del argv[pos:pos + 2]
+    directory = argv[1] if len(argv) > 1 else data_store.SHARED_DATA_DIR
+    if not directory:
+        print('未指定共享目录（参数或环境变量 SHARED_DATA_DIR）')
+        return 2
+    if command == 'publish':
+        _publish_once(directory)
+        published = data_store.registry.version
+        while interval > 0:
+            time.sleep(interval)
+            data_store.registry.refresh()
+            if data_store.registry.version != published:
+                _publish_once(directory)
+                published = data_store.registry.version
+        return 0
+    if command == 'status':
+        current = read_current(directory)
+        if current is None:
+            print('not published')
+        else:
+            print(f"v{current['version']}: {', '.join(current['datasets'])}")
+        return 0
+    print(__doc__)
+    return 2
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
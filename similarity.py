@@ -0,0 +1,169 @@
+"""
+相似学生：按子知识点掌握度向量查找与指定学生最接近的 k 个学生（余弦相似度或欧氏距离）。
+
+individual_sub_knowledge_mastery 在加载时展开为 学生 × 子知识点 的 float32 稠密矩阵（缺失记 0），
+每行预先归一化为单位向量并保存模长：余弦相似度即单位向量的点积，欧氏距离由
+|a - b|² = |a|² + |b|² - 2|a||b|cos 从同一次矩阵乘积得到。查询时按块做矩阵乘积并在块内取 top-k，
+临时内存与候选人数无关。
+"""
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+from flask import Blueprint, jsonify, request
+
+import data_store
+import metrics
+
+similarity_bp = Blueprint('similarity', __name__, url_prefix='/api/similarity')
+
+METRICS = ('cosine', 'euclidean')
+DEFAULT_K = 10
+MAX_K = 100
+BLOCK_ROWS = 16384
+
+
+class MasteryMatrix:
+    """行按 student_ID 排序的单位向量矩阵、各行模长，以及专业 -> 行号。"""
+
+    def __init__(self, sub_mastery: pd.DataFrame, students: pd.DataFrame):
+        frame = sub_mastery.dropna(subset=['student_ID', 'sub_knowledge'])
+        student_codes, self.ids = pd.factorize(frame['student_ID'].astype(str), sort=True)
+        sub_codes, self.columns = pd.factorize(frame['sub_knowledge'].astype(str), sort=True)
+        self.ids = np.asarray(self.ids, dtype=str)
+        self.columns = np.asarray(self.columns, dtype=str)
+        values = pd.to_numeric(frame['knowledge_mastery_score'], errors='coerce').fillna(0.0).to_numpy('float32')
+
+        matrix = np.zeros((len(self.ids), len(self.columns)), dtype=np.float32)
+        matrix[student_codes, sub_codes] = values
+        self.norms = np.linalg.norm(matrix, axis=1).astype(np.float32)
+        np.divide(matrix, self.norms[:, None], out=matrix, where=self.norms[:, None] > 0)
+        self.unit = matrix
+
+        majors = students.drop_duplicates('student_ID')
+        majors = pd.Series(majors['major'].to_numpy(), index=majors['student_ID'].astype(str))
+        majors = majors.reindex(self.ids).astype(object)
+        self.majors = majors.where(majors.notna(), None).to_numpy()
+        self.by_major: Dict[str, np.ndarray] = {
+            str(major): rows.to_numpy()
+            for major, rows in pd.Series(np.arange(len(self.ids))).groupby(self.majors, sort=False)
+        }
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def rows(self, student_ids: np.ndarray) -> np.ndarray:
+        """student_ID -> 行号（不在矩阵中的跳过），结果升序。"""
+        student_ids = np.asarray(student_ids, dtype=str)
+        positions = np.minimum(np.searchsorted(self.ids, student_ids), max(len(self.ids) - 1, 0))
+        if not len(self.ids):
+            return positions[:0]
+        return np.unique(positions[self.ids[positions] == student_ids])
+
+    def row(self, student_id: str) -> Optional[int]:
+        position = int(np.searchsorted(self.ids, student_id))
+        return position if position < len(self.ids) and self.ids[position] == student_id else None
+
+    def nearest(self, row: int, k: int = DEFAULT_K, metric: str = 'cosine',
+                candidates: Optional[np.ndarray] = None) -> List[Dict[str, Any]]:
+        """与第 row 行最接近的 k 个学生；candidates 为候选行号（升序），None 表示全部学生。"""
+        query = self.unit[row]
+        query_norm = float(self.norms[row])
+        total = len(self.ids) if candidates is None else len(candidates)
+        best_rows: List[np.ndarray] = []
+        best_keys: List[np.ndarray] = []
+        for start in range(0, total, BLOCK_ROWS):
+            stop = min(total, start + BLOCK_ROWS)
+            rows = np.arange(start, stop) if candidates is None else candidates[start:stop]
+            block = self.unit[start:stop] if candidates is None else self.unit[rows]
+            cosine = block @ query
+            if metric == 'cosine':
+                # 统一按「越小越近」排序
+                keys = -cosine
+            else:
+                norms = self.norms[rows]
+                keys = np.maximum(norms * norms + query_norm * query_norm - 2 * norms * query_norm * cosine, 0)
+            keys[rows == row] = np.inf
+            if len(keys) > k:
+                top = np.argpartition(keys, k)[:k]
+                rows, keys = rows[top], keys[top]
+            best_rows.append(rows)
+            best_keys.append(keys)
+        if not best_rows:
+            return []
+        rows = np.concatenate(best_rows)
+        keys = np.concatenate(best_keys)
+        order = np.lexsort((rows, keys))
+        rows, keys = rows[order], keys[order]
+        keep = np.isfinite(keys)
+        rows, keys = rows[keep][:k], keys[keep][:k]
+        scores = -keys if metric == 'cosine' else np.sqrt(keys)
+        return [
+            {'student_ID': str(self.ids[r]), 'major': self.majors[r], 'score': round(float(s), 6)}
+            for r, s in zip(rows, scores)
+        ]
+
+
+@data_store.registry.register('mastery_matrix', depends=['individual_sub_knowledge_mastery', 'student_info'])
+def _build_mastery_matrix() -> MasteryMatrix:
+    return MasteryMatrix(data_store.get('individual_sub_knowledge_mastery'), data_store.get('student_info'))
+
+
+def load_mastery_matrix() -> MasteryMatrix:
+    return data_store.get('mastery_matrix')
+
+
+def _candidates(matrix: MasteryMatrix, class_name: Optional[str], major: Optional[str]) -> Optional[np.ndarray]:
+    candidates = None
+    if class_name:
+        candidates = matrix.rows(data_store.get('class_students').get(class_name, np.array([], dtype=str)))
+    if major:
+        rows = matrix.by_major.get(major, np.array([], dtype=np.int64))
+        candidates = rows if candidates is None else np.intersect1d(candidates, rows, assume_unique=True)
+    return candidates
+
+
+def build_similar_students(student_id: str, k: int = DEFAULT_K, metric: str = 'cosine',
+                           class_name: Optional[str] = None, major: Optional[str] = None) -> Dict[str, Any]:
+    matrix = load_mastery_matrix()
+    row = matrix.row(student_id)
+    if row is None:
+        raise LookupError(f'没有学生 {student_id} 的子知识点掌握度数据')
+    with metrics.stage('similarity.candidates'):
+        candidates = _candidates(matrix, class_name, major)
+    with metrics.stage('similarity.nearest'):
+        neighbours = matrix.nearest(row, k, metric, candidates)
+    return {
+        'student_ID': student_id,
+        'metric': metric,
+        'class': class_name,
+        'major': major,
+        'neighbours': neighbours,
+    }
+
+
+@similarity_bp.route('/students', methods=['GET'])
+def get_similar_students():
+    """
+    相似学生
+    query 参数: student_ID（必填）, k（默认 10，最大 100）, metric（cosine / euclidean，默认 cosine）,
+    class、major（可选，只在该班级 / 专业的学生中查找）
+    """
+    student_id = request.args.get('student_ID')
+    metric = request.args.get('metric', 'cosine')
+    try:
+        if not student_id:
+            raise ValueError('需要提供 student_ID 参数')
+        if metric not in METRICS:
+            raise ValueError(f"metric 只能是 {' / '.join(METRICS)}")
+        try:
+            k = int(request.args.get('k', DEFAULT_K))
+        except ValueError:
+            raise ValueError('k 必须是整数')
+        payload = build_similar_students(student_id, min(max(k, 1), MAX_K), metric,
+                                         request.args.get('class') or None, request.args.get('major') or None)
+        return jsonify(payload)
+    except ValueError as exc:
+        return jsonify({'error': str(exc)}), 400
+    except LookupError as exc:
+        return jsonify({'error': str(exc)}), 404
@@ -0,0 +1,133 @@
+"""
+答题状态计数立方体：(day, class, knowledge, method, state) -> count。
+/api/pink/state-trends 的全部维度、过滤与时间粒度都在立方体上汇总，不再扫描原始提交记录；
+立方体大小只与天数 × 班级 × 知识点 × 语言 × 状态的组合数有关，与提交总量无关。
+"""
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+ALLOWED_STATES = {
+    'Absolutely_Correct',
+    'Absolutely_Error',
+    'Partially_Correct',
+    'Error1', 'Error2', 'Error3', 'Error4', 'Error5', 'Error6', 'Error7', 'Error8', 'Error9'
+}
+DIMENSIONS = ['day', 'class', 'knowledge', 'method', 'state']
+GRANULARITIES = ('day', 'week', 'month')
+
+
+def recode(values: pd.Series, mapping: Dict[Any, str]) -> pd.Categorical:
+    """
+    按 mapping 转换 category 列：映射只在字典上做一次，逐行只是一次整数查表。
+    mapping 中没有的值变为缺失。
+    """
+    mapped = [mapping.get(category) for category in values.cat.categories]
+    categories = sorted({m for m in mapped if m is not None})
+    position = {category: idx for idx, category in enumerate(categories)}
+    lookup = np.array([position.get(m, -1) for m in mapped] + [-1], dtype=np.int32)
+    return pd.Categorical.from_codes(lookup[values.cat.codes.to_numpy()], categories=categories)
+
+
+class StateCube:
+    """counts 为 DIMENSIONS + ['count'] 的长表；day 为按天截断的时间戳（缺失时间为 NaT）。"""
+
+    def __init__(self, counts: pd.DataFrame):
+        self.counts = counts
+
+    @classmethod
+    def empty(cls) -> 'StateCube':
+        counts = pd.DataFrame({'day': pd.Series([], dtype='datetime64[ns]')})
+        for col in DIMENSIONS[1:]:
+            counts[col] = pd.Categorical([])
+        counts['count'] = pd.Series([], dtype='int64')
+        return cls(counts)
+
+    @classmethod
+    def from_records(cls, records: pd.DataFrame, title_knowledge: Dict[str, str]) -> 'StateCube':
+        """records 为 data_store 中紧凑 schema 的提交记录（或其切片）。"""
+        if records.empty:
+            return cls.empty()
+        state_names = {}
+        for state in records['state'].cat.categories:
+            if str(state).strip() in ALLOWED_STATES:
+                state_names[state] = str(state).strip()
+        frame = pd.DataFrame({
+            'day': pd.to_datetime(records['time'], unit='s', errors='coerce').dt.floor('D'),
+            'class': records['class'],
+            'knowledge': recode(records['title_ID'], title_knowledge),
+            'method': records['method'],
+            'state': recode(records['state'], state_names),
+        })
+        frame = frame.dropna(subset=['state'])
+        counts = (
+            frame.groupby(DIMENSIONS, observed=True, dropna=False)
+            .size()
+            .reset_index(name='count')
+        )
+        counts['count'] = counts['count'].astype('int64')
+        return cls(counts)
+
+    def merge(self, other: 'StateCube') -> 'StateCube':
+        """把另一个立方体的计数累加进来，返回新的立方体（用于增量更新）。"""
+        if other.counts.empty:
+            return self
+        if self.counts.empty:
+            return other
+        stacked = pd.concat([self.counts, other.counts], ignore_index=True)
+        for col in DIMENSIONS[1:]:
+            stacked[col] = stacked[col].astype('category')
+        counts = (
+            stacked.groupby(DIMENSIONS, observed=True, dropna=False)['count']
+            .sum()
+            .reset_index()
+        )
+        return StateCube(counts)
+
+    def query(self, class_name: Optional[str] = None,
+              start: Optional[pd.Timestamp] = None, end: Optional[pd.Timestamp] = None) -> pd.DataFrame:
+        """按班级与 [start, end) 日期范围过滤；指定了时间范围时缺失时间的记录不计入。"""
+        counts = self.counts
+        mask = np.ones(len(counts), dtype=bool)
+        if class_name is not None:
+            mask &= (counts['class'] == class_name).to_numpy()
+        if start is not None:
+            mask &= (counts['day'] >= start).to_numpy()
+        if end is not None:
+            mask &= (counts['day'] < end).to_numpy()
+        return counts[mask]
+
+
+def time_buckets(days: pd.Series, granularity: str) -> Tuple[pd.Series, List[str]]:
+    """把每行的 day 映射到所属时间桶的标签；返回 (逐行标签, 按时间先后排列的标签列表)。"""
+    if granularity == 'week':
+        starts = days.dt.to_period('W').dt.start_time
+    elif granularity == 'month':
+        starts = days.dt.to_period('M').dt.start_time
+    else:
+        starts = days
+    unique = sorted(starts.dropna().unique().tolist())
+    if granularity == 'week':
+        labels = [f"第{i + 1}周({wk.strftime('%Y-%m-%d')})" for i, wk in enumerate(unique)]
+    elif granularity == 'month':
+        labels = [mo.strftime('%Y-%m') for mo in unique]
+    else:
+        labels = [day.strftime('%Y-%m-%d') for day in unique]
+    return starts.map(dict(zip(unique, labels))), labels
+
+
+def parse_day(value: Optional[str]) -> Optional[pd.Timestamp]:
+    """解析 from / to 参数：支持 YYYY-MM-DD 或 Unix 秒，统一截断到天。"""
+    if value is None or value == '':
+        return None
+    try:
+        if value.replace('.', '', 1).isdigit():
+            stamp = pd.to_datetime(float(value), unit='s')
+        else:
+            stamp = pd.Timestamp(value)
+    except (ValueError, OverflowError):
+        raise ValueError(f'无法解析的时间: {value}')
+    if stamp.tzinfo is not None:
+        stamp = stamp.tz_convert(None)
+    return stamp.floor('D')
@@ -0,0 +1,161 @@
+"""
+学生列表的游标分页与筛选：student_info 按 student_ID 排序后常驻内存，
+student_ID 前缀用二分查找定位区间，major / sex 用预先建好的位置列表，单页的耗时只与页大小有关。
+
+游标为上一页最后一个 student_ID 的 base64 编码，数据重载后仍然有效（从该 ID 之后继续）。
+"""
+import base64
+import binascii
+from typing import Any, Dict, List, Mapping, Optional
+
+import numpy as np
+import pandas as pd
+
+import data_store
+import serializer
+
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 1000
+FIELDS = ['student_ID', 'major', 'sex', 'age']
+QUERY_PARAMS = ('limit', 'cursor', 'prefix', 'major', 'sex', 'age_min', 'age_max')
+
+
+def encode_cursor(student_id: str) -> str:
+    return base64.urlsafe_b64encode(student_id.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor: str) -> str:
+    try:
+        return base64.b64decode(cursor + '=' * (-len(cursor) % 4), altchars=b'-_', validate=True).decode('utf-8')
+    except (binascii.Error, UnicodeDecodeError):
+        raise ValueError('无效的 cursor')
+
+
+class StudentDirectory:
+    """按 student_ID 排序（去重）的学生表，以及 major / sex 取值 -> 升序位置数组。"""
+
+    def __init__(self, students: pd.DataFrame):
+        students = students.dropna(subset=['student_ID']).copy()
+        students['student_ID'] = students['student_ID'].astype(str)
+        students = students.drop_duplicates(subset=['student_ID'])
+        self.frame = students.sort_values('student_ID', kind='mergesort').reset_index(drop=True)
+        self.ids = self.frame['student_ID'].to_numpy(dtype=str)
+        self.ages = pd.to_numeric(self.frame['age'], errors='coerce').to_numpy(dtype='float64')
+        positions = pd.Series(np.arange(len(self.frame)))
+        self.codes: Dict[str, pd.Categorical] = {}
+        self.postings: Dict[str, Dict[str, np.ndarray]] = {}
+        for column in ('major', 'sex'):
+            values = self.frame[column].astype(str)
+            self.codes[column] = pd.Categorical(values)
+            self.postings[column] = {
+                str(key): group.to_numpy() for key, group in positions.groupby(values.to_numpy(), sort=False)
+            }
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def find(self, student_ids: List[str]) -> Dict[str, Optional[Dict[str, Any]]]:
+        """一次二分查找取出多个学生的信息：student_ID -> 记录（不存在时为 None）。"""
+        if not len(self.ids):
+            return {sid: None for sid in student_ids}
+        wanted = np.asarray(student_ids, dtype=str)
+        positions = np.minimum(np.searchsorted(self.ids, wanted), len(self.ids) - 1)
+        found = self.ids[positions] == wanted
+        records = iter(serializer.records(self.frame.iloc[positions[found]][FIELDS]))
+        return {sid: next(records) if hit else None for sid, hit in zip(student_ids, found.tolist())}
+
+    def _mask(self, positions: np.ndarray, filters: Dict[str, str], age_min: Optional[float],
+              age_max: Optional[float]) -> np.ndarray:
+        mask = np.ones(len(positions), dtype=bool)
+        for column, value in filters.items():
+            categorical = self.codes[column]
+            mask &= categorical.codes[positions] == categorical.categories.get_loc(value)
+        if age_min is not None:
+            mask &= self.ages[positions] >= age_min
+        if age_max is not None:
+            mask &= self.ages[positions] <= age_max
+        return mask
+
+    def page(self, limit: int = DEFAULT_LIMIT, cursor: Optional[str] = None, prefix: Optional[str] = None,
+             major: Optional[str] = None, sex: Optional[str] = None, age_min: Optional[float] = None,
+             age_max: Optional[float] = None) -> Dict[str, Any]:
+        """返回 {'students': [...], 'next_cursor': 下一页的游标，没有下一页时为 None}。"""
+        low, high = 0, len(self.ids)
+        if prefix:
+            low = int(np.searchsorted(self.ids, prefix, side='left'))
+            # 以 prefix 开头的 ID 都小于 prefix + U+10FFFF
+            high = int(np.searchsorted(self.ids, prefix + '\U0010ffff', side='left'))
+        if cursor:
+            low = max(low, int(np.searchsorted(self.ids, decode_cursor(cursor), side='right')))
+
+        filters = {column: value for column, value in (('major', major), ('sex', sex)) if value is not None}
+        # 候选位置：有等值条件时取最短的位置列表，否则为 [low, high) 的连续区间
+        source: Optional[np.ndarray] = None
+        for column, value in filters.items():
+            postings = self.postings[column].get(value)
+            if postings is None:
+                return {'students': [], 'next_cursor': None}
+            if source is None or len(postings) < len(source):
+                source = postings
+        if source is not None:
+            start, stop = np.searchsorted(source, [low, high])
+        else:
+            start, stop = low, max(low, high)
+
+        # 分块取候选并过滤，直到凑够 limit + 1 行（多取的一行用于判断是否还有下一页）
+        chunk = max(256, 4 * (limit + 1))
+        selected: List[np.ndarray] = []
+        found = 0
+        while start < stop and found <= limit:
+            end = min(stop, start + chunk)
+            positions = source[start:end] if source is not None else np.arange(start, end)
+            positions = positions[self._mask(positions, filters, age_min, age_max)]
+            selected.append(positions)
+            found += len(positions)
+            start = end
+        positions = np.concatenate(selected)[:limit + 1] if selected else np.array([], dtype=np.int64)
+        has_more = len(positions) > limit
+        positions = positions[:limit]
+
+        page = self.frame.iloc[positions]
+        return {
+            'students': serializer.records(page[FIELDS]),
+            'next_cursor': encode_cursor(self.ids[positions[-1]]) if has_more else None,
+        }
+
+
+@data_store.registry.register('student_directory', depends=['student_info'])
+def _build_student_directory() -> StudentDirectory:
+    return StudentDirectory(data_store.get('student_info'))
+
+
+def _float_arg(args: Mapping[str, str], name: str) -> Optional[float]:
+    value = args.get(name)
+    if value in (None, ''):
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        raise ValueError(f'{name} 必须是数字')
+
+
+def is_paged(args: Mapping[str, str]) -> bool:
+    """带有任一分页 / 筛选参数时返回分页结构，否则保持原来的完整列表。"""
+    return any(name in args for name in QUERY_PARAMS)
+
+
+def query(args: Mapping[str, str], major: Optional[str] = None) -> Dict[str, Any]:
+    """按请求参数取一页；参数不合法时抛出 ValueError。"""
+    try:
+        limit = int(args.get('limit', DEFAULT_LIMIT))
+    except ValueError:
+        raise ValueError('limit 必须是整数')
+    return data_store.get('student_directory').page(
+        limit=min(max(limit, 1), MAX_LIMIT),
+        cursor=args.get('cursor') or None,
+        prefix=args.get('prefix') or None,
+        major=major if major is not None else (args.get('major') or None),
+        sex=args.get('sex') or None,
+        age_min=_float_arg(args, 'age_min'),
+        age_max=_float_arg(args, 'age_max'),
+    )
@@ -0,0 +1,25 @@
+import json
+import os
+import sys
+
+import pytest
+
+# 测试中不启动后台 watcher；模块从仓库根目录导入
+os.environ.setdefault('DATA_STORE_CHECK_INTERVAL', '0')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture(scope='session')
+def client():
+    import app
+    return app.app.test_client()
+
+
+@pytest.fixture(scope='session')
+def tracker(client):
+    """以 dict 为 data 参数调用 JSONP 接口（不带回调），返回解析后的 JSON。"""
+    def call(data):
+        response = client.get('/hybridaction/zybTrackerStatisticsAction', query_string={'data': json.dumps(data)})
+        assert response.status_code == 200
+        return response.get_json()
+    return call
@@ -0,0 +1,66 @@
+"""批量查询：各视图与逐个调用原有接口（或直接按键查表）的结果一致。"""
+import pytest
+
+import bulk
+import data_store
+import serializer
+
+
+def _students(count=6):
+    return data_store.index('individual_title_mastery', 'student_ID').keys()[:count]
+
+
+@pytest.fixture(scope='module')
+def payload(client):
+    response = client.post('/api/bulk', json={'students': _students() + ['nobody'], 'classes': ['Class1', 'Class2'],
+                                              'views': list(bulk.STUDENT_VIEWS + bulk.CLASS_VIEWS)})
+    assert response.status_code == 200
+    return response.get_json()
+
+
+def test_student_views_match_single_endpoints(client, payload):
+    everyone = {s['student_ID']: s['major'] for s in client.get('/api/students').get_json()}
+    for sid in _students():
+        views = payload['students'][sid]
+        single = client.get(f'/api/student-data/{sid}').get_json()
+        assert views['titles'][:20] == single['greenBox1'] + single['greenBox2']
+        for view, table in bulk.STUDENT_TABLES.items():
+            assert views[view] == serializer.records(data_store.lookup(table, 'student_ID', sid))
+        sunburst = client.get(f'/api/green/top/sunburst?class=Class1&student_ID={sid}').get_json()
+        assert views['sunburst'] == sunburst['sunburst']
+        assert views['profile']['major'] == everyone[sid]
+
+
+def test_unknown_student_gets_empty_views(payload):
+    assert payload['students']['nobody'] == {'profile': None, 'titles': [], 'knowledge': [],
+                                             'subKnowledge': [], 'sunburst': None}
+
+
+def test_class_views_match_lookups(client, payload):
+    for name in ('Class1', 'Class2'):
+        views = payload['classes'][name]
+        assert views['students'] == list(data_store.get('class_students')[name])
+        for view, table in bulk.CLASS_TABLES.items():
+            assert views[view] == serializer.records(data_store.lookup(table, 'class', name))
+    single = client.get('/api/class-data/Class1').get_json()
+    assert payload['classes']['Class1']['titles'][:10] == single['greenBox1']
+
+
+def test_get_with_default_views(client):
+    sid = _students(1)[0]
+    payload = client.get(f'/api/bulk?students={sid}&classes=Class1').get_json()
+    assert payload['views'] == list(bulk.DEFAULT_VIEWS)
+    assert 'sunburst' not in payload['students'][sid]
+    assert set(payload['classes']['Class1']) == {'titles', 'knowledge', 'students'}
+
+
+@pytest.mark.parametrize('body', [
+    {},
+    {'students': ['a'], 'views': ['nope']},
+    {'students': [str(i) for i in range(bulk.MAX_KEYS + 1)]},
+    {'classes': 'Class1', 'students': 5},
+])
+def test_invalid_requests_return_400(client, body):
+    response = client.post('/api/bulk', json=body)
+    assert response.status_code == 400
+    assert response.get_json()['error']
@@ -0,0 +1,70 @@
+"""排行榜：与直接对掌握度表排序（同分按 student_ID 升序）的结果对照。"""
+import numpy as np
+import pandas as pd
+import pytest
+
+import data_store
+
+TITLE = 'Question_3MwAFlmNO8EKrpY5zjUd'
+
+
+def _ranking(scores: pd.DataFrame, order: str, k: int):
+    scores = scores.assign(student_ID=scores['student_ID'].astype(str)).dropna(subset=['score'])
+    ranked = scores.sort_values(['score', 'student_ID'], ascending=[order == 'bottom', True], kind='mergesort')
+    return ranked['student_ID'].tolist()[:k], ranked['score'].round(6).tolist()[:k], len(ranked)
+
+
+def _known_students(df):
+    return df[df['student_ID'].astype(str).isin(data_store.get('student_info')['student_ID'].astype(str))]
+
+
+@pytest.mark.parametrize('order', ['top', 'bottom'])
+def test_title_board_matches_sorted_mastery(client, order):
+    df = _known_students(data_store.get('individual_title_mastery'))
+    rows = df[df['title_ID'] == TITLE]
+    expected = _ranking(rows[['student_ID']].assign(score=rows['title_mastery_score']), order, 20)
+    payload = client.get(f'/api/leaderboard/title?key={TITLE}&order={order}&k=20').get_json()
+    assert [e['student_ID'] for e in payload['entries']] == expected[0]
+    assert [e['score'] for e in payload['entries']] == pytest.approx(expected[1])
+    assert [e['rank'] for e in payload['entries']] == list(range(1, 21))
+    assert payload['total'] == expected[2]
+
+
+def test_knowledge_board_in_class(client):
+    df = data_store.get('individual_knowledge_mastery')
+    key = df['knowledge'].iloc[0]
+    members = set(data_store.get('class_students')['Class1'])
+    rows = df[(df['knowledge'] == key) & df['student_ID'].isin(members)]
+    expected = _ranking(rows[['student_ID']].assign(score=rows['knowledge_mastery_score']), 'top', 10)
+    payload = client.get(f'/api/leaderboard/knowledge?key={key}&class=Class1').get_json()
+    assert payload['class'] == 'Class1' and payload['key'] == key
+    assert [e['student_ID'] for e in payload['entries']] == expected[0]
+    assert payload['total'] == expected[2]
+
+
+def test_overall_board_in_major(client):
+    info = data_store.get('student_info')
+    major = info['major'].iloc[0]
+    df = data_store.get('individual_title_mastery')
+    df = df[df['student_ID'].isin(info.loc[info['major'] == major, 'student_ID'])]
+    means = df.groupby('student_ID', as_index=False)['title_mastery_score'].mean()
+    expected = _ranking(means.rename(columns={'title_mastery_score': 'score'}), 'bottom', 15)
+    payload = client.get(f'/api/leaderboard/overall?major={major}&order=bottom&k=15').get_json()
+    assert payload['key'] is None
+    assert [e['student_ID'] for e in payload['entries']] == expected[0]
+    assert [e['score'] for e in payload['entries']] == pytest.approx(expected[1])
+    assert np.all(np.diff([e['score'] for e in payload['entries']]) >= 0)
+
+
+@pytest.mark.parametrize('url, status', [
+    ('/api/leaderboard/nothing', 404),
+    ('/api/leaderboard/title?key=no-such-title', 404),
+    ('/api/leaderboard/title', 400),
+    (f'/api/leaderboard/title?key={TITLE}&order=middle', 400),
+    (f'/api/leaderboard/title?key={TITLE}&k=ten', 400),
+    (f'/api/leaderboard/title?key={TITLE}&class=Class1&major=J23517', 400),
+])
+def test_error_paths(client, url, status):
+    response = client.get(url)
+    assert response.status_code == status
+    assert response.get_json()['error']
@@ -0,0 +1,88 @@
+"""引擎输出与仓库中 data/mastery/*.csv 的对照（口径差异见 mastery.py 模块说明）。"""
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import data_store
+import mastery
+
+# 与文件一致的原始指标；try_num_count 口径不同，不参与对照
+RAW_METRICS = ['score_rate', 'average_tc', 'average_memory', 'error_type_count', 'title_total_score']
+TITLE_FILES = {'class': 'class_title_mastery', 'major': 'major_title_mastery'}
+KNOWLEDGE_FILES = {'class': 'class_knowledge_mastery', 'major': 'major_knowledge_mastery'}
+
+
+def _shipped(name: str) -> pd.DataFrame:
+    path = os.path.join(data_store.MASTERY_DIR, f'{name}.csv')
+    if not os.path.exists(path):
+        pytest.skip(f'缺少 {path}')
+    table = data_store.read_table(path)
+    for column in ('class', 'major', 'title_ID', 'knowledge'):
+        if column in table.columns:
+            table[column] = table[column].astype(str)
+    return table
+
+
+@pytest.fixture(scope='module')
+def engine_tables():
+    return mastery.compute_all(data_store.get('submit_records'), data_store.get('title_info'),
+                               data_store.get('student_info'))
+
+
+@pytest.mark.parametrize('key', list(TITLE_FILES))
+def test_title_metrics_match_shipped_files(engine_tables, key):
+    shipped = _shipped(TITLE_FILES[key])
+    engine = engine_tables[TITLE_FILES[key]]
+    merged = engine.merge(shipped, on=[key, 'title_ID'], suffixes=('_engine', '_file'), validate='one_to_one')
+    assert len(merged) == len(shipped) == len(engine)
+    for column in RAW_METRICS:
+        np.testing.assert_allclose(merged[f'{column}_engine'].astype(float), merged[f'{column}_file'].astype(float),
+                                   rtol=1e-9, err_msg=column)
+
+
+@pytest.mark.parametrize('key', list(TITLE_FILES))
+def test_normalisation_and_weights_match_shipped_files(key):
+    shipped = _shipped(TITLE_FILES[key])
+    scored = mastery.score_titles(shipped[[key, 'title_ID'] + mastery.METRICS].copy())
+    for column in [f'{metric}_norm' for metric in mastery.METRICS] + ['title_mastery_score']:
+        np.testing.assert_allclose(scored[column], shipped[column], atol=1e-12, err_msg=column)
+
+
+@pytest.mark.parametrize('key', list(KNOWLEDGE_FILES))
+def test_knowledge_rollup_matches_shipped_files(key):
+    titles = _shipped(TITLE_FILES[key])
+    shipped = _shipped(KNOWLEDGE_FILES[key])
+    pairs = mastery.knowledge_pairs(data_store.get('title_info'), 'knowledge')
+    rollup = mastery.knowledge_mastery(titles, key, pairs, 'knowledge')
+    merged = rollup.merge(shipped, on=[key, 'knowledge'], suffixes=('_engine', '_file'), validate='one_to_one')
+    assert len(merged) == len(shipped)
+    np.testing.assert_allclose(merged['knowledge_mastery_score_engine'], merged['knowledge_mastery_score_file'],
+                               atol=1e-12)
+    assert (merged['knowledge_total_score_engine'] == merged['knowledge_total_score_file']).all()
+
+
+def test_unseen_submissions_matches_full_dedup():
+    records = data_store.get('submit_records')
+    split = len(records) - 500
+    head, delta = records.iloc[:split], records.iloc[split:]
+    # 把已有的一条提交重复追加到增量中
+    delta = data_store.concat_submit_records([delta, head.iloc[[0]]])
+    combined = data_store.concat_submit_records([head, delta])
+    unseen = mastery.unseen_submissions(combined, delta)
+    expected = mastery.distinct_submissions(combined).iloc[len(mastery.distinct_submissions(head)):]
+    assert len(unseen) == len(expected)
+    stats = mastery.merge_stats(mastery.title_stats(mastery.distinct_submissions(head), 'class'),
+                                mastery.title_stats(unseen, 'class'), 'class')
+    pd.testing.assert_frame_equal(stats, mastery.title_stats(mastery.distinct_submissions(combined), 'class'))
+
+
+@pytest.mark.skipif(data_store.MASTERY_SOURCE != 'auto', reason='只检查默认的 auto 来源')
+@pytest.mark.parametrize('name', [name for name in data_store.MASTERY_FILES if name != 'individual_title_mastery'])
+def test_auto_source_keeps_shipped_tables(name):
+    shipped = _shipped(name)
+    loaded = data_store.get(name)
+    assert len(loaded) == len(shipped)
+    for column in shipped.select_dtypes('number').columns:
+        np.testing.assert_allclose(loaded[column].astype(float), shipped[column].astype(float), err_msg=column)
@@ -0,0 +1,23 @@
+"""粉色视图的热力图：每行与 title_info、title_metrics 中对应题目的值一致。"""
+import pandas as pd
+
+import data_store
+
+
+def test_heatmap_rows_match_title_info_and_metrics(client):
+    payload = client.get('/api/pink/heatmap').get_json()
+    titles = data_store.get('title_info')
+    metrics = data_store.get('title_metrics').set_index('title_ID')
+    x_labels = payload['heatedConfig']['xAxisLabels']
+    assert x_labels == sorted(titles['knowledge'].dropna().unique().tolist())
+    assert len(payload['heatmapCoreData']) == len(titles)
+    for row, (_, title) in zip(payload['heatmapCoreData'], titles.iterrows()):
+        x, y, alias, title_id, knowledge, sub_knowledge, match_index, correct_rate, discrimination = row
+        assert (title_id, knowledge) == (title['title_ID'], title['knowledge'])
+        assert sub_knowledge == (None if pd.isna(title['sub_knowledge']) else title['sub_knowledge'])
+        assert x_labels[x] == knowledge
+        assert payload['heatedConfig']['yAxisLabels'][y] == alias == data_store.get('title_alias_map')[title_id]
+        expected = metrics.loc[title_id] if title_id in metrics.index else None
+        assert match_index == (int(expected['match_index']) if expected is not None else 0)
+        assert correct_rate == (float(expected['correct_rate']) if expected is not None else 0.0)
+        assert discrimination == (float(expected['discrimination']) if expected is not None else 0.0)
@@ -0,0 +1,39 @@
+"""JSON 序列化：标准库与 orjson 两条路径输出相同，缺失值一律为 null。"""
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import serializer
+
+BACKENDS = ['json'] + (['orjson'] if serializer.orjson is not None else [])
+
+
+@pytest.fixture(params=BACKENDS)
+def backend(request):
+    serializer.use(request.param)
+    yield request.param
+    serializer.use()
+
+
+def test_missing_values_are_null(backend):
+    frame = pd.DataFrame({'a': [1.5, np.nan], 'b': ['x', None], 'c': pd.to_datetime(['2024-01-01', None])})
+    payload = {'frame': frame, 'nan': float('nan'), 'inf': np.float64('inf'), 'na': pd.NA, 'n': np.int64(3)}
+    assert json.loads(serializer.dumps(payload)) == {
+        'frame': [{'a': 1.5, 'b': 'x', 'c': '2024-01-01T00:00:00'}, {'a': None, 'b': None, 'c': None}],
+        'nan': None, 'inf': None, 'na': None, 'n': 3,
+    }
+
+
+def test_plain_payload_keeps_order_and_unicode(backend):
+    payload = {'班级': 'Class1', 'values': np.array([1, 2]), 'a': [0.25, {'b': True}]}
+    assert serializer.dumps(payload) == '{"班级":"Class1","values":[1,2],"a":[0.25,{"b":true}]}'.encode('utf-8')
+    assert serializer.dumps(payload, sort_keys=True).startswith(b'{"a":')
+
+
+def test_records_matches_to_dict():
+    frame = pd.DataFrame({'id': ['s1', 's2'], 'score': [0.5, np.nan], 'n': [1, 2]})
+    expected = [{key: (None if isinstance(value, float) and np.isnan(value) else value) for key, value in row.items()}
+                for row in frame.to_dict('records')]
+    assert serializer.records(frame) == expected
@@ -0,0 +1,33 @@
+"""共享目录的版本租用：Snapshot 租用的版本在被释放前不会被清理。"""
+import os
+
+import pandas as pd
+
+import shared_store
+
+
+def _publish(directory, value):
+    return shared_store.publish(str(directory), {'frame': pd.DataFrame({'value': [value]})})
+
+
+def test_leased_version_survives_pruning(tmp_path):
+    _publish(tmp_path, 1)
+    lease = shared_store.pin(str(tmp_path))
+    assert lease.version == 1
+    for value in range(2, 2 + shared_store.KEEP_VERSIONS + 1):
+        _publish(tmp_path, value)
+    assert os.path.isdir(shared_store.version_dir(str(tmp_path), 1))
+    assert not os.path.isdir(shared_store.version_dir(str(tmp_path), 2))
+    # 之后懒加载的数据集仍来自租用的版本，而不是 CURRENT
+    assert shared_store.attach(lease, 'frame')['value'].tolist() == [1]
+
+    lease.release()
+    _publish(tmp_path, 99)
+    assert not os.path.isdir(shared_store.version_dir(str(tmp_path), 1))
+
+
+def test_unpublished_dataset_is_not_attached(tmp_path):
+    _publish(tmp_path, 1)
+    lease = shared_store.pin(str(tmp_path))
+    assert shared_store.attach(lease, 'missing') is None
+    assert shared_store.pin(str(tmp_path / 'empty')) is None
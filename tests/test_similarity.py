@@ -0,0 +1,63 @@
+"""相似学生：与直接在 学生 × 子知识点 矩阵上穷举计算的结果对照。"""
+import numpy as np
+import pandas as pd
+import pytest
+
+import data_store
+
+STUDENT = '8b6d1125760bd3939b6e'
+
+
+@pytest.fixture(scope='module')
+def vectors():
+    df = data_store.get('individual_sub_knowledge_mastery')
+    return df.pivot_table(index='student_ID', columns='sub_knowledge', values='knowledge_mastery_score',
+                          aggfunc='first').fillna(0.0).astype('float64')
+
+
+def _brute_force(vectors, metric, k, candidates=None):
+    others = vectors.drop(index=STUDENT)
+    if candidates is not None:
+        others = others[others.index.isin(candidates)]
+    query = vectors.loc[STUDENT].to_numpy()
+    matrix = others.to_numpy()
+    if metric == 'cosine':
+        norms = np.linalg.norm(matrix, axis=1) * np.linalg.norm(query)
+        keys = -np.divide(matrix @ query, norms, out=np.zeros(len(matrix)), where=norms > 0)
+    else:
+        keys = np.linalg.norm(matrix - query, axis=1)
+    order = np.lexsort((others.index.to_numpy(dtype=str), keys))[:k]
+    return pd.Series(np.abs(keys[order]), index=others.index[order])
+
+
+@pytest.mark.parametrize('metric', ['cosine', 'euclidean'])
+def test_neighbours_match_brute_force(client, vectors, metric):
+    payload = client.get(f'/api/similarity/students?student_ID={STUDENT}&k=10&metric={metric}').get_json()
+    expected = _brute_force(vectors, metric, 10)
+    scores = [n['score'] for n in payload['neighbours']]
+    assert [n['student_ID'] for n in payload['neighbours']] == list(expected.index)
+    # 接口用 float32 矩阵，分数与 float64 穷举只在精度范围内一致
+    assert scores == pytest.approx(expected.to_numpy(), abs=1e-4)
+    assert scores == sorted(scores, reverse=metric == 'cosine')
+    assert STUDENT not in [n['student_ID'] for n in payload['neighbours']]
+
+
+def test_major_restricts_candidates(client, vectors):
+    info = data_store.get('student_info')
+    major = info.loc[info['student_ID'] == STUDENT, 'major'].iloc[0]
+    payload = client.get(f'/api/similarity/students?student_ID={STUDENT}&k=5&major={major}').get_json()
+    expected = _brute_force(vectors, 'cosine', 5, info.loc[info['major'] == major, 'student_ID'])
+    assert all(n['major'] == major for n in payload['neighbours'])
+    assert [n['score'] for n in payload['neighbours']] == pytest.approx(expected.to_numpy(), abs=1e-4)
+
+
+@pytest.mark.parametrize('query, status', [
+    ('', 400),
+    (f'student_ID={STUDENT}&metric=manhattan', 400),
+    (f'student_ID={STUDENT}&k=many', 400),
+    ('student_ID=nobody', 404),
+])
+def test_error_paths(client, query, status):
+    response = client.get(f'/api/similarity/students?{query}')
+    assert response.status_code == status
+    assert response.get_json()['error']
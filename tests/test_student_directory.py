@@ -0,0 +1,50 @@
+"""学生列表的游标分页：逐页取完后与不带参数的完整列表一致。"""
+import pytest
+
+import data_store
+
+
+def _walk(client, url, **params):
+    students, cursor = [], None
+    while True:
+        query = {**params, **({'cursor': cursor} if cursor else {})}
+        page = client.get(url, query_string=query).get_json()
+        students.extend(page['students'])
+        cursor = page['next_cursor']
+        if cursor is None:
+            return students
+
+
+def test_pages_cover_the_full_list(client):
+    full = client.get('/api/students').get_json()
+    students = _walk(client, '/api/students', limit=100)
+    assert [s['student_ID'] for s in students] == sorted(s['student_ID'] for s in full)
+    assert {s['student_ID']: s['major'] for s in students} == {s['student_ID']: s['major'] for s in full}
+
+
+def test_major_path_matches_filtered_full_list(client):
+    major = data_store.get('student_info')['major'].iloc[0]
+    full = client.get(f'/api/students/{major}').get_json()
+    students = _walk(client, f'/api/students/{major}', limit=37)
+    assert [s['student_ID'] for s in students] == sorted(s['student_ID'] for s in full)
+
+
+def test_filters_match_student_info(client):
+    info = data_store.get('student_info')
+    expected = info[(info['sex'] == 'female') & info['age'].between(20, 22)
+                    & info['student_ID'].str.startswith('a')]
+    assert len(expected) > 5
+    students = _walk(client, '/api/students', limit=5, sex='female', age_min=20, age_max=22, prefix='a')
+    assert [s['student_ID'] for s in students] == sorted(expected['student_ID'])
+    assert all(s['sex'] == 'female' and 20 <= s['age'] <= 22 for s in students)
+
+
+def test_unknown_major_is_an_empty_page(client):
+    assert client.get('/api/students?major=nope').get_json() == {'students': [], 'next_cursor': None}
+
+
+@pytest.mark.parametrize('query', ['limit=abc', 'cursor=***', 'age_min=old', 'limit=10&age_max=x'])
+def test_invalid_params_return_400(client, query):
+    response = client.get(f'/api/students?{query}')
+    assert response.status_code == 400
+    assert response.get_json()['error']
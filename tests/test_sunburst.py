@@ -0,0 +1,26 @@
+"""旭日图：当前构建与之前逐层布尔筛选 + iterrows 的构建（benchmarks/sunburst_baseline.py）输出相同。"""
+import json
+
+import pytest
+
+import data_store
+import green_topViews
+from benchmarks import sunburst_baseline
+
+
+def _students(step=25):
+    return data_store.index('individual_title_mastery', 'student_ID').keys()[::step]
+
+
+@pytest.mark.parametrize('student_id', _students())
+def test_sunburst_matches_reference_builder(student_id):
+    expected = sunburst_baseline.build_sunburst_payload('Class1', student_id)
+    actual = green_topViews.build_sunburst_payload('Class1', student_id)
+    assert json.dumps(actual, sort_keys=True) == json.dumps(expected, sort_keys=True)
+
+
+def test_unknown_student_raises_in_both():
+    with pytest.raises(ValueError):
+        sunburst_baseline.build_sunburst_payload('Class1', 'no-such-student')
+    with pytest.raises(ValueError):
+        green_topViews.build_sunburst_payload('Class1', 'no-such-student')
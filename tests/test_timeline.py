@@ -0,0 +1,54 @@
+"""提交时间线：与直接筛选 submit_records 的结果对照。"""
+import numpy as np
+import pytest
+
+import data_store
+
+STUDENT = '8b6d1125760bd3939b6e'
+
+
+def _records(key, value, start=None, end=None):
+    records = data_store.get('submit_records')
+    rows = records[(records[key] == value).to_numpy() & records['time'].notna().to_numpy()]
+    if start is not None:
+        rows = rows[rows['time'] >= start]
+    if end is not None:
+        rows = rows[rows['time'] < end]
+    return rows.sort_values('time', kind='mergesort')
+
+
+def test_student_points_match_submit_records(client):
+    payload = client.get(f'/api/timeline/student/{STUDENT}?max_points=5000&rolling=5').get_json()
+    expected = _records('student_ID', STUDENT)
+    assert payload['mode'] == 'points'
+    assert payload['summary']['count'] == len(expected)
+    assert [point['time'] for point in payload['points']] == expected['time'].tolist()
+    assert [point['title_ID'] for point in payload['points']] == expected['title_ID'].astype(str).tolist()
+    scores = expected['score'].to_numpy(dtype='float64')
+    assert payload['points'][-1]['rolling_score'] == pytest.approx(scores[-5:].mean())
+    assert payload['summary']['score_mean'] == pytest.approx(scores.mean(), abs=1e-6)
+
+
+def test_class_window_and_buckets(client):
+    times = _records('class', 'Class1')['time']
+    start, end = float(times.quantile(0.25)), float(times.quantile(0.75))
+    payload = client.get(f'/api/timeline/class/Class1?from={start}&to={end}&max_points=20').get_json()
+    expected = _records('class', 'Class1', start, end)
+    assert payload['summary']['count'] == len(expected)
+    assert payload['mode'] == 'buckets'
+    assert sum(bucket['count'] for bucket in payload['buckets']) == len(expected)
+    correct = (expected['state'] == 'Absolutely_Correct').to_numpy()
+    assert payload['summary']['correct_rate'] == pytest.approx(np.mean(correct), abs=1e-6)
+
+
+@pytest.mark.parametrize('url, status', [
+    (f'/api/timeline/student/{STUDENT}?from=yesterday-ish', 400),
+    (f'/api/timeline/student/{STUDENT}?from=1700000000&to=1600000000', 400),
+    (f'/api/timeline/student/{STUDENT}?max_points=many', 400),
+    ('/api/timeline/student/no-such-student', 404),
+    ('/api/timeline/class/NoSuchClass', 404),
+])
+def test_timeline_errors(client, url, status):
+    response = client.get(url)
+    assert response.status_code == status
+    assert response.get_json()['error']
@@ -0,0 +1,92 @@
+"""JSONP 接口的 sections / fields / limit / offset：结果与不带这些参数的完整响应一致。"""
+import pytest
+
+QUERY = {'class': 'Class1', 'student_ID': '8b6d1125760bd3939b6e'}
+
+
+@pytest.fixture(scope='module')
+def full(tracker):
+    payload = tracker({**QUERY, 'limit': 1000})
+    assert payload['code'] == 0
+    return payload
+
+
+def test_sections_are_a_subset_of_the_full_payload(tracker, full):
+    payload = tracker({**QUERY, 'limit': 1000, 'sections': ['classDetails', 'knowledge.majorTitle']})
+    assert payload['code'] == 0
+    assert 'available' not in payload
+    assert payload['data'] == {
+        'classDetails': full['data']['classDetails'],
+        'knowledge': {'majorTitle': full['data']['knowledge']['majorTitle']},
+    }
+
+
+def test_section_prefix_and_comma_separated_string(tracker, full):
+    payload = tracker({**QUERY, 'limit': 1000, 'sections': 'available, knowledge'})
+    assert payload['available'] == full['available']
+    assert payload['data'] == {'knowledge': full['data']['knowledge']}
+
+
+def test_fields_project_every_section(tracker, full):
+    payload = tracker({**QUERY, 'limit': 1000, 'sections': ['classDetails', 'studentDetails'],
+                       'fields': 'title_ID,title_mastery_score'})
+    for section in ('classDetails', 'studentDetails'):
+        expected = [{key: row[key] for key in ('title_ID', 'title_mastery_score')} for row in full['data'][section]]
+        assert payload['data'][section] == expected
+
+
+def test_fields_per_section(tracker, full):
+    payload = tracker({**QUERY, 'limit': 1000, 'sections': ['classDetails', 'classSummary'],
+                       'fields': {'classDetails': ['title_ID']}})
+    assert payload['data']['classDetails'] == [{'title_ID': row['title_ID']} for row in full['data']['classDetails']]
+    assert payload['data']['classSummary'] == full['data']['classSummary']
+
+
+def test_limit_and_offset_page_the_full_list(tracker, full):
+    payload = tracker({**QUERY, 'sections': ['classDetails'], 'limit': 5, 'offset': 3})
+    assert payload['data']['classDetails'] == full['data']['classDetails'][3:8]
+
+
+@pytest.mark.parametrize('data', [
+    {'sections': 5},
+    {'sections': ['classDetails', 1]},
+    {'sections': {'classDetails': True}},
+    {'fields': 5},
+    {'fields': [1, 2]},
+    {'fields': {'classDetails': 7}},
+    {'sections': ['noSuchSection']},
+])
+def test_invalid_sections_or_fields_return_code_1(tracker, data):
+    payload = tracker({**QUERY, **data})
+    assert payload['code'] == 1
+    assert payload['message']
+    assert 'data' not in payload
+
+
+def test_since_current_version_is_not_modified(tracker, full):
+    payload = tracker({**QUERY, 'limit': 1000, 'since': full['version']})
+    assert payload['code'] == 0
+    assert payload['notModified'] is True
+    assert payload['message'] == 'not modified'
+    assert payload['version'] == full['version']
+    assert 'data' not in payload and 'available' not in payload
+    assert len(payload['unchanged']) == len(full['version'].split('.')) - 1
+
+
+def test_since_returns_only_changed_sections(tracker):
+    query = {**QUERY, 'limit': 1000, 'sections': ['classDetails', 'classSummary']}
+    first = tracker(query)
+    digest, details, summary = first['version'].split('.')
+    payload = tracker({**query, 'since': '.'.join([digest, 'stale', summary])})
+    assert payload['unchanged'] == ['classSummary']
+    assert 'notModified' not in payload
+    assert payload['data'] == {'classDetails': first['data']['classDetails']}
+    assert payload['version'] == first['version']
+
+
+@pytest.mark.parametrize('since', ['garbage', 5, None])
+def test_since_from_other_params_returns_full_result(tracker, full, since):
+    other = tracker({**QUERY, 'limit': 10})['version']
+    payload = tracker({**QUERY, 'limit': 1000, 'since': other if since is None else since})
+    assert 'unchanged' not in payload
+    assert payload['data'] == full['data']
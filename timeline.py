@@ -0,0 +1,224 @@
+"""
+提交时间线：某个学生（或班级）在 [from, to) 内的提交记录与滚动得分 / 状态统计。
+
+提交记录已有按 student_ID / class 排序的 SortedIndex，这里只在每个键的行区间内再按 time 排出行号；
+请求先取键的区间，再在区间内的 time 上二分查找窗口的起止，只按行号取出窗口内的行，不扫描、不复制全部记录。
+窗口内的提交超过 max_points 时按等宽时间桶汇总（降采样）。
+"""
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from flask import Blueprint, jsonify, request
+
+import data_store
+import metrics
+import serializer
+
+timeline_bp = Blueprint('timeline', __name__, url_prefix='/api/timeline')
+
+CORRECT_STATE = 'Absolutely_Correct'
+POINT_FIELDS = ['time', 'class', 'student_ID', 'title_ID', 'method', 'state', 'score', 'memory', 'timeconsume']
+DEFAULT_MAX_POINTS = 500
+MAX_POINTS = 5000
+DEFAULT_ROLLING = 20
+MAX_ROLLING = 1000
+
+
+class Timeline:
+    """
+    建在 submit_records 按键的 SortedIndex 之上：每个键的行区间内再按 time 排好的行号（order），
+    以及 key -> 该键在 order 中的 (start, stop)。不复制提交记录，只在请求时按行号取出窗口内的行。
+    """
+
+    def __init__(self, index: data_store.SortedIndex):
+        self.key = index.key
+        self.frame = index.frame
+        self.times = self.frame['time'].to_numpy(dtype='float64')
+        self.scores = self.frame['score'].to_numpy()
+        states = self.frame['state']
+        if not isinstance(states.dtype, pd.CategoricalDtype):
+            states = states.astype('category')
+        self.states = np.asarray(states.cat.categories.astype(str), dtype=object)
+        self.state_codes = states.cat.codes.to_numpy()
+        self.correct_code = list(self.states).index(CORRECT_STATE) if CORRECT_STATE in self.states else -2
+
+        # 索引中每个键占一段连续的行，只在段内按 time 排序（time 缺失的行排在段尾，不参与）
+        dtype = np.int32 if len(self.frame) < np.iinfo(np.int32).max else np.int64
+        self.order = np.empty(len(self.frame), dtype=dtype)
+        self.offsets: Dict[str, Tuple[int, int]] = {}
+        position = 0
+        for key, (start, stop) in index.offsets.items():
+            times = self.times[start:stop]
+            count = len(times) - int(np.isnan(times).sum())
+            if not count:
+                continue
+            self.order[position:position + count] = start + np.argsort(times, kind='stable')[:count]
+            self.offsets[str(key)] = (position, position + count)
+            position += count
+        self.order = self.order[:position]
+
+    def __contains__(self, value: str) -> bool:
+        return value in self.offsets
+
+    def window(self, value: str, start_time: Optional[float], end_time: Optional[float]) -> Tuple[int, int, int]:
+        """返回 (键的起始位置, 窗口起始位置, 窗口结束位置)，均为 order 中的位置。"""
+        start, stop = self.offsets.get(value, (0, 0))
+        times = self.times[self.order[start:stop]]
+        low = start + (int(np.searchsorted(times, start_time, side='left')) if start_time is not None else 0)
+        high = start + (int(np.searchsorted(times, end_time, side='left')) if end_time is not None else len(times))
+        return start, low, max(low, high)
+
+    def _columns(self, low: int, high: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """order[low:high] 对应行的 time、score（float64）、state 编码与是否正确。"""
+        rows = self.order[low:high]
+        codes = self.state_codes[rows]
+        scores = self.scores[rows].astype('float64')
+        return self.times[rows], np.nan_to_num(scores), codes, codes == self.correct_code
+
+    def summary(self, low: int, high: int) -> Dict[str, Any]:
+        count = high - low
+        times, scores, codes, correct = self._columns(low, high)
+        states = np.bincount(codes[codes >= 0], minlength=len(self.states))
+        return {
+            'count': count,
+            'first': float(times[0]) if count else None,
+            'last': float(times[-1]) if count else None,
+            'score_mean': round(float(scores.mean()), 6) if count else None,
+            'correct_rate': round(float(correct.mean()), 6) if count else None,
+            'states': {str(state): int(n) for state, n in zip(self.states, states) if n},
+        }
+
+    def points(self, start: int, low: int, high: int, rolling: int) -> List[Dict[str, Any]]:
+        """窗口内的逐条提交，附带截至该条（含）最近 rolling 条提交的平均得分与正确率（可跨过窗口起点）。"""
+        head = max(start, low - rolling + 1)
+        _, scores, _, correct = self._columns(head, high)
+        score_sums = np.concatenate([[0.0], np.cumsum(scores)])
+        correct_sums = np.concatenate([[0], np.cumsum(correct)])
+        ends = np.arange(low - head + 1, high - head + 1)
+        begins = np.maximum(ends - rolling, 0)
+        sizes = ends - begins
+        fields = [col for col in POINT_FIELDS if col in self.frame.columns]
+        page = self.frame.iloc[self.order[low:high]][fields].reset_index(drop=True)
+        page['rolling_score'] = np.round((score_sums[ends] - score_sums[begins]) / sizes, 6)
+        page['rolling_correct_rate'] = np.round((correct_sums[ends] - correct_sums[begins]) / sizes, 6)
+        return serializer.records(page.drop(columns=[self.key]))
+
+    def buckets(self, low: int, high: int, count: int, start_time: Optional[float],
+                end_time: Optional[float]) -> List[Dict[str, Any]]:
+        """把窗口等分为 count 个时间桶，只返回有提交的桶。"""
+        times, scores, state_codes, correct = self._columns(low, high)
+        first = start_time if start_time is not None else float(times[0])
+        last = end_time if end_time is not None else float(times[-1]) + 1
+        width = max((last - first) / count, 1e-9)
+        slots = np.minimum(((times - first) / width).astype(np.int64), count - 1)
+        totals = np.bincount(slots, minlength=count)
+        score_sums = np.bincount(slots, weights=scores, minlength=count)
+        correct_sums = np.bincount(slots, weights=correct, minlength=count)
+        valid = state_codes >= 0
+        state_counts = np.bincount(slots[valid] * len(self.states) + state_codes[valid],
+                                   minlength=count * len(self.states)).reshape(count, len(self.states))
+        result = []
+        for slot in np.flatnonzero(totals):
+            result.append({
+                'start': round(first + slot * width, 3),
+                'end': round(first + (slot + 1) * width, 3),
+                'count': int(totals[slot]),
+                'score_mean': round(float(score_sums[slot] / totals[slot]), 6),
+                'correct_rate': round(float(correct_sums[slot] / totals[slot]), 6),
+                'states': {str(state): int(n) for state, n in zip(self.states, state_counts[slot]) if n},
+            })
+        return result
+
+
+def _register_timeline(key: str) -> None:
+    name = f'timeline:{key}'
+    data_store.registry.register(name, depends=[data_store.index_name('submit_records', key)])(
+        lambda: Timeline(data_store.index('submit_records', key)))
+
+
+_register_timeline('student_ID')
+_register_timeline('class')
+
+
+def load_timeline(key: str) -> Timeline:
+    return data_store.get(f'timeline:{key}')
+
+
+def parse_time(value: Optional[str]) -> Optional[float]:
+    """解析 from / to 参数：Unix 秒或 ISO 时间（无时区时按 UTC），返回 Unix 秒。"""
+    if value is None or value == '':
+        return None
+    try:
+        if value.replace('.', '', 1).isdigit():
+            return float(value)
+        stamp = pd.Timestamp(value)
+    except (ValueError, OverflowError):
+        raise ValueError(f'无法解析的时间: {value}')
+    if stamp.tzinfo is None:
+        stamp = stamp.tz_localize('UTC')
+    return stamp.timestamp()
+
+
+def build_timeline_payload(key: str, value: str, start_time: Optional[float] = None, end_time: Optional[float] = None,
+                           max_points: int = DEFAULT_MAX_POINTS, rolling: int = DEFAULT_ROLLING) -> Dict[str, Any]:
+    timeline = load_timeline(key)
+    if value not in timeline:
+        raise LookupError(f'没有 {key}={value} 的提交记录')
+    with metrics.stage('timeline.window'):
+        start, low, high = timeline.window(value, start_time, end_time)
+        payload: Dict[str, Any] = {
+            key: value,
+            'from': start_time,
+            'to': end_time,
+            'summary': timeline.summary(low, high),
+        }
+    with metrics.stage('timeline.series'):
+        if high - low <= max_points:
+            payload['mode'] = 'points'
+            payload['rolling'] = rolling
+            payload['points'] = timeline.points(start, low, high, rolling)
+        else:
+            payload['mode'] = 'buckets'
+            payload['buckets'] = timeline.buckets(low, high, max_points, start_time, end_time)
+    return payload
+
+
+def _int_arg(name: str, default: int, high: int) -> int:
+    try:
+        value = int(request.args.get(name, default))
+    except ValueError:
+        raise ValueError(f'{name} 必须是整数')
+    return min(max(value, 1), high)
+
+
+def _timeline_response(key: str, value: str):
+    try:
+        start_time = parse_time(request.args.get('from'))
+        end_time = parse_time(request.args.get('to'))
+        if start_time is not None and end_time is not None and end_time < start_time:
+            raise ValueError('to 不能早于 from')
+        payload = build_timeline_payload(key, value, start_time, end_time,
+                                         _int_arg('max_points', DEFAULT_MAX_POINTS, MAX_POINTS),
+                                         _int_arg('rolling', DEFAULT_ROLLING, MAX_ROLLING))
+        return jsonify(payload)
+    except ValueError as exc:
+        return jsonify({'error': str(exc)}), 400
+    except LookupError as exc:
+        return jsonify({'error': str(exc)}), 404
+
+
+@timeline_bp.route('/student/<student_id>', methods=['GET'])
+def get_student_timeline(student_id):
+    """
+    学生提交时间线
+    query 参数: from, to（Unix 秒或 ISO 时间，左闭右开）, max_points（默认 500，最大 5000）,
+    rolling（滚动统计的提交条数，默认 20）
+    """
+    return _timeline_response('student_ID', student_id)
+
+
+@timeline_bp.route('/class/<class_name>', methods=['GET'])
+def get_class_timeline(class_name):
+    """班级提交时间线，参数同学生时间线"""
+    return _timeline_response('class', class_name)